@@ -0,0 +1,99 @@
+-- Migration: Catalog change feed
+-- Purpose: Record product/variant writes in an outbox and NOTIFY catalog_changes so the conversation engine can refresh its product cache and search index incrementally
+-- Date: 2026-10-19
+
+\c yarnmarket;
+
+-- One row per changed product per statement. Consumers keep the last id they
+-- processed and re-read the current product state, so replays are harmless.
+CREATE TABLE IF NOT EXISTS catalog_changes (
+    id BIGSERIAL PRIMARY KEY,
+    merchant_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_catalog_changes_changed_at ON catalog_changes(changed_at);
+
+-- Statement-level so a bulk import records each product once and sends one NOTIFY
+CREATE OR REPLACE FUNCTION record_product_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO catalog_changes (merchant_id, product_id)
+        SELECT DISTINCT merchant_id, id FROM old_rows WHERE merchant_id IS NOT NULL;
+    ELSE
+        INSERT INTO catalog_changes (merchant_id, product_id)
+        SELECT DISTINCT merchant_id, id FROM new_rows WHERE merchant_id IS NOT NULL;
+    END IF;
+    IF FOUND THEN
+        PERFORM pg_notify('catalog_changes', '');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Variants removed by a product delete cascade find no product row and are
+-- skipped; the product delete itself is already recorded.
+CREATE OR REPLACE FUNCTION record_variant_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO catalog_changes (merchant_id, product_id)
+        SELECT DISTINCT p.merchant_id, p.id
+        FROM old_rows v JOIN products p ON p.id = v.product_id
+        WHERE p.merchant_id IS NOT NULL;
+    ELSE
+        INSERT INTO catalog_changes (merchant_id, product_id)
+        SELECT DISTINCT p.merchant_id, p.id
+        FROM new_rows v JOIN products p ON p.id = v.product_id
+        WHERE p.merchant_id IS NOT NULL;
+    END IF;
+    IF FOUND THEN
+        PERFORM pg_notify('catalog_changes', '');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS record_product_inserts ON products;
+CREATE TRIGGER record_product_inserts
+    AFTER INSERT ON products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_product_changes();
+
+DROP TRIGGER IF EXISTS record_product_updates ON products;
+CREATE TRIGGER record_product_updates
+    AFTER UPDATE ON products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_product_changes();
+
+DROP TRIGGER IF EXISTS record_product_deletes ON products;
+CREATE TRIGGER record_product_deletes
+    AFTER DELETE ON products
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_product_changes();
+
+DROP TRIGGER IF EXISTS record_variant_inserts ON product_variants;
+CREATE TRIGGER record_variant_inserts
+    AFTER INSERT ON product_variants
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_variant_changes();
+
+DROP TRIGGER IF EXISTS record_variant_updates ON product_variants;
+CREATE TRIGGER record_variant_updates
+    AFTER UPDATE ON product_variants
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_variant_changes();
+
+DROP TRIGGER IF EXISTS record_variant_deletes ON product_variants;
+CREATE TRIGGER record_variant_deletes
+    AFTER DELETE ON product_variants
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_variant_changes();
+
+COMMENT ON TABLE catalog_changes IS 'Outbox of changed product ids, consumed by the conversation engine catalog feed; rows older than the feed retention are pruned';
+
+-- Grant permissions
+GRANT ALL PRIVILEGES ON catalog_changes TO yarnmarket;
+GRANT USAGE, SELECT ON SEQUENCE catalog_changes_id_seq TO yarnmarket;
@@ -0,0 +1,64 @@
+-- Migration: Composite indexes for dashboard keyset pagination
+-- Purpose: Back /api/messages and /api/conversations ORDER BY ... LIMIT pages with index scans
+-- Date: 2026-10-19
+--
+-- Run with psql outside a transaction block (CREATE INDEX CONCURRENTLY).
+
+\c yarnmarket;
+
+-- Conversations are listed by most recent activity
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP;
+
+UPDATE conversations
+SET last_message_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+WHERE last_message_at IS NULL;
+
+ALTER TABLE conversations
+ALTER COLUMN last_message_at SET DEFAULT CURRENT_TIMESTAMP,
+ALTER COLUMN last_message_at SET NOT NULL;
+
+-- Keep last_message_at current as messages arrive
+CREATE OR REPLACE FUNCTION touch_conversation_last_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations
+    SET last_message_at = NEW.created_at
+    WHERE merchant_id = NEW.merchant_id
+      AND customer_phone = NEW.customer_phone
+      AND last_message_at < NEW.created_at;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS touch_conversation_last_message ON messages;
+CREATE TRIGGER touch_conversation_last_message
+    AFTER INSERT ON messages
+    FOR EACH ROW EXECUTE FUNCTION touch_conversation_last_message();
+
+-- Per-merchant pages: WHERE merchant_id = $1 ORDER BY created_at DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_merchant_created
+    ON messages(merchant_id, created_at DESC, id DESC);
+
+-- All-merchant admin view
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_created
+    ON messages(created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_merchant_last_message
+    ON conversations(merchant_id, last_message_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_last_message
+    ON conversations(last_message_at DESC, id DESC);
+
+-- Trigger lookup by customer within a merchant
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_merchant_customer
+    ON conversations(merchant_id, customer_phone);
+
+-- Superseded by the composite indexes above
+DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_merchant;
+
+COMMENT ON COLUMN conversations.last_message_at IS 'Timestamp of the latest message, maintained by trigger on messages';
+
+-- Grant permissions
+GRANT ALL PRIVILEGES ON conversations TO yarnmarket;
+GRANT ALL PRIVILEGES ON messages TO yarnmarket;
@@ -0,0 +1,52 @@
+-- Migration: Push message and conversation changes to the dashboard
+-- Purpose: NOTIFY dashboard_events so dashboard-api can stream updates instead of clients polling
+-- Date: 2026-10-19
+
+\c yarnmarket;
+
+-- Payloads stay well under the 8000-byte NOTIFY limit: message text is truncated
+CREATE OR REPLACE FUNCTION notify_dashboard_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_events', json_build_object(
+        'type', 'message',
+        'op', lower(TG_OP),
+        'id', NEW.id,
+        'merchant_id', NEW.merchant_id,
+        'customer_phone', NEW.customer_phone,
+        'message_text', left(NEW.message_text, 500),
+        'message_type', NEW.message_type,
+        'status', NEW.status,
+        'direction', NEW.direction,
+        'created_at', NEW.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_dashboard_conversation()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_events', json_build_object(
+        'type', 'conversation',
+        'op', lower(TG_OP),
+        'id', NEW.id,
+        'merchant_id', NEW.merchant_id,
+        'customer_phone', NEW.customer_phone,
+        'status', NEW.status,
+        'last_message_at', NEW.last_message_at,
+        'created_at', NEW.created_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_dashboard_message ON messages;
+CREATE TRIGGER notify_dashboard_message
+    AFTER INSERT OR UPDATE OF status ON messages
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard_message();
+
+DROP TRIGGER IF EXISTS notify_dashboard_conversation ON conversations;
+CREATE TRIGGER notify_dashboard_conversation
+    AFTER INSERT OR UPDATE OF status, last_message_at ON conversations
+    FOR EACH ROW EXECUTE FUNCTION notify_dashboard_conversation();
@@ -0,0 +1,118 @@
+-- Migration: Trigger-maintained per-merchant counters
+-- Purpose: Serve dashboard /api/metrics without COUNT(*) over conversations and messages
+-- Date: 2026-10-19
+
+\c yarnmarket;
+
+-- Each merchant's counts are spread over 16 slots so concurrent inserts for a
+-- busy merchant rarely contend on the same row; readers SUM the slots.
+-- merchant_id 0 holds rows without a merchant.
+CREATE TABLE IF NOT EXISTS merchant_counters (
+    merchant_id INTEGER NOT NULL,
+    slot SMALLINT NOT NULL,
+    total_conversations BIGINT NOT NULL DEFAULT 0,
+    active_conversations BIGINT NOT NULL DEFAULT 0,
+    total_messages BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (merchant_id, slot)
+);
+
+CREATE OR REPLACE FUNCTION bump_merchant_counters(
+    p_merchant_id INTEGER,
+    d_conversations BIGINT,
+    d_active BIGINT,
+    d_messages BIGINT
+)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO merchant_counters AS mc
+        (merchant_id, slot, total_conversations, active_conversations, total_messages)
+    VALUES
+        (COALESCE(p_merchant_id, 0), floor(random() * 16)::SMALLINT, d_conversations, d_active, d_messages)
+    ON CONFLICT (merchant_id, slot) DO UPDATE SET
+        total_conversations = mc.total_conversations + EXCLUDED.total_conversations,
+        active_conversations = mc.active_conversations + EXCLUDED.active_conversations,
+        total_messages = mc.total_messages + EXCLUDED.total_messages;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_conversation_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_merchant_counters(OLD.merchant_id, -1, -(OLD.status IS NOT DISTINCT FROM 'active')::INT, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_merchant_counters(NEW.merchant_id, 1, (NEW.status IS NOT DISTINCT FROM 'active')::INT, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level so bulk inserts cost one counter update per merchant
+CREATE OR REPLACE FUNCTION count_inserted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_merchant_counters(merchant_id, 0, 0, n)
+    FROM (SELECT merchant_id, COUNT(*) AS n FROM new_rows GROUP BY merchant_id) batch;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_deleted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_merchant_counters(merchant_id, 0, 0, -n)
+    FROM (SELECT merchant_id, COUNT(*) AS n FROM old_rows GROUP BY merchant_id) batch;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill and attach triggers atomically so no write is counted twice or missed
+BEGIN;
+
+LOCK TABLE conversations, messages IN SHARE ROW EXCLUSIVE MODE;
+
+TRUNCATE merchant_counters;
+
+INSERT INTO merchant_counters (merchant_id, slot, total_conversations, active_conversations, total_messages)
+SELECT
+    merchant_id,
+    0,
+    SUM(conversations),
+    SUM(active),
+    SUM(messages)
+FROM (
+    SELECT COALESCE(merchant_id, 0) AS merchant_id, COUNT(*) AS conversations,
+           COUNT(*) FILTER (WHERE status = 'active') AS active, 0 AS messages
+    FROM conversations
+    GROUP BY 1
+    UNION ALL
+    SELECT COALESCE(merchant_id, 0), 0, 0, COUNT(*)
+    FROM messages
+    GROUP BY 1
+) counts
+GROUP BY merchant_id;
+
+DROP TRIGGER IF EXISTS count_conversation_change ON conversations;
+CREATE TRIGGER count_conversation_change
+    AFTER INSERT OR DELETE OR UPDATE OF status, merchant_id ON conversations
+    FOR EACH ROW EXECUTE FUNCTION count_conversation_change();
+
+DROP TRIGGER IF EXISTS count_inserted_messages ON messages;
+CREATE TRIGGER count_inserted_messages
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_messages();
+
+DROP TRIGGER IF EXISTS count_deleted_messages ON messages;
+CREATE TRIGGER count_deleted_messages
+    AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_messages();
+
+COMMIT;
+
+COMMENT ON TABLE merchant_counters IS 'Conversation and message counts per merchant, summed over slots; maintained by triggers (TRUNCATE of the source tables is not counted)';
+
+-- Grant permissions
+GRANT ALL PRIVILEGES ON merchant_counters TO yarnmarket;
@@ -0,0 +1,24 @@
+-- Migration: Track WhatsApp delivery/read statuses on messages
+-- Purpose: Let the conversation engine bulk-apply sent/delivered/read/failed callbacks
+-- Date: 2026-10-19
+
+\c yarnmarket;
+
+-- Columns used by the status ingestion path
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS whatsapp_message_id VARCHAR(128),
+ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMP,
+ADD COLUMN IF NOT EXISTS error_message TEXT;
+
+-- Bulk UPDATE ... FROM (VALUES ...) joins on the WhatsApp message ID
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_whatsapp_message_id
+    ON messages(whatsapp_message_id)
+    WHERE whatsapp_message_id IS NOT NULL;
+
+COMMENT ON COLUMN messages.whatsapp_message_id IS 'Message ID returned by the WhatsApp Cloud API (wamid.*)';
+COMMENT ON COLUMN messages.status_updated_at IS 'Timestamp of the latest applied status callback';
+COMMENT ON COLUMN messages.error_message IS 'Error title from a failed status callback';
+
+-- Grant permissions
+GRANT ALL PRIVILEGES ON messages TO yarnmarket;
+GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA public TO yarnmarket;
@@ -0,0 +1,13 @@
+-- Migration: Indexes for bulk catalog import
+-- Purpose: Match imported rows to existing products by name and variants by sku without scans
+-- Date: 2026-10-19
+--
+-- Run with psql outside a transaction block (CREATE INDEX CONCURRENTLY).
+
+\c yarnmarket;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_merchant_name
+    ON products(merchant_id, name);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_variants_product_sku
+    ON product_variants(product_id, sku);
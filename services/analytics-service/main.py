@@ -3,17 +3,23 @@ YarnMarket AI Analytics Service
 Provides business intelligence and conversation analytics
 """
 
+import os
 import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from fastapi import FastAPI
+import httpx
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rollup queries live in the conversation engine, which owns the ClickHouse schema
+CONVERSATION_ENGINE_URL = os.getenv("CONVERSATION_ENGINE_URL", "http://localhost:8001")
+engine_client = httpx.AsyncClient(base_url=CONVERSATION_ENGINE_URL, timeout=10.0)
+
 # Create FastAPI app
 app = FastAPI(
     title="YarnMarket AI Analytics Service",
@@ -40,54 +46,54 @@ async def health_check():
         "version": "1.0.0"
     }
 
+async def _rollup_summary(merchant_id: Optional[str], days: int) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"days": days}
+    if merchant_id:
+        params["merchant_id"] = merchant_id
+    try:
+        response = await engine_client.get("/analytics/summary", params=params)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.error(f"Error reading analytics rollups: {e}")
+        raise HTTPException(status_code=503, detail="Analytics store unavailable")
+
 @app.get("/metrics")
 async def get_metrics():
-    """Get analytics metrics"""
+    """Get analytics metrics for the last 24 hours"""
+    summary = await _rollup_summary(None, 1)
     return {
-        "active_conversations": 247,
-        "total_revenue": 850000,
-        "conversion_rate": 68.5,
-        "avg_response_time": 285,
+        "active_conversations": summary["active_conversations"],
+        "total_messages": summary["total_messages"],
+        "conversion_rate": summary["conversion_rate"],
+        "avg_response_time": summary["average_response_time"],
+        "p95_response_time": summary["response_time_percentiles"]["p95"],
         "timestamp": datetime.utcnow().isoformat()
     }
 
 @app.get("/conversation-analytics")
-async def get_conversation_analytics():
+async def get_conversation_analytics(days: int = Query(30, ge=1, le=365)):
     """Get conversation analytics data"""
+    summary = await _rollup_summary(None, days)
     return {
-        "total_conversations": 1250,
-        "successful_negotiations": 856,
-        "language_distribution": {
-            "pidgin": 45,
-            "english": 35, 
-            "yoruba": 12,
-            "igbo": 5,
-            "hausa": 3
-        },
-        "conversation_types": {
-            "product_inquiry": 156,
-            "price_negotiation": 89,
-            "order_creation": 67,
-            "general_chat": 45,
-            "complaints": 12
-        },
+        "period_days": days,
+        "total_conversations": summary["total_conversations"],
+        "unique_customers": summary["unique_customers"],
+        "total_messages": summary["total_messages"],
+        "language_distribution": summary["language_distribution"],
+        "conversation_types": summary["intent_counts"],
         "timestamp": datetime.utcnow().isoformat()
     }
 
 @app.get("/merchant/{merchant_id}/analytics")
-async def get_merchant_analytics(merchant_id: str):
+async def get_merchant_analytics(merchant_id: str, days: int = Query(7, ge=1, le=365)):
     """Get analytics for specific merchant"""
+    summary = await _rollup_summary(merchant_id, days)
+    summary.pop("intent_counts")
+    summary.pop("generated_at")
     return {
         "merchant_id": merchant_id,
-        "active_conversations": 42,
-        "daily_revenue": 125000,
-        "conversion_rate": 72.3,
-        "customer_satisfaction": 4.2,
-        "top_products": [
-            {"name": "Cotton Shirt", "sales": 15},
-            {"name": "Jeans", "sales": 12},
-            {"name": "Sneakers", "sales": 8}
-        ],
+        **summary,
         "timestamp": datetime.utcnow().isoformat()
     }
 
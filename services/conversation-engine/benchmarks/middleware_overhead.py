@@ -0,0 +1,119 @@
+"""
+Middleware overhead benchmark
+
+Compares per-request cost of the previous BaseHTTPMiddleware stack
+(RequestLoggingMiddleware + PrometheusMiddleware) with MetricsMiddleware,
+calling the ASGI app directly so network and server time are excluded.
+
+Usage (from services/conversation-engine):
+    python -m benchmarks.middleware_overhead [requests]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from core.middleware import MetricsMiddleware
+
+logging.disable(logging.CRITICAL)
+
+# Legacy metrics live in their own registry so they don't clash with core.middleware
+legacy_registry = CollectorRegistry()
+LEGACY_COUNT = Counter('http_requests_total', 'Total HTTP requests',
+                       ['method', 'endpoint', 'status_code'], registry=legacy_registry)
+LEGACY_DURATION = Histogram('http_request_duration_seconds', 'HTTP request duration',
+                            ['method', 'endpoint'], registry=legacy_registry)
+
+
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    """Copy of the removed RequestLoggingMiddleware"""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        logging.getLogger(__name__).info(
+            f"{request.method} {request.url.path} - {response.status_code} - {duration:.3f}s"
+        )
+        LEGACY_COUNT.labels(method=request.method, endpoint=request.url.path,
+                            status_code=response.status_code).inc()
+        LEGACY_DURATION.labels(method=request.method, endpoint=request.url.path).observe(duration)
+        return response
+
+
+class LegacyPrometheusMiddleware(BaseHTTPMiddleware):
+    """Copy of the removed PrometheusMiddleware"""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+        start_time = time.time()
+        response = await call_next(request)
+        LEGACY_DURATION.labels(method=request.method,
+                               endpoint=request.url.path).observe(time.time() - start_time)
+        return response
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/conversation/{customer_phone}/history")
+    async def history(customer_phone: str):
+        return {"history": []}
+
+    if variant == "legacy":
+        app.add_middleware(LegacyRequestLoggingMiddleware)
+        app.add_middleware(LegacyPrometheusMiddleware)
+    elif variant == "asgi":
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int) -> float:
+    """Return mean microseconds per request"""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i: int):
+        path = f"/conversation/+23480{i % 5000:08d}/history"
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "headers": [(b"host", b"localhost")],
+            "client": ("127.0.0.1", 1234), "server": ("localhost", 8001), "root_path": "",
+        }
+
+    # Warm up routing and middleware stack construction
+    for i in range(200):
+        await app(scope(i), receive, send)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int):
+    results = {}
+    for variant in ("none", "legacy", "asgi"):
+        results[variant] = await run(build_app(variant), requests)
+
+    legacy_series = len(LEGACY_DURATION._metrics)
+    print(f"{'variant':<10}{'us/request':>12}{'overhead':>12}")
+    for variant, mean_us in results.items():
+        print(f"{variant:<10}{mean_us:>12.1f}{mean_us - results['none']:>12.1f}")
+    print(f"\nOverhead removed per request: {results['legacy'] - results['asgi']:.1f} us")
+    print(f"Legacy duration series created: {legacy_series} (one per phone number)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,102 @@
+"""
+Startup time benchmark
+
+Measures the two parts of a cold start that delay readiness:
+
+1. Importing main in a fresh interpreter (median of several runs), with the
+   packages that contribute most according to -X importtime.
+2. YarnMarketConversationEngine.initialize(), per component. Components start
+   concurrently, so the wall time should be close to the slowest component
+   rather than the sum.
+
+Postgres and Redis are used if reachable at the configured URLs; otherwise
+initialization runs without them. Analytics uses the in-memory backend.
+
+Usage (from services/conversation-engine):
+    python -m benchmarks.startup_time [import_runs]
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+logging.disable(logging.CRITICAL)
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def import_seconds() -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def heaviest_imports(limit: int = 8):
+    """Top-level packages by cumulative import time, in milliseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True
+    )
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            cumulative_us = int(cumulative)
+        except ValueError:
+            continue  # header line
+        # A package's first import carries its whole cost; later ones are cache hits
+        package = name.strip().split(".")[0]
+        if package not in ("main", "core"):
+            totals[package] = max(totals[package], cumulative_us)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+async def engine_startup():
+    os.environ.setdefault("ANALYTICS_BACKEND", "memory")
+    from core.config import Settings
+    from core.conversation_engine import YarnMarketConversationEngine
+    from core.database import Database
+
+    settings = Settings()
+    database = Database(settings.database_url)
+    try:
+        await asyncio.wait_for(database.connect(), timeout=5)
+    except Exception:
+        print("(Postgres unavailable, starting without it)")
+
+    engine = YarnMarketConversationEngine(settings=settings, database=database)
+    started = time.perf_counter()
+    await engine.initialize()
+    wall = time.perf_counter() - started
+    await engine.cleanup()
+    await database.disconnect()
+    return wall, engine.startup_timings
+
+
+def main(import_runs: int):
+    samples = [import_seconds() for _ in range(import_runs)]
+    print(f"import main: median {statistics.median(samples) * 1000:.0f}ms, "
+          f"min {min(samples) * 1000:.0f}ms over {import_runs} runs")
+    print(f"\n{'package':<24}{'import ms':>10}")
+    for name, cumulative_us in heaviest_imports():
+        print(f"{name:<24}{cumulative_us / 1000:>10.0f}")
+
+    wall, timings = asyncio.run(engine_startup())
+    print(f"\n{'component':<24}{'init ms':>10}")
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f"{name:<24}{seconds * 1000:>10.1f}")
+    print(f"\nengine initialize: {wall * 1000:.1f}ms wall, "
+          f"{sum(timings.values()) * 1000:.1f}ms if run serially")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -3,27 +3,102 @@ Analytics and metrics collection for YarnMarket AI
 """
 
 import logging
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from .models import ConversationType, Language, MessageType
 from .config import Settings
 from .database import Database
+from .analytics_rollups import MerchantRollups
+from .analytics_sink import AnalyticsSink, ClickHouseHTTPClient, InMemoryClickHouse, InteractionEvent
+from .negotiation_outcomes import OUTCOME_COLUMNS, OUTCOMES_TABLE_DDL
+from .quantile_sketch import ALL_INTENTS, LatencySketches
 
 logger = logging.getLogger(__name__)
 
 
+def _value(value) -> str:
+    """Enum value or plain string for analytics columns"""
+    return str(getattr(value, "value", value))
+
+
 class ConversationAnalytics:
     """Analytics system for conversation performance tracking"""
     
-    def __init__(self, settings: Settings, database: Database):
+    def __init__(self, settings: Settings, database: Database, redis_client=None):
         self.settings = settings
         self.database = database
+        self.redis = redis_client
         self.metrics_cache: Dict[str, Any] = {}
+        self.sink: Optional[AnalyticsSink] = None
+        self.outcome_sink: Optional[AnalyticsSink] = None
+        self.rollups: Optional[MerchantRollups] = None
+        self.latency: Optional[LatencySketches] = None
     
     async def initialize(self):
         """Initialize analytics system"""
         logger.info("📊 Initializing Analytics System...")
-        logger.info("✅ Analytics System ready")
+        
+        client = self._client()
+        self.sink = AnalyticsSink(
+            client,
+            table=self.settings.analytics_events_table,
+            batch_size=self.settings.analytics_batch_size,
+            flush_interval=self.settings.analytics_flush_interval,
+            spill_dir=self.settings.analytics_spill_dir,
+            retention_days=self.settings.conversation_retention_days
+        )
+        await self.sink.start()
+        
+        # Negotiation outcomes for offline learning, in their own table
+        spill_dir = self.settings.analytics_spill_dir
+        self.outcome_sink = AnalyticsSink(
+            self._client(),
+            table=self.settings.negotiation_outcomes_table,
+            batch_size=self.settings.analytics_batch_size,
+            flush_interval=self.settings.analytics_flush_interval,
+            spill_dir=os.path.join(spill_dir, self.settings.negotiation_outcomes_table) if spill_dir else None,
+            retention_days=self.settings.conversation_retention_days,
+            ddl=OUTCOMES_TABLE_DDL,
+            columns=OUTCOME_COLUMNS
+        )
+        await self.outcome_sink.start()
+        
+        self.rollups = MerchantRollups(
+            client,
+            events_table=self.settings.analytics_events_table,
+            retention_days=self.settings.conversation_retention_days
+        )
+        try:
+            await self.rollups.ensure_schema()
+        except Exception as e:
+            logger.warning(f"Could not ensure analytics rollups: {e}")
+        
+        if self.redis is not None:
+            self.latency = LatencySketches(
+                self.redis,
+                flush_interval=self.settings.latency_sketch_flush_interval
+            )
+            await self.latency.start()
+        
+        logger.info(f"✅ Analytics System ready ({self.settings.analytics_backend})")
+    
+    def _client(self):
+        if self.settings.analytics_backend == "memory":
+            return InMemoryClickHouse()
+        return ClickHouseHTTPClient(
+            self.settings.clickhouse_url,
+            database=self.settings.clickhouse_database
+        )
+    
+    async def close(self):
+        """Flush buffered events and release the sinks"""
+        if self.latency:
+            await self.latency.stop()
+        if self.sink:
+            await self.sink.stop()
+        if self.outcome_sink:
+            await self.outcome_sink.stop()
     
     async def record_interaction(
         self,
@@ -34,10 +109,21 @@ class ConversationAnalytics:
         response_time: float
     ):
         """Record interaction metrics"""
-        logger.info(
+        logger.debug(
             f"📊 Recording interaction: {merchant_id} | {intent_type} | "
             f"{language} | {response_time:.3f}s"
         )
+        if self.sink:
+            self.sink.add(InteractionEvent(
+                merchant_id=merchant_id,
+                customer_phone=customer_phone,
+                event_type="processed",
+                intent_type=_value(intent_type),
+                language=_value(language),
+                response_time=response_time
+            ))
+        if self.latency:
+            self.latency.add(merchant_id, _value(intent_type), response_time)
     
     async def log_interaction(
         self,
@@ -50,62 +136,59 @@ class ConversationAnalytics:
         requires_human: bool
     ):
         """Log detailed interaction data"""
-        interaction_data = {
-            "merchant_id": merchant_id,
-            "customer_phone": customer_phone,
-            "message_type": message_type,
-            "intent_type": intent_type,
-            "language": language,
-            "confidence": confidence,
-            "requires_human": requires_human,
-            "timestamp": datetime.utcnow()
-        }
+        event = InteractionEvent(
+            merchant_id=merchant_id,
+            customer_phone=customer_phone,
+            event_type="logged",
+            intent_type=_value(intent_type),
+            language=_value(language),
+            message_type=_value(message_type),
+            confidence=confidence,
+            requires_human=int(requires_human)
+        )
         
-        logger.info(f"📝 Logging interaction: {interaction_data}")
+        logger.debug(f"📝 Logging interaction: {event}")
+        if self.sink:
+            self.sink.add(event)
     
     async def get_merchant_analytics(
         self,
         merchant_id: str,
         days: int = 7
     ) -> Dict[str, Any]:
-        """Get analytics for specific merchant"""
+        """Get analytics for specific merchant from the pre-aggregated rollups"""
+        try:
+            analytics = await self.rollups.merchant_summary(merchant_id, days)
+        except Exception as e:
+            logger.error(f"Error reading analytics rollups for {merchant_id}: {e}")
+            analytics = {
+                "merchant_id": merchant_id,
+                "period_days": days,
+                **MerchantRollups.shape_summary([], [], [], [], []),
+                "generated_at": datetime.utcnow().isoformat()
+            }
         
-        # Mock analytics data for demo
+        analytics["response_time_last_24h"] = await self.get_response_time_percentiles(merchant_id)
+        return analytics
+    
+    async def get_summary(self, merchant_id: Optional[str] = None, days: int = 7) -> Dict[str, Any]:
+        """Rollup analytics for one merchant or the whole platform; raises if the store is unreachable"""
         return {
-            "merchant_id": merchant_id,
             "period_days": days,
-            "total_conversations": 127,
-            "active_conversations": 23,
-            "conversion_rate": 68.5,
-            "average_response_time": 285,
-            "customer_satisfaction": 4.2,
-            "language_distribution": {
-                "pidgin": 45,
-                "english": 35,
-                "yoruba": 12,
-                "igbo": 5,
-                "hausa": 3
-            },
-            "intent_distribution": {
-                "product_inquiry": 45,
-                "price_negotiation": 30,
-                "order_creation": 15,
-                "general_chat": 7,
-                "complaint": 3
-            },
-            "peak_hours": {
-                "9": 12,
-                "10": 18,
-                "11": 15,
-                "12": 22,
-                "13": 25,
-                "14": 20,
-                "15": 18,
-                "16": 16,
-                "17": 14,
-                "18": 19,
-                "19": 15,
-                "20": 12
-            },
+            **await self.rollups.summary(merchant_id, days),
             "generated_at": datetime.utcnow().isoformat()
-        }
\ No newline at end of file
+        }
+    
+    async def get_response_time_percentiles(self, merchant_id: str, hours: int = 24) -> Dict[str, Any]:
+        """Live p50/p95/p99 response times (ms), overall and per intent, from the shared sketches"""
+        if not self.latency:
+            return {}
+        try:
+            return await self.latency.percentiles(
+                merchant_id,
+                intents=[ALL_INTENTS] + [intent.value for intent in ConversationType],
+                hours=hours
+            )
+        except Exception as e:
+            logger.error(f"Error reading latency sketches for {merchant_id}: {e}")
+            return {}
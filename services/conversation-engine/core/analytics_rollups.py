@@ -0,0 +1,223 @@
+"""
+Pre-aggregated analytics rollups for YarnMarket AI
+Hourly and daily per-merchant rollups maintained by ClickHouse materialized views
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reporting day boundaries and peak hours are in Nigerian local time
+REPORT_TIMEZONE = "Africa/Lagos"
+
+CONVERSION_INTENT = "order_creation"
+
+# {events} is the raw events table; rollup tables and views are named after it.
+# Each view aggregates one insert block of `processed` events into the rollup,
+# and AggregatingMergeTree merges the partial rows in the background.
+ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS {events}_hourly (
+        merchant_id LowCardinality(String),
+        hour DateTime('{tz}'),
+        language LowCardinality(String),
+        intent_type LowCardinality(String),
+        messages SimpleAggregateFunction(sum, UInt64),
+        response_time_sum SimpleAggregateFunction(sum, Float64),
+        response_time_quantiles AggregateFunction(quantilesTDigest(0.5, 0.95, 0.99), Float32),
+        customers AggregateFunction(uniq, String)
+    )
+    ENGINE = AggregatingMergeTree
+    PARTITION BY toYYYYMM(hour)
+    ORDER BY (merchant_id, hour, language, intent_type)
+    TTL hour + INTERVAL {retention_days} DAY
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {events}_hourly_mv TO {events}_hourly AS
+    SELECT
+        merchant_id,
+        toStartOfHour(toDateTime(event_time, '{tz}')) AS hour,
+        language,
+        intent_type,
+        count() AS messages,
+        sum(toFloat64(response_time)) AS response_time_sum,
+        quantilesTDigestState(0.5, 0.95, 0.99)(response_time) AS response_time_quantiles,
+        uniqState(customer_phone) AS customers
+    FROM {events}
+    WHERE event_type = 'processed'
+    GROUP BY merchant_id, hour, language, intent_type
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS {events}_daily (
+        merchant_id LowCardinality(String),
+        day Date,
+        language LowCardinality(String),
+        intent_type LowCardinality(String),
+        messages SimpleAggregateFunction(sum, UInt64),
+        response_time_sum SimpleAggregateFunction(sum, Float64),
+        response_time_quantiles AggregateFunction(quantilesTDigest(0.5, 0.95, 0.99), Float32),
+        customers AggregateFunction(uniq, String)
+    )
+    ENGINE = AggregatingMergeTree
+    PARTITION BY toYYYYMM(day)
+    ORDER BY (merchant_id, day, language, intent_type)
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {events}_daily_mv TO {events}_daily AS
+    SELECT
+        merchant_id,
+        toDate(event_time, '{tz}') AS day,
+        language,
+        intent_type,
+        count() AS messages,
+        sum(toFloat64(response_time)) AS response_time_sum,
+        quantilesTDigestState(0.5, 0.95, 0.99)(response_time) AS response_time_quantiles,
+        uniqState(customer_phone) AS customers
+    FROM {events}
+    WHERE event_type = 'processed'
+    GROUP BY merchant_id, day, language, intent_type
+    """,
+]
+
+# {merchant_filter} narrows a query to one merchant; it is empty for platform-wide totals
+MERCHANT_FILTER = "merchant_id = {merchant_id:String} AND"
+
+TOTALS_QUERY = """
+SELECT
+    sum(messages) AS messages,
+    uniqMerge(customers) AS unique_customers,
+    uniqMergeIf(customers, intent_type = '{conversion_intent}') AS converted,
+    sum(response_time_sum) AS response_time_sum,
+    quantilesTDigestMerge(0.5, 0.95, 0.99)(response_time_quantiles) AS quantiles
+FROM {events}_daily
+WHERE {merchant_filter} day > toDate(now('{tz}')) - {{days:UInt16}}
+"""
+
+# A conversation is one customer talking to one merchant, so conversations
+# are distinct customers counted per merchant and then summed
+CONVERSATIONS_QUERY = """
+SELECT sum(merchant_customers) AS conversations
+FROM (
+    SELECT merchant_id, uniqMerge(customers) AS merchant_customers
+    FROM {events}_daily
+    WHERE {merchant_filter} day > toDate(now('{tz}')) - {{days:UInt16}}
+    GROUP BY merchant_id
+)
+"""
+
+BREAKDOWN_QUERY = """
+SELECT language, intent_type, sum(messages) AS messages
+FROM {events}_daily
+WHERE {merchant_filter} day > toDate(now('{tz}')) - {{days:UInt16}}
+GROUP BY language, intent_type
+"""
+
+PEAK_HOURS_QUERY = """
+SELECT toHour(hour) AS hour_of_day, sum(messages) AS messages
+FROM {events}_hourly
+WHERE {merchant_filter} hour >= toStartOfDay(now('{tz}')) - INTERVAL ({{days:UInt16}} - 1) DAY
+GROUP BY hour_of_day
+ORDER BY hour_of_day
+"""
+
+ACTIVE_QUERY = """
+SELECT sum(merchant_customers) AS conversations
+FROM (
+    SELECT merchant_id, uniqMerge(customers) AS merchant_customers
+    FROM {events}_hourly
+    WHERE {merchant_filter} hour >= now('{tz}') - INTERVAL 24 HOUR
+    GROUP BY merchant_id
+)
+"""
+
+
+def _percentages(counts: Dict[str, int]) -> Dict[str, float]:
+    total = sum(counts.values())
+    if not total:
+        return {}
+    return {key: round(count * 100.0 / total, 1) for key, count in sorted(counts.items(), key=lambda kv: -kv[1])}
+
+
+class MerchantRollups:
+    """Creates the rollup tables and answers merchant analytics from them"""
+
+    def __init__(self, client, events_table: str = "conversation_events", retention_days: int = 90):
+        self.client = client
+        self.events_table = events_table
+        self.retention_days = retention_days
+
+    def _sql(self, template: str, merchant_filter: str = "") -> str:
+        return template.format(
+            events=self.events_table,
+            tz=REPORT_TIMEZONE,
+            retention_days=self.retention_days,
+            conversion_intent=CONVERSION_INTENT,
+            merchant_filter=merchant_filter
+        )
+
+    async def ensure_schema(self):
+        """Create rollup tables and the materialized views that feed them"""
+        for ddl in ROLLUP_DDL:
+            await self.client.execute(self._sql(ddl))
+
+    async def merchant_summary(self, merchant_id: str, days: int = 7) -> Dict[str, Any]:
+        """Analytics for one merchant over the last `days` days, read from rollups only"""
+        return {
+            "merchant_id": merchant_id,
+            "period_days": days,
+            **await self.summary(merchant_id, days),
+            "generated_at": datetime.utcnow().isoformat()
+        }
+
+    async def summary(self, merchant_id: Optional[str] = None, days: int = 7) -> Dict[str, Any]:
+        """Rollup analytics for one merchant, or across all merchants when merchant_id is None"""
+        merchant_filter = MERCHANT_FILTER if merchant_id else ""
+        params = {"merchant_id": merchant_id or "", "days": days}
+        totals, conversations, breakdown, peak_hours, active = await asyncio.gather(*(
+            self.client.query(self._sql(query, merchant_filter), params)
+            for query in (TOTALS_QUERY, CONVERSATIONS_QUERY, BREAKDOWN_QUERY, PEAK_HOURS_QUERY, ACTIVE_QUERY)
+        ))
+        return self.shape_summary(totals, conversations, breakdown, peak_hours, active)
+
+    @staticmethod
+    def shape_summary(
+        totals: List[Dict[str, Any]],
+        conversations: List[Dict[str, Any]],
+        breakdown: List[Dict[str, Any]],
+        peak_hours: List[Dict[str, Any]],
+        active: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Turn rollup query rows into the analytics payload"""
+        row = totals[0] if totals else {}
+        messages = int(row.get("messages") or 0)
+        customers = int(row.get("unique_customers") or 0)
+        converted = int(row.get("converted") or 0)
+        quantiles = row.get("quantiles") or []
+
+        def ms(index: int) -> int:
+            # Rollups store seconds; the payload reports milliseconds
+            return round(float(quantiles[index]) * 1000) if len(quantiles) > index and messages else 0
+
+        languages: Dict[str, int] = {}
+        intents: Dict[str, int] = {}
+        for entry in breakdown:
+            count = int(entry["messages"])
+            languages[entry["language"]] = languages.get(entry["language"], 0) + count
+            intents[entry["intent_type"]] = intents.get(entry["intent_type"], 0) + count
+
+        return {
+            "total_messages": messages,
+            "total_conversations": int(conversations[0]["conversations"] or 0) if conversations else 0,
+            "unique_customers": customers,
+            "active_conversations": int(active[0]["conversations"] or 0) if active else 0,
+            "conversion_rate": round(converted * 100.0 / customers, 1) if customers else 0.0,
+            "average_response_time": round(float(row.get("response_time_sum") or 0) * 1000 / messages) if messages else 0,
+            "response_time_percentiles": {"p50": ms(0), "p95": ms(1), "p99": ms(2)},
+            "language_distribution": _percentages(languages),
+            "intent_distribution": _percentages(intents),
+            "intent_counts": intents,
+            "peak_hours": {str(int(entry["hour_of_day"])): int(entry["messages"]) for entry in peak_hours},
+        }
@@ -0,0 +1,270 @@
+"""
+Analytics event sink for YarnMarket AI
+Buffers interaction events in memory and inserts them into ClickHouse in columnar batches
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InteractionEvent:
+    """One analytics event for a processed or logged interaction"""
+    merchant_id: str
+    customer_phone: str
+    event_type: str
+    intent_type: str
+    language: str
+    message_type: str = ""
+    response_time: float = 0.0
+    confidence: float = 0.0
+    requires_human: int = 0
+    event_time: datetime = field(default_factory=datetime.utcnow)
+
+
+EVENT_COLUMNS = [f.name for f in fields(InteractionEvent)]
+
+EVENTS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    merchant_id LowCardinality(String),
+    customer_phone String,
+    event_type LowCardinality(String),
+    intent_type LowCardinality(String),
+    language LowCardinality(String),
+    message_type LowCardinality(String),
+    response_time Float32,
+    confidence Float32,
+    requires_human UInt8,
+    event_time DateTime64(3)
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(event_time)
+ORDER BY (merchant_id, event_time)
+TTL toDateTime(event_time) + INTERVAL {retention_days} DAY
+"""
+
+
+class ClickHouseHTTPClient:
+    """Minimal async ClickHouse client over the HTTP interface"""
+
+    def __init__(self, url: str, database: str = "default", timeout: float = 10.0):
+        self.url = url.rstrip("/")
+        self.database = database
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def execute(self, query: str):
+        response = await self.client.post(
+            self.url, params={"database": self.database}, content=query.encode("utf-8")
+        )
+        response.raise_for_status()
+        return response.text
+
+    async def query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Run a SELECT with server-side {name:Type} parameters and return rows as dicts"""
+        http_params = {
+            "database": self.database,
+            "default_format": "JSON",
+            "output_format_json_quote_64bit_integers": 0,
+        }
+        for name, value in (params or {}).items():
+            http_params[f"param_{name}"] = value
+        response = await self.client.post(self.url, params=http_params, content=query.encode("utf-8"))
+        response.raise_for_status()
+        return response.json().get("data", [])
+
+    async def insert_columns(self, table: str, columns: Dict[str, List[Any]]):
+        """Insert one batch in JSONColumns format (one array per column)"""
+        response = await self.client.post(
+            self.url,
+            params={
+                "database": self.database,
+                "query": f"INSERT INTO {table} FORMAT JSONColumns",
+                "date_time_input_format": "best_effort",
+            },
+            content=json.dumps(columns, default=str).encode("utf-8"),
+        )
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class InMemoryClickHouse:
+    """
+    ClickHouse-compatible local stand-in
+
+    Accepts the same calls as ClickHouseHTTPClient and keeps inserted
+    columns in memory, for local development and tests without a server.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, List[Any]]] = {}
+        self.queries: List[str] = []
+
+    async def execute(self, query: str):
+        self.queries.append(query)
+        return ""
+
+    async def query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        # No SQL engine here; materialized rollups only exist on a real server
+        self.queries.append(query)
+        return []
+
+    async def insert_columns(self, table: str, columns: Dict[str, List[Any]]):
+        stored = self.tables.setdefault(table, {name: [] for name in columns})
+        for name, values in columns.items():
+            stored.setdefault(name, []).extend(values)
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """Return stored rows as dicts"""
+        columns = self.tables.get(table, {})
+        names = list(columns)
+        count = len(columns[names[0]]) if names else 0
+        return [{name: columns[name][i] for name in names} for i in range(count)]
+
+    async def close(self):
+        pass
+
+
+class AnalyticsSink:
+    """
+    Buffered analytics writer
+
+    Events are flushed as a single columnar insert when the buffer reaches
+    batch_size or every flush_interval seconds. Batches that fail to insert
+    are spilled to local JSON files and replayed after the next successful flush.
+    Other event dataclasses can be written by passing their table DDL and columns.
+    """
+
+    def __init__(
+        self,
+        client,
+        table: str = "conversation_events",
+        batch_size: int = 1000,
+        flush_interval: float = 5.0,
+        spill_dir: Optional[str] = None,
+        retention_days: int = 90,
+        ddl: str = EVENTS_TABLE_DDL,
+        columns: Optional[List[str]] = None
+    ):
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.retention_days = retention_days
+        self.ddl = ddl
+        self.columns = columns or EVENT_COLUMNS
+
+        self._buffer: List[Any] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Create the events table and start the interval flush loop"""
+        try:
+            await self.client.execute(self.ddl.format(
+                table=self.table, retention_days=self.retention_days
+            ))
+        except Exception as e:
+            logger.warning(f"Could not ensure analytics table {self.table}: {e}")
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write out buffered events"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await self.client.close()
+
+    def add(self, event):
+        """Buffer an event, scheduling a flush when the batch is full"""
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size and (self._size_flush is None or self._size_flush.done()):
+            self._size_flush = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Insert all buffered events as one columnar batch"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+
+            batch, self._buffer = self._buffer, []
+            columns = self._to_columns(batch)
+
+            try:
+                await self.client.insert_columns(self.table, columns)
+            except Exception as e:
+                logger.error(f"Analytics insert of {len(batch)} events failed: {e}")
+                self._spill(columns)
+                return 0
+
+            await self._replay_spilled()
+            return len(batch)
+
+    def _to_columns(self, batch: List[Any]) -> Dict[str, List[Any]]:
+        columns: Dict[str, List[Any]] = {name: [] for name in self.columns}
+        for event in batch:
+            for name, value in asdict(event).items():
+                columns[name].append(value.isoformat() if isinstance(value, datetime) else value)
+        return columns
+
+    def _spill(self, columns: Dict[str, List[Any]]):
+        """Write a failed batch to local disk"""
+        if not self.spill_dir:
+            logger.warning(f"Dropping {len(columns[self.columns[0]])} analytics events (no spill directory)")
+            return
+        path = os.path.join(self.spill_dir, f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.json")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(columns, f, default=str)
+            logger.info(f"Spilled analytics batch to {path}")
+        except OSError as e:
+            logger.error(f"Could not spill analytics batch: {e}")
+
+    async def _replay_spilled(self):
+        """Re-insert spilled batches, oldest first"""
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return
+        for name in sorted(os.listdir(self.spill_dir)):
+            path = os.path.join(self.spill_dir, name)
+            if not name.endswith(".json") or not os.path.isfile(path):
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    columns = json.load(f)
+                await self.client.insert_columns(self.table, columns)
+                os.remove(path)
+                logger.info(f"Replayed spilled analytics batch {name}")
+            except Exception as e:
+                logger.warning(f"Replay of spilled analytics batch {name} failed: {e}")
+                return
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Analytics flush loop error: {e}")
@@ -0,0 +1,329 @@
+"""
+Product catalog cache for YarnMarket AI
+Keeps each merchant's products in memory and applies Postgres change-feed updates incrementally
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+import asyncpg
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Channel and outbox written by the triggers in scripts/add-catalog-change-feed.sql
+CHANNEL = "catalog_changes"
+
+CHANGES_QUERY = """
+    SELECT id, merchant_id, product_id
+    FROM catalog_changes
+    WHERE id > $1 AND id <> ALL($2::BIGINT[])
+    ORDER BY id
+    LIMIT $3
+"""
+
+# Skipped ids that have since become visible were late commits, not rollbacks
+LATE_CHANGES_QUERY = """
+    SELECT id, merchant_id
+    FROM catalog_changes
+    WHERE id = ANY($1::BIGINT[])
+"""
+
+PRUNE_QUERY = """
+    DELETE FROM catalog_changes
+    WHERE changed_at < LOCALTIMESTAMP - make_interval(hours => $1)
+"""
+
+
+class CatalogListener:
+    """
+    Receives every change applied to the cache
+
+    Search indexes subclass this to stay in step with the catalog without
+    reading Postgres themselves. Methods run inline and must not block.
+    """
+
+    def replace(self, merchant_id: str, products: List[Product]):
+        """A merchant's full catalog was (re)loaded"""
+
+    def upsert(self, merchant_id: str, products: List[Product]):
+        """Products were created or changed"""
+
+    def remove(self, merchant_id: str, product_ids: List[str]):
+        """Products were deleted or deactivated"""
+
+    def evict(self, merchant_id: str):
+        """The merchant left the cache; its data can be dropped"""
+
+
+class ProductCatalog:
+    """
+    Per-merchant product cache, loaded lazily and kept fresh by CatalogChangeFeed
+
+    At most max_merchants catalogs are held; the least recently used one is
+    evicted and reloaded on its next inquiry.
+    """
+
+    def __init__(self, database, max_merchants: int = 1000):
+        self.database = database
+        self.max_merchants = max_merchants
+        self.listeners: List[CatalogListener] = []
+
+        self._merchants: "OrderedDict[str, Dict[str, Product]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Changes that arrive while a merchant's catalog is being read are
+        # replayed once the load finishes, since the read may predate them
+        self._changed_while_loading: Dict[str, Set[str]] = {}
+
+    def add_listener(self, listener: CatalogListener):
+        self.listeners.append(listener)
+
+    async def products(
+        self,
+        merchant_id: str,
+        category: Optional[str] = None,
+        max_price: Optional[float] = None
+    ) -> List[Product]:
+        """All cached products for a merchant, optionally filtered"""
+        catalog = await self._catalog(merchant_id)
+        products = list(catalog.values())
+        if category:
+            products = [p for p in products if p.category.lower() == category.lower()]
+        if max_price:
+            products = [p for p in products if p.price <= max_price]
+        return products
+
+    async def get_product(self, merchant_id: str, product_id: str) -> Optional[Product]:
+        catalog = await self._catalog(merchant_id)
+        return catalog.get(str(product_id))
+
+    def is_loaded(self, merchant_id: str) -> bool:
+        return merchant_id in self._merchants
+
+    async def _catalog(self, merchant_id: str) -> Dict[str, Product]:
+        catalog = self._merchants.get(merchant_id)
+        if catalog is not None:
+            self._merchants.move_to_end(merchant_id)
+            return catalog
+
+        # Concurrent inquiries for a cold merchant share one load
+        task = self._loading.get(merchant_id)
+        if task is None:
+            task = asyncio.create_task(self._load(merchant_id))
+            self._loading[merchant_id] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, merchant_id: str) -> Dict[str, Product]:
+        self._changed_while_loading[merchant_id] = set()
+        try:
+            products = await self.database.fetch_catalog(merchant_id)
+            catalog = {product.id: product for product in products}
+            self._merchants[merchant_id] = catalog
+            changed = self._changed_while_loading.pop(merchant_id, set())
+        finally:
+            self._changed_while_loading.pop(merchant_id, None)
+            self._loading.pop(merchant_id, None)
+
+        logger.info(f"📦 Loaded {len(catalog)} products for merchant {merchant_id}")
+        self._notify("replace", merchant_id, products)
+        if changed:
+            await self.refresh(merchant_id, changed)
+
+        while len(self._merchants) > self.max_merchants:
+            evicted, _ = self._merchants.popitem(last=False)
+            self._notify("evict", evicted)
+        return catalog
+
+    async def refresh(self, merchant_id: str, product_ids: Iterable[str]):
+        """Re-read the given products and apply them to a loaded catalog"""
+        product_ids = {str(product_id) for product_id in product_ids}
+        products = await self.database.fetch_catalog(merchant_id, list(product_ids))
+
+        catalog = self._merchants.get(merchant_id)
+        if catalog is None:
+            return
+
+        found = {product.id for product in products}
+        removed = [product_id for product_id in product_ids if product_id not in found and product_id in catalog]
+        for product in products:
+            catalog[product.id] = product
+        for product_id in removed:
+            del catalog[product_id]
+
+        if products:
+            self._notify("upsert", merchant_id, products)
+        if removed:
+            self._notify("remove", merchant_id, removed)
+
+    async def apply_changes(self, changes: Dict[str, Set[str]]):
+        """Apply changed product ids, grouped by merchant; unloaded merchants are skipped"""
+        for merchant_id, product_ids in changes.items():
+            if merchant_id in self._changed_while_loading:
+                self._changed_while_loading[merchant_id].update(product_ids)
+            elif merchant_id in self._merchants:
+                await self.refresh(merchant_id, product_ids)
+
+    def invalidate(self, merchant_id: str):
+        """Drop one merchant's cached catalog; it is reloaded on its next inquiry"""
+        if self._merchants.pop(merchant_id, None) is not None:
+            self._notify("evict", merchant_id)
+
+    def invalidate_all(self):
+        """Drop every cached catalog; each is reloaded on its next inquiry"""
+        for merchant_id in list(self._merchants):
+            del self._merchants[merchant_id]
+            self._notify("evict", merchant_id)
+
+    def _notify(self, method: str, *args):
+        for listener in self.listeners:
+            try:
+                getattr(listener, method)(*args)
+            except Exception as e:
+                logger.error(f"Catalog listener {type(listener).__name__}.{method} failed: {e}")
+
+
+class CatalogChangeFeed:
+    """
+    Consumes the catalog_changes outbox into a ProductCatalog
+
+    NOTIFY only wakes the consumer; the outbox is read from the last processed
+    id, so changes committed while the listener was down are still applied.
+    Outbox ids are assigned before commit and can become visible out of order,
+    so ids skipped over are waited for up to gap_timeout before being given up
+    as rolled back. Given-up ids stay watched until they would have been
+    pruned; one that turns up after all was a slow commit, and its merchant's
+    catalog is invalidated so the change is not lost.
+    """
+
+    def __init__(
+        self,
+        catalog: ProductCatalog,
+        pool: asyncpg.Pool,
+        poll_interval: float = 30.0,
+        batch_size: int = 500,
+        retention_hours: int = 24,
+        gap_timeout: float = 30.0,
+        reconnect_delay: float = 5.0
+    ):
+        self.catalog = catalog
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.retention_hours = retention_hours
+        self.gap_timeout = gap_timeout
+        self.reconnect_delay = reconnect_delay
+
+        self.last_id = 0
+        self._applied: Set[int] = set()
+        # Gap ids given up on, with when, in case they were slow commits
+        self._skipped: Dict[int, float] = {}
+        self._gap_since: Optional[float] = None
+        self._last_prune = 0.0
+        self._wakeup = asyncio.Event()
+        self._listen_task: Optional[asyncio.Task] = None
+        self._drain_task: Optional[asyncio.Task] = None
+
+    async def start(self, database_url: str):
+        # Anything older is already reflected in catalogs loaded from now on
+        self.last_id = await self.pool.fetchval("SELECT COALESCE(MAX(id), 0) FROM catalog_changes")
+        self._listen_task = asyncio.create_task(self._listen_loop(database_url))
+        self._drain_task = asyncio.create_task(self._drain_loop())
+        logger.info(f"📦 Catalog change feed started at change {self.last_id}")
+
+    async def stop(self):
+        for task in (self._listen_task, self._drain_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._wakeup.set()
+
+    async def _listen_loop(self, database_url: str):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(database_url)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                # Catch up on anything committed before LISTEN took effect
+                self._wakeup.set()
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await closed.wait()
+                logger.warning("Catalog change connection closed, reconnecting")
+            except asyncio.CancelledError:
+                if connection and not connection.is_closed():
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.error(f"Catalog change listener error: {e}")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _drain_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.drain()
+                if time.monotonic() - self._last_prune > 3600:
+                    await self.pool.execute(PRUNE_QUERY, self.retention_hours)
+                    self._last_prune = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error applying catalog changes: {e}")
+
+    async def drain(self):
+        """Apply every visible change after the last processed id"""
+        while True:
+            rows = await self.pool.fetch(CHANGES_QUERY, self.last_id, list(self._applied), self.batch_size)
+            if rows:
+                changes: Dict[str, Set[str]] = {}
+                for row in rows:
+                    changes.setdefault(str(row['merchant_id']), set()).add(str(row['product_id']))
+                await self.catalog.apply_changes(changes)
+                self._applied.update(row['id'] for row in rows)
+            self._advance()
+            if len(rows) < self.batch_size:
+                await self._recheck_skipped()
+                return
+
+    async def _recheck_skipped(self):
+        """Invalidate merchants whose skipped change has committed since"""
+        cutoff = time.monotonic() - self.retention_hours * 3600
+        self._skipped = {change_id: at for change_id, at in self._skipped.items() if at >= cutoff}
+        if not self._skipped:
+            return
+        for row in await self.pool.fetch(LATE_CHANGES_QUERY, list(self._skipped)):
+            del self._skipped[row['id']]
+            merchant_id = str(row['merchant_id'])
+            logger.warning(f"Catalog change {row['id']} committed after its gap timed out, reloading merchant {merchant_id}")
+            self.catalog.invalidate(merchant_id)
+
+    def _advance(self):
+        """Move last_id over applied ids, pausing at gaps until they fill or time out"""
+        while self._applied:
+            next_id = self.last_id + 1
+            if next_id in self._applied:
+                self._applied.discard(next_id)
+                self.last_id = next_id
+                self._gap_since = None
+                continue
+
+            now = time.monotonic()
+            if self._gap_since is None:
+                self._gap_since = now
+            if now - self._gap_since < self.gap_timeout:
+                return
+            # Rolled back, or a slow commit that _recheck_skipped will catch
+            self._skipped[next_id] = now
+            self.last_id = next_id
@@ -34,6 +34,10 @@ class Settings(BaseSettings):
         default=None,
         description="Moonshot AI (Kimi) API key"
     )
+    whatsapp_access_token: Optional[str] = Field(
+        default=None,
+        description="WhatsApp Cloud API token, sent when downloading voice note media"
+    )
 
     # LLM Provider Settings
     primary_llm: str = Field(
@@ -92,23 +96,55 @@ class Settings(BaseSettings):
         default=50,
         description="Maximum number of messages to keep in conversation history"
     )
+    conversation_memory_ttl: int = Field(
+        default=7 * 24 * 3600,
+        description="Seconds an idle conversation stays in Redis memory"
+    )
     response_timeout: float = Field(
         default=5.0,
         description="Maximum time to generate a response (seconds)"
     )
     confidence_threshold: float = Field(
         default=0.7,
-        description="Minimum confidence for AI responses"
+        description="Minimum planner score to answer general chat from auto-responses or templates instead of the LLM"
     )
     
     # Audio Processing
     whisper_model: str = Field(
         default="base",
-        description="Whisper model size (tiny, base, small, medium, large)"
+        description="Whisper model size (tiny, base, small, medium, large) or path to a CTranslate2 model"
+    )
+    whisper_model_dir: str = Field(
+        default="./models",
+        description="Directory Whisper models are downloaded to and loaded from"
+    )
+    whisper_compute_type: str = Field(
+        default="int8",
+        description="CTranslate2 compute type for CPU transcription (int8, int8_float32, float32)"
+    )
+    whisper_cpu_threads: int = Field(
+        default=2,
+        description="CPU threads per transcription worker"
     )
     max_audio_duration: int = Field(
         default=300,
-        description="Maximum audio duration in seconds"
+        description="Maximum audio duration in seconds; longer voice notes are cut off"
+    )
+    max_audio_bytes: int = Field(
+        default=16 * 1024 * 1024,
+        description="Largest voice note that will be downloaded (WhatsApp caps audio at 16 MB)"
+    )
+    voice_workers: int = Field(
+        default=1,
+        description="Transcription worker processes"
+    )
+    voice_max_concurrent: int = Field(
+        default=2,
+        description="Voice notes downloaded, decoded or transcribed at once; the rest wait"
+    )
+    voice_cache_size: int = Field(
+        default=512,
+        description="Transcriptions kept in memory, keyed by a hash of the audio"
     )
     
     # Negotiation Settings
@@ -121,11 +157,149 @@ class Settings(BaseSettings):
         description="Minimum profit margin to maintain"
     )
     
+    # Message Status Tracking
+    status_flush_interval: float = Field(
+        default=2.0,
+        description="Seconds between bulk writes of WhatsApp delivery/read statuses"
+    )
+    status_flush_batch_size: int = Field(
+        default=500,
+        description="Maximum statuses written per UPDATE statement"
+    )
+    
+    # Product Catalog
+    catalog_cache_merchants: int = Field(
+        default=1000,
+        description="Merchant catalogs held in memory before the least recently used is evicted"
+    )
+    catalog_feed_enabled: bool = Field(
+        default=True,
+        description="Apply catalog_changes from Postgres to cached catalogs"
+    )
+    catalog_poll_interval: float = Field(
+        default=30.0,
+        description="Seconds between outbox reads when no NOTIFY arrives"
+    )
+    catalog_change_retention_hours: int = Field(
+        default=24,
+        description="Hours of catalog_changes kept before pruning"
+    )
+    vector_search_enabled: bool = Field(
+        default=True,
+        description="Fall back to in-process semantic product matching when keyword search finds nothing"
+    )
+    vector_embedder: str = Field(
+        default="hashing",
+        description="Product embedder: hashing (offline) or module:factory for a local model"
+    )
+    vector_dimensions: int = Field(
+        default=1024,
+        description="Embedding dimensions"
+    )
+    vector_index_dir: Optional[str] = Field(
+        default="./vector_index",
+        description="Directory for memory-mapped per-merchant product vectors (unset keeps them in memory)"
+    )
+    vector_ivf_threshold: int = Field(
+        default=50000,
+        description="Products per merchant above which queries probe IVF lists instead of a flat scan"
+    )
+    vector_min_similarity: float = Field(
+        default=0.25,
+        description="Minimum cosine similarity for a semantic product match"
+    )
+    
+    # Response Templates
+    templates_dir: Optional[str] = Field(
+        default="./templates",
+        description="Directory of <language>.json and merchants/<merchant_id>/<language>.json response template overrides"
+    )
+    templates_reload_interval: float = Field(
+        default=5.0,
+        description="Seconds between checks of template override files for changes"
+    )
+    
+    # Warm-up
+    warmup_enabled: bool = Field(
+        default=True,
+        description="Prime caches, pools and models before reporting ready"
+    )
+    warmup_timeout: float = Field(
+        default=60.0,
+        description="Seconds warm-up may take before the service is marked ready anyway"
+    )
+    warmup_merchants: int = Field(
+        default=20,
+        description="Most recently active merchants whose settings and catalogs are preloaded"
+    )
+    warmup_postgres_connections: int = Field(
+        default=10,
+        description="Postgres connections opened during warm-up (capped by the pool size)"
+    )
+    warmup_redis_connections: int = Field(
+        default=10,
+        description="Redis connections opened during warm-up"
+    )
+    warmup_llm: bool = Field(
+        default=True,
+        description="Build the LLM clients and complete a request to each provider during warm-up"
+    )
+    warmup_voice: bool = Field(
+        default=False,
+        description="Create the voice processor during warm-up instead of on the first voice note"
+    )
+    
+    # Analytics
+    analytics_backend: str = Field(
+        default="clickhouse",
+        description="Where interaction events are written (clickhouse, memory)"
+    )
+    clickhouse_url: str = Field(
+        default="http://localhost:8123",
+        description="ClickHouse HTTP interface URL"
+    )
+    clickhouse_database: str = Field(
+        default="default",
+        description="ClickHouse database for analytics tables"
+    )
+    analytics_events_table: str = Field(
+        default="conversation_events",
+        description="ClickHouse table receiving interaction events"
+    )
+    negotiation_outcomes_table: str = Field(
+        default="negotiation_outcomes",
+        description="ClickHouse table receiving raw negotiation outcomes"
+    )
+    analytics_batch_size: int = Field(
+        default=1000,
+        description="Buffered events that trigger an immediate insert"
+    )
+    analytics_flush_interval: float = Field(
+        default=5.0,
+        description="Seconds between analytics inserts"
+    )
+    analytics_spill_dir: Optional[str] = Field(
+        default="./analytics_spill",
+        description="Directory for batches that failed to insert (replayed later)"
+    )
+    latency_sketch_flush_interval: float = Field(
+        default=10.0,
+        description="Seconds between merges of local response-time sketches into Redis"
+    )
+    
     # Rate Limiting
     max_requests_per_minute: int = Field(
         default=60,
         description="Maximum requests per minute per customer"
     )
+    max_merchant_requests_per_minute: int = Field(
+        default=600,
+        description="Maximum requests per minute per merchant across all customers"
+    )
+    rate_limit_enabled: bool = Field(
+        default=True,
+        description="Throttle customers and merchants that exceed their request limits"
+    )
     
     # Monitoring
     enable_metrics: bool = Field(
@@ -136,6 +310,14 @@ class Settings(BaseSettings):
         default=8090,
         description="Port for metrics endpoint"
     )
+    request_log_sample_rate: float = Field(
+        default=0.05,
+        description="Fraction of successful requests written to the access log"
+    )
+    slow_request_threshold: float = Field(
+        default=1.0,
+        description="Requests slower than this (seconds) are always logged"
+    )
     
     # Logging
     log_level: str = Field(
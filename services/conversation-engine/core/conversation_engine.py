@@ -5,20 +5,18 @@ Core AI system for handling customer conversations with cultural intelligence
 
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-import json
-import hashlib
+import time
+from typing import Awaitable, List, Optional, Dict, Any
+from datetime import datetime
 
 # import torch  # Removed for MVP - using OpenAI API instead
 # from transformers import AutoTokenizer, AutoModel
 import redis.asyncio as redis
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import (
     ConversationRequest, ConversationResponse, Intent, LanguageContext,
-    NegotiationState, CustomerProfile, MerchantSettings, ConversationType,
-    Language, MessageType, QuickReply
+    CustomerProfile, MerchantSettings, ConversationType,
+    Language, MessageType, QuickReply, Product
 )
 from .config import Settings
 from .database import Database
@@ -28,7 +26,18 @@ from .cultural_intelligence import CulturalIntelligence
 from .negotiation_agent import HagglingAgent
 from .voice_processor import VoiceProcessor
 from .response_generator import ResponseGenerator
+from .response_planner import ResponsePlanner
+from .faq_index import FaqIndex
 from .analytics import ConversationAnalytics
+from .catalog import CatalogChangeFeed, ProductCatalog
+from .product_search import ProductSearchIndex
+from .vector_index import VectorProductIndex, load_embedder
+from .conversation_memory import ConversationMemory
+from .negotiation_store import NegotiationStore
+from .negotiation_outcomes import NegotiationOutcomeStore
+from .rate_limiter import ConversationRateLimiter
+from .telemetry import PipelineTrace
+from .message_status import MessageStatusBuffer, parse_status_updates
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +51,9 @@ class YarnMarketConversationEngine:
         self.settings = settings
         self.database = database
         self.redis = None
+        self.conversation_memory: Optional[ConversationMemory] = None
+        self.negotiation_store: Optional[NegotiationStore] = None
+        self.rate_limiter: Optional[ConversationRateLimiter] = None
         
         # AI Components
         self.language_detector: Optional[NigerianLanguageDetector] = None
@@ -50,50 +62,139 @@ class YarnMarketConversationEngine:
         self.negotiation_agent: Optional[HagglingAgent] = None
         self.voice_processor: Optional[VoiceProcessor] = None
         self.response_generator: Optional[ResponseGenerator] = None
+        self.response_planner: Optional[ResponsePlanner] = None
         self.analytics: Optional[ConversationAnalytics] = None
+        self.status_buffer: Optional[MessageStatusBuffer] = None
+        self.catalog: Optional[ProductCatalog] = None
+        self.catalog_feed: Optional[CatalogChangeFeed] = None
+        self.product_search: Optional[ProductSearchIndex] = None
+        self.vector_index: Optional[VectorProductIndex] = None
+        
+        # Startup state
+        self.ready = False
+        self.startup_timings: Dict[str, float] = {}
+        self._voice_lock = asyncio.Lock()
         
         # Cache
-        self.conversation_cache: Dict[str, List[Dict]] = {}
         self.merchant_cache: Dict[str, MerchantSettings] = {}
         self.customer_cache: Dict[str, CustomerProfile] = {}
         
     async def initialize(self):
         """Initialize all components"""
         logger.info("🔧 Initializing YarnMarket Conversation Engine...")
+        started = time.perf_counter()
         
-        # Initialize Redis
+        # Initialize Redis (connections open on first command)
         self.redis = redis.from_url(self.settings.redis_url)
+        self.conversation_memory = ConversationMemory(
+            self.redis,
+            max_entries=self.settings.max_conversation_history,
+            ttl_seconds=self.settings.conversation_memory_ttl,
+            key_prefix="history"
+        )
+        self.negotiation_store = NegotiationStore(self.redis)
+        if self.settings.rate_limit_enabled:
+            self.rate_limiter = ConversationRateLimiter(
+                self.redis,
+                customer_limit=self.settings.max_requests_per_minute,
+                merchant_limit=self.settings.max_merchant_requests_per_minute
+            )
         
-        # Initialize AI components
-        logger.info("Loading language detection model...")
+        # AI components; the voice processor is created on the first voice note
         self.language_detector = NigerianLanguageDetector(self.settings)
-        await self.language_detector.initialize()
-        
-        logger.info("Loading intent classification model...")
         self.intent_classifier = IntentClassifier(self.settings)
-        await self.intent_classifier.initialize()
-        
-        logger.info("Loading cultural intelligence system...")
         self.cultural_intelligence = CulturalIntelligence(self.settings)
-        await self.cultural_intelligence.initialize()
-        
-        logger.info("Loading negotiation agent...")
         self.negotiation_agent = HagglingAgent(self.settings)
-        await self.negotiation_agent.initialize()
-        
-        logger.info("Loading voice processor...")
-        self.voice_processor = VoiceProcessor(self.settings)
-        await self.voice_processor.initialize()
-        
-        logger.info("Loading response generator...")
         self.response_generator = ResponseGenerator(self.settings)
-        await self.response_generator.initialize()
+        self.analytics = ConversationAnalytics(self.settings, self.database, self.redis)
+        self.status_buffer = MessageStatusBuffer(
+            flush_interval=self.settings.status_flush_interval,
+            batch_size=self.settings.status_flush_batch_size
+        )
+        
+        # No component waits on another's initialization, so start them together
+        await asyncio.gather(
+            self._start_component("language_detector", self.language_detector.initialize()),
+            self._start_component("intent_classifier", self.intent_classifier.initialize()),
+            self._start_component("cultural_intelligence", self.cultural_intelligence.initialize()),
+            self._start_component("negotiation_agent", self.negotiation_agent.initialize()),
+            self._start_component("response_generator", self.response_generator.initialize()),
+            self._start_component("analytics", self.analytics.initialize()),
+            self._start_component("status_buffer", self.status_buffer.start(self.database.postgres_pool)),
+            self._start_component("catalog", self._start_catalog())
+        )
         
-        logger.info("Loading analytics system...")
-        self.analytics = ConversationAnalytics(self.settings, self.database)
-        await self.analytics.initialize()
+        # Wiring that needs more than one component
+        self.negotiation_agent.outcome_store = NegotiationOutcomeStore(self.redis, sink=self.analytics.outcome_sink)
+        self.response_planner = ResponsePlanner(
+            self.cultural_intelligence.templates,
+            FaqIndex(),
+            confidence_threshold=self.settings.confidence_threshold
+        )
         
-        logger.info("✅ YarnMarket Conversation Engine initialized successfully")
+        self.ready = True
+        logger.info(f"✅ YarnMarket Conversation Engine initialized in {time.perf_counter() - started:.2f}s")
+    
+    async def _start_component(self, name: str, startup: Awaitable):
+        """Run one component's startup, recording how long it took"""
+        started = time.perf_counter()
+        await startup
+        self.startup_timings[name] = time.perf_counter() - started
+        logger.info(f"Started {name} in {self.startup_timings[name] * 1000:.0f}ms")
+    
+    async def _start_catalog(self):
+        """Product cache, its search indexes and the change feed that keeps them fresh"""
+        self.catalog = ProductCatalog(self.database, max_merchants=self.settings.catalog_cache_merchants)
+        self.product_search = ProductSearchIndex()
+        self.catalog.add_listener(self.product_search)
+        if self.settings.vector_search_enabled:
+            self.vector_index = VectorProductIndex(
+                load_embedder(self.settings.vector_embedder, self.settings.vector_dimensions),
+                directory=self.settings.vector_index_dir,
+                ivf_threshold=self.settings.vector_ivf_threshold
+            )
+            self.catalog.add_listener(self.vector_index)
+        if self.settings.catalog_feed_enabled and self.database.postgres_pool:
+            self.catalog_feed = CatalogChangeFeed(
+                self.catalog,
+                self.database.postgres_pool,
+                poll_interval=self.settings.catalog_poll_interval,
+                retention_hours=self.settings.catalog_change_retention_hours
+            )
+            try:
+                await self.catalog_feed.start(self.settings.database_url)
+            except Exception as e:
+                # Without the outbox, cached catalogs would go stale
+                logger.warning(f"Catalog change feed unavailable, caching disabled: {e}")
+                self.catalog_feed = None
+    
+    async def get_voice_processor(self) -> VoiceProcessor:
+        """The voice processor, initialized on first use"""
+        if self.voice_processor is None:
+            async with self._voice_lock:
+                if self.voice_processor is None:
+                    processor = VoiceProcessor(self.settings)
+                    await self._start_component("voice_processor", processor.initialize())
+                    self.voice_processor = processor
+        return self.voice_processor
+    
+    @property
+    def is_warm(self) -> bool:
+        """Whether the lazily created components have been built too"""
+        return (
+            self.ready
+            and self.voice_processor is not None
+            and self.cultural_intelligence.llm_clients_ready
+        )
+    
+    def component_status(self) -> Dict[str, str]:
+        """Startup state of each component for the readiness endpoint"""
+        status = {name: "ready" for name in self.startup_timings}
+        if self.voice_processor is None:
+            status["voice_processor"] = "lazy"
+        if self.cultural_intelligence is not None:
+            status["llm_clients"] = "ready" if self.cultural_intelligence.llm_clients_ready else "lazy"
+        return status
     
     async def process_message(self, request: ConversationRequest) -> ConversationResponse:
         """
@@ -101,74 +202,116 @@ class YarnMarketConversationEngine:
         """
         start_time = datetime.utcnow()
         
-        try:
-            # Get merchant settings
-            merchant = await self.get_merchant_settings(request.merchant_id)
-            
-            # Get customer profile
-            customer = await self.get_customer_profile(request.customer_phone)
-            
-            # Get conversation history
-            history = await self.get_conversation_history(
-                request.customer_phone,
-                request.merchant_id
-            )
-            
-            # Detect language and cultural context
-            language_context = await self.language_detector.analyze(
-                request.message.text,
-                history,
-                customer.preferred_language
-            )
-            
-            # Extract intent
-            intent = await self.intent_classifier.classify(
-                text=request.message.text,
-                language_context=language_context,
-                conversation_history=history,
-                merchant_context=merchant.business_type
-            )
-            
-            # Route to appropriate handler
-            response = await self._route_conversation(
-                request=request,
-                intent=intent,
-                language_context=language_context,
-                merchant=merchant,
-                customer=customer,
-                history=history
-            )
-            
-            # Store conversation
-            await self._store_conversation(
-                request=request,
-                response=response,
-                intent=intent,
-                processing_time=(datetime.utcnow() - start_time).total_seconds()
-            )
-            
-            # Update analytics
-            await self.analytics.record_interaction(
-                merchant_id=request.merchant_id,
-                customer_phone=request.customer_phone,
-                intent_type=intent.type,
-                language=language_context.primary_language,
-                response_time=(datetime.utcnow() - start_time).total_seconds()
-            )
-            
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error processing message: {str(e)}", exc_info=True)
-            
-            # Generate fallback response
-            return ConversationResponse(
-                text="Sorry, I'm having a small issue right now. Please give me a moment to get back to you! 🙏",
-                language=Language.ENGLISH,
-                intent_type=ConversationType.GENERAL_CHAT,
-                confidence=0.5,
-                requires_human=True
-            )
+        with PipelineTrace() as trace:
+            try:
+                # Throttle floods before any database or LLM work
+                if self.rate_limiter:
+                    with trace.stage("rate_limit"):
+                        decision = await self.rate_limiter.check(request.customer_phone, request.merchant_id)
+                    if not decision.allowed:
+                        trace.set_labels(intent="throttled")
+                        return await self._throttled_response(request, decision.retry_after)
+                
+                # Get merchant settings
+                with trace.stage("merchant"):
+                    merchant = await self.get_merchant_settings(request.merchant_id)
+                
+                # Get customer profile
+                with trace.stage("customer"):
+                    customer = await self.get_customer_profile(request.customer_phone)
+                
+                # Get conversation history
+                with trace.stage("history"):
+                    history = await self.get_conversation_history(
+                        request.customer_phone,
+                        request.merchant_id
+                    )
+                
+                # Detect language and cultural context
+                with trace.stage("language"):
+                    language_context = await self.language_detector.analyze(
+                        request.message.text,
+                        history,
+                        customer.preferred_language
+                    )
+                trace.set_labels(language=language_context.primary_language)
+                
+                # Extract intent
+                with trace.stage("intent"):
+                    intent = await self.intent_classifier.classify(
+                        text=request.message.text,
+                        language_context=language_context,
+                        conversation_history=history,
+                        merchant_context=merchant.business_type
+                    )
+                trace.set_labels(intent=intent.type)
+                
+                # Route to appropriate handler (LLM calls are timed separately as "llm")
+                with trace.stage("handler"):
+                    response = await self._route_conversation(
+                        request=request,
+                        intent=intent,
+                        language_context=language_context,
+                        merchant=merchant,
+                        customer=customer,
+                        history=history
+                    )
+                
+                # Store conversation
+                with trace.stage("store"):
+                    await self._store_conversation(
+                        request=request,
+                        response=response,
+                        intent=intent,
+                        processing_time=(datetime.utcnow() - start_time).total_seconds()
+                    )
+                
+                # Update analytics
+                with trace.stage("analytics"):
+                    await self.analytics.record_interaction(
+                        merchant_id=request.merchant_id,
+                        customer_phone=request.customer_phone,
+                        intent_type=intent.type,
+                        language=language_context.primary_language,
+                        response_time=(datetime.utcnow() - start_time).total_seconds()
+                    )
+                
+                return response
+                
+            except Exception as e:
+                logger.error(
+                    f"Error processing message (stage: {trace.failed_stage}): {str(e)}",
+                    exc_info=True
+                )
+                
+                # Generate fallback response
+                return ConversationResponse(
+                    text="Sorry, I'm having a small issue right now. Please give me a moment to get back to you! 🙏",
+                    language=Language.ENGLISH,
+                    intent_type=ConversationType.GENERAL_CHAT,
+                    confidence=0.5,
+                    requires_human=True
+                )
+    
+    async def _throttled_response(self, request: ConversationRequest, retry_after: float) -> ConversationResponse:
+        """
+        Canned reply for rate-limited messages, answered without the LLM
+
+        Only the first throttled message in a window gets the reply; later
+        ones get empty text, which the handlers do not send.
+        """
+        logger.info(f"Rate limited {request.customer_phone} (retry in {retry_after:.1f}s)")
+        
+        cached_customer = self.customer_cache.get(request.customer_phone)
+        language = (cached_customer.preferred_language if cached_customer else None) or Language.ENGLISH
+        notify = await self.rate_limiter.claim_throttle_notice(request.customer_phone)
+        
+        return ConversationResponse(
+            text=self.rate_limiter.throttled_reply(language) if notify else "",
+            language=language,
+            intent_type=ConversationType.GENERAL_CHAT,
+            confidence=1.0
+        )
     
     async def process_voice_message(self, request: ConversationRequest) -> ConversationResponse:
         """
@@ -176,7 +319,8 @@ class YarnMarketConversationEngine:
         """
         try:
             # Transcribe audio
-            voice_result = await self.voice_processor.process_voice_note(
+            voice_processor = await self.get_voice_processor()
+            voice_result = await voice_processor.process_voice_note(
                 audio_url=request.audio_url,
                 expected_languages=["pidgin", "english", "yoruba", "igbo", "hausa"]
             )
@@ -262,14 +406,18 @@ class YarnMarketConversationEngine:
     ) -> ConversationResponse:
         """Handle customer greetings"""
         
-        # Generate culturally appropriate greeting
-        greeting_text = await self.cultural_intelligence.generate_greeting(
-            language=language_context.primary_language,
-            time_of_day=datetime.now().hour,
-            customer_name=customer.name,
-            business_name=merchant.business_name,
-            formality_level=language_context.formality_level
-        )
+        # Use the merchant's own greeting if set, otherwise a culturally appropriate one
+        if merchant.greeting_message:
+            greeting_text = merchant.greeting_message
+        else:
+            greeting_text = await self.cultural_intelligence.generate_greeting(
+                language=language_context.primary_language,
+                time_of_day=datetime.now().hour,
+                customer_name=customer.name,
+                business_name=merchant.business_name,
+                formality_level=language_context.formality_level,
+                merchant_id=merchant.merchant_id
+            )
         
         # Add quick replies for common actions
         quick_replies = [
@@ -300,12 +448,11 @@ class YarnMarketConversationEngine:
         product_names = intent.product_names
         budget = intent.price_mentioned
         
-        # Get product recommendations
-        products = await self.database.get_products(
-            merchant_id=merchant.merchant_id,
-            category=None,
+        # Get product recommendations, searching the message itself when no product was extracted
+        products = await self.get_products(
+            merchant.merchant_id,
             max_price=budget,
-            search_terms=product_names
+            search_terms=product_names or [request.message.text]
         )
         
         if not products:
@@ -318,7 +465,8 @@ class YarnMarketConversationEngine:
             response_text = await self.cultural_intelligence.generate_product_showcase(
                 language=language_context.primary_language,
                 products=products[:3],  # Show top 3
-                customer_budget=budget
+                customer_budget=budget,
+                merchant_id=merchant.merchant_id
             )
         
         return ConversationResponse(
@@ -340,13 +488,15 @@ class YarnMarketConversationEngine:
     ) -> ConversationResponse:
         """Handle price negotiations using RL agent"""
         
-        # Get current negotiation state
-        negotiation_key = f"negotiation:{request.customer_phone}:{request.merchant_id}"
-        negotiation_data = await self.redis.get(negotiation_key)
+        # Apply the customer's offer atomically (existing negotiations take one round-trip)
+        negotiation_key = NegotiationStore.key(request.customer_phone, request.merchant_id)
+        negotiation_state = await self.negotiation_store.record_offer(
+            negotiation_key,
+            offer=intent.price_mentioned,
+            sentiment=intent.sentiment
+        )
         
-        if negotiation_data:
-            negotiation_state = NegotiationState.model_validate_json(negotiation_data)
-        else:
+        if negotiation_state is None:
             # Start new negotiation
             product_id = intent.entities.get("product_id")
             if not product_id:
@@ -357,24 +507,15 @@ class YarnMarketConversationEngine:
                     confidence=0.8
                 )
             
-            product = await self.database.get_product(product_id)
-            negotiation_state = NegotiationState(
+            product = await self.get_product(merchant.merchant_id, product_id)
+            negotiation_state = await self.negotiation_store.record_offer(
+                negotiation_key,
+                offer=intent.price_mentioned,
+                sentiment=intent.sentiment,
                 product_id=product_id,
                 original_price=product.price
             )
         
-        # Update negotiation with customer offer
-        if intent.price_mentioned:
-            negotiation_state.customer_offer = intent.price_mentioned
-            negotiation_state.round_number += 1
-            negotiation_state.customer_sentiment = intent.sentiment
-            
-            negotiation_state.add_offer(
-                offer=intent.price_mentioned,
-                sender="customer",
-                response=request.message.text
-            )
-        
         # Get negotiation strategy from RL agent
         strategy = await self.negotiation_agent.get_strategy(
             negotiation_state=negotiation_state,
@@ -387,33 +528,36 @@ class YarnMarketConversationEngine:
             strategy=strategy,
             negotiation_state=negotiation_state,
             language=language_context.primary_language,
-            merchant_personality=merchant.personality_traits
+            merchant_personality=merchant.personality_traits,
+            merchant_id=merchant.merchant_id
         )
         
-        # Update negotiation state
-        if strategy.counter_offer:
-            negotiation_state.current_counter = strategy.counter_offer
-            negotiation_state.add_offer(
-                offer=strategy.counter_offer,
-                sender="merchant",
-                response=response_text
-            )
+        action_type = strategy["action_type"]
+        counter_offer = strategy["counter_offer"]
         
-        # Store updated negotiation state
-        await self.redis.setex(
-            negotiation_key,
-            timedelta(hours=24),
-            negotiation_state.model_dump_json()
-        )
+        if action_type in ("accept", "reject"):
+            # The negotiation is over: record how it ended and start fresh next time
+            await self.negotiation_agent.record_negotiation_outcome(
+                negotiation_state,
+                outcome="accepted" if action_type == "accept" else "rejected",
+                final_price=counter_offer if action_type == "accept" else None,
+                customer_phone=request.customer_phone,
+                merchant_id=request.merchant_id
+            )
+            await self.negotiation_store.clear(negotiation_key)
+        elif counter_offer:
+            # Store the merchant counter offer
+            negotiation_state.current_counter = counter_offer
+            await self.negotiation_store.record_counter(negotiation_key, counter_offer)
         
         return ConversationResponse(
             text=response_text,
             language=language_context.primary_language,
             intent_type=ConversationType.PRICE_NEGOTIATION,
             confidence=0.85,
-            price_mentioned=strategy.counter_offer,
-            negotiation_stage=strategy.action_type,
-            quick_replies=strategy.suggested_replies
+            price_mentioned=counter_offer,
+            negotiation_stage=action_type,
+            quick_replies=strategy["suggested_replies"]
         )
     
     async def _handle_order_creation(
@@ -484,7 +628,8 @@ class YarnMarketConversationEngine:
             language=language_context.primary_language,
             complaint_text=request.message.text,
             sentiment=intent.sentiment,
-            business_name=merchant.business_name
+            business_name=merchant.business_name,
+            merchant_id=merchant.merchant_id
         )
         
         return ConversationResponse(
@@ -502,13 +647,30 @@ class YarnMarketConversationEngine:
         language_context: LanguageContext,
         merchant: MerchantSettings
     ) -> ConversationResponse:
-        """Handle general conversation"""
+        """Handle general conversation, answering routine questions without the LLM"""
+        
+        plan = self.response_planner.plan(
+            message=request.message.text,
+            language=language_context.primary_language,
+            merchant=merchant,
+            intent_confidence=intent.confidence
+        )
+        self.response_planner.record(plan.source)
+        
+        if not plan.needs_llm:
+            return ConversationResponse(
+                text=plan.text,
+                language=language_context.primary_language,
+                intent_type=ConversationType.GENERAL_CHAT,
+                confidence=plan.score
+            )
         
         response_text = await self.cultural_intelligence.generate_general_response(
             language=language_context.primary_language,
             customer_message=request.message.text,
             business_context=merchant.business_type,
-            personality=merchant.personality_traits
+            personality=merchant.personality_traits,
+            merchant_id=merchant.merchant_id
         )
         
         return ConversationResponse(
@@ -539,24 +701,76 @@ class YarnMarketConversationEngine:
         
         self.customer_cache[phone_number] = customer
         return customer
-    
+
+    async def get_products(
+        self,
+        merchant_id: str,
+        category: Optional[str] = None,
+        max_price: Optional[float] = None,
+        search_terms: Optional[List[str]] = None
+    ) -> List[Product]:
+        """Get products from the change-feed-backed catalog cache, ranked by search terms"""
+        if self.catalog_feed:
+            try:
+                products = await self.catalog.products(merchant_id, category=category, max_price=max_price)
+                if search_terms and self.product_search.has_merchant(merchant_id):
+                    query = " ".join(search_terms)
+                    matches = self.product_search.search(
+                        merchant_id,
+                        query,
+                        category=category,
+                        max_price=max_price
+                    )
+                    if not matches and self.vector_index and self.vector_index.has_merchant(merchant_id):
+                        # No shared words: try semantic similarity before giving up
+                        allowed = {product.id for product in products}
+                        matches = [
+                            product for product in self.vector_index.search(
+                                merchant_id, query, min_similarity=self.settings.vector_min_similarity
+                            )
+                            if product.id in allowed
+                        ]
+                    return matches
+                return products
+            except Exception as e:
+                logger.warning(f"Catalog unavailable for merchant {merchant_id}: {e}")
+
+        return await self.database.get_products(
+            merchant_id=merchant_id,
+            category=category,
+            max_price=max_price,
+            search_terms=search_terms
+        )
+
+    async def get_product(self, merchant_id: str, product_id: str) -> Optional[Product]:
+        """Get a single product, preferring the catalog cache"""
+        if self.catalog_feed:
+            try:
+                return await self.catalog.get_product(merchant_id, product_id)
+            except Exception as e:
+                logger.warning(f"Catalog unavailable for merchant {merchant_id}: {e}")
+
+        return await self.database.get_product(product_id)
+
     async def get_conversation_history(
         self,
         customer_phone: str,
         merchant_id: str,
         limit: int = 20
     ) -> List[Dict[str, Any]]:
-        """Get conversation history"""
-        cache_key = f"history:{customer_phone}:{merchant_id}"
+        """Get conversation history from shared Redis memory, seeding it from the database"""
+        conversation_id = f"{customer_phone}:{merchant_id}"
         
-        if cache_key in self.conversation_cache:
-            return self.conversation_cache[cache_key][-limit:]
+        history = await self.conversation_memory.get_records(conversation_id, limit)
+        if history:
+            return history
         
         history = await self.database.get_conversation_history(
             customer_phone, merchant_id, limit
         )
         
-        self.conversation_cache[cache_key] = history
+        if history:
+            await self.conversation_memory.append_records(conversation_id, *history)
         return history
     
     async def _store_conversation(
@@ -582,13 +796,11 @@ class YarnMarketConversationEngine:
         # Store in database
         await self.database.store_conversation(conversation_data)
         
-        # Update cache
-        cache_key = f"history:{request.customer_phone}:{request.merchant_id}"
-        if cache_key in self.conversation_cache:
-            self.conversation_cache[cache_key].append(conversation_data)
-            # Keep only recent messages
-            if len(self.conversation_cache[cache_key]) > self.settings.max_conversation_history:
-                self.conversation_cache[cache_key] = self.conversation_cache[cache_key][-self.settings.max_conversation_history:]
+        # Update shared memory (capped and expired in Redis)
+        await self.conversation_memory.append_records(
+            f"{request.customer_phone}:{request.merchant_id}",
+            conversation_data
+        )
     
     async def log_interaction(
         self,
@@ -606,6 +818,11 @@ class YarnMarketConversationEngine:
             requires_human=response.requires_human
         )
     
+    async def ingest_status_webhook(self, webhook_data: Dict[str, Any]) -> int:
+        """Buffer sent/delivered/read statuses from a WhatsApp webhook payload"""
+        updates = parse_status_updates(webhook_data)
+        return self.status_buffer.record_many(updates)
+    
     async def train_merchant_model(
         self,
         merchant_id: str,
@@ -624,8 +841,26 @@ class YarnMarketConversationEngine:
         """Get analytics for a merchant"""
         return await self.analytics.get_merchant_analytics(merchant_id, days)
     
+    async def get_analytics_summary(
+        self,
+        merchant_id: Optional[str] = None,
+        days: int = 7
+    ) -> Dict[str, Any]:
+        """Rollup analytics for one merchant, or across all merchants"""
+        return await self.analytics.get_summary(merchant_id, days)
+    
     async def cleanup(self):
         """Cleanup resources"""
+        if self.catalog_feed:
+            await self.catalog_feed.stop()
+        if self.vector_index:
+            await self.vector_index.flush()
+        if self.status_buffer:
+            await self.status_buffer.stop()
+        if self.analytics:
+            await self.analytics.close()
+        if self.voice_processor:
+            await self.voice_processor.close()
         if self.redis:
             await self.redis.close()
         
@@ -0,0 +1,113 @@
+"""
+Redis-backed conversation memory for YarnMarket AI
+Keeps recent turns per conversation in capped, expiring Redis lists shared by all replicas
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationMemory:
+    """
+    Conversation memory stored as Redis lists
+
+    Each conversation key holds its most recent entries (oldest first).
+    Writes cap the list with LTRIM and refresh its TTL so idle
+    conversations are evicted by Redis itself.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        max_entries: int = 20,
+        ttl_seconds: int = 7 * 24 * 3600,
+        key_prefix: str = "memory"
+    ):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+
+    def _key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}:{conversation_id}"
+
+    async def get(self, conversation_id: str, limit: Optional[int] = None) -> List[str]:
+        """Get the most recent entries for a conversation"""
+        limit = limit or self.max_entries
+        try:
+            entries = await self.redis.lrange(self._key(conversation_id), -limit, -1)
+            return [self._decode(e) for e in entries]
+        except Exception as e:
+            logger.warning(f"Conversation memory read failed for {conversation_id}: {e}")
+            return []
+
+    async def append(self, conversation_id: str, *entries: str):
+        """Append entries, cap the list and refresh its TTL in one round-trip"""
+        if not entries:
+            return
+        key = self._key(conversation_id)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(key, *entries)
+            pipe.ltrim(key, -self.max_entries, -1)
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Conversation memory write failed for {conversation_id}: {e}")
+
+    async def get_and_append(
+        self,
+        conversation_id: str,
+        entries: List[str],
+        limit: Optional[int] = None
+    ) -> List[str]:
+        """
+        Read the current context and append new entries in a single pipeline
+
+        Returns the context as it was before the append.
+        """
+        limit = limit or self.max_entries
+        key = self._key(conversation_id)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lrange(key, -limit, -1)
+            if entries:
+                pipe.rpush(key, *entries)
+                pipe.ltrim(key, -self.max_entries, -1)
+                pipe.expire(key, self.ttl_seconds)
+            results = await pipe.execute()
+            return [self._decode(e) for e in results[0]]
+        except Exception as e:
+            logger.warning(f"Conversation memory pipeline failed for {conversation_id}: {e}")
+            return []
+
+    async def get_records(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get entries stored as JSON records"""
+        records = []
+        for entry in await self.get(conversation_id, limit):
+            try:
+                records.append(json.loads(entry))
+            except ValueError:
+                continue
+        return records
+
+    async def append_records(self, conversation_id: str, *records: Dict[str, Any]):
+        """Append JSON records"""
+        await self.append(
+            conversation_id,
+            *(json.dumps(r, default=str) for r in records)
+        )
+
+    async def clear(self, conversation_id: str):
+        """Forget a conversation"""
+        try:
+            await self.redis.delete(self._key(conversation_id))
+        except Exception as e:
+            logger.warning(f"Conversation memory clear failed for {conversation_id}: {e}")
+
+    @staticmethod
+    def _decode(entry) -> str:
+        return entry.decode("utf-8") if isinstance(entry, bytes) else entry
@@ -4,12 +4,15 @@ Database connection and operations for YarnMarket AI
 
 import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 import asyncpg
-import motor.motor_asyncio
 from .config import Settings
 from .models import CustomerProfile, MerchantSettings, Product
 
+if TYPE_CHECKING:
+    # Only needed once MongoDB is enabled; importing motor costs ~0.1s at startup
+    import motor.motor_asyncio
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +22,7 @@ class Database:
     def __init__(self, database_url: str):
         self.database_url = database_url
         self.postgres_pool: Optional[asyncpg.Pool] = None
-        self.mongodb_client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+        self.mongodb_client: Optional["motor.motor_asyncio.AsyncIOMotorClient"] = None
         self.mongodb_db = None
     
     async def connect(self):
@@ -33,6 +36,7 @@ class Database:
             )
             
             # MongoDB connection (simplified for demo)
+            # import motor.motor_asyncio
             # self.mongodb_client = motor.motor_asyncio.AsyncIOMotorClient("mongodb://localhost:27017")
             # self.mongodb_db = self.mongodb_client.yarnmarket
             
@@ -119,6 +123,61 @@ class Database:
             
         return products
     
+    async def most_active_merchants(self, limit: int) -> List[str]:
+        """Ids of the active merchants with the most recent customer activity"""
+        rows = await self.postgres_pool.fetch("""
+            SELECT id
+            FROM merchants
+            WHERE COALESCE(status, 'active') = 'active'
+            ORDER BY last_activity DESC NULLS LAST, id
+            LIMIT $1
+        """, limit)
+        return [str(row['id']) for row in rows]
+    
+    async def fetch_catalog(
+        self,
+        merchant_id: str,
+        product_ids: Optional[List[str]] = None
+    ) -> List[Product]:
+        """
+        Load a merchant's active products from Postgres, or only the given ids
+
+        Products with variants are priced from their cheapest available variant
+        and counted in stock when any available variant has stock left.
+        """
+        rows = await self.postgres_pool.fetch("""
+            SELECT
+                p.id, p.merchant_id, p.name, p.description, p.category, p.product_type,
+                p.base_price, p.currency, p.image_url,
+                COUNT(v.id) AS variant_count,
+                MIN(v.price) FILTER (WHERE v.availability) AS variant_price,
+                SUM(v.stock_quantity) FILTER (WHERE v.availability) AS variant_stock
+            FROM products p
+            LEFT JOIN product_variants v ON v.product_id = p.id
+            WHERE p.merchant_id = $1
+              AND p.is_active
+              AND ($2::INT[] IS NULL OR p.id = ANY($2::INT[]))
+            GROUP BY p.id
+        """, int(merchant_id), [int(product_id) for product_id in product_ids] if product_ids is not None else None)
+
+        products = []
+        for row in rows:
+            has_variants = row['variant_count'] > 0
+            stock = row['variant_stock'] if has_variants else None
+            products.append(Product(
+                id=str(row['id']),
+                name=row['name'],
+                description=row['description'] or "",
+                price=float(row['variant_price'] if row['variant_price'] is not None else row['base_price']),
+                currency=row['currency'] or "NGN",
+                category=row['category'] or "Other",
+                in_stock=bool(stock) if has_variants else True,
+                stock_quantity=stock,
+                images=[row['image_url']] if row['image_url'] else [],
+                merchant_id=str(row['merchant_id'])
+            ))
+        return products
+
     async def get_product(self, product_id: str) -> Optional[Product]:
         """Get single product"""
         products = await self.get_products("demo")
@@ -0,0 +1,220 @@
+"""
+Merchant FAQ index for YarnMarket AI
+Fuzzy matching of customer questions against each merchant's auto-responses, tolerant of Pidgin/English variants and typos
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from .models import MerchantSettings
+from .product_search import normalize_terms
+from .telemetry import FAQ_MATCH_SCORE
+
+logger = logging.getLogger(__name__)
+
+# Question words folded onto one concept so "where una dey", "your address"
+# and "shop location" all index the same way
+FAQ_ALIASES = {
+    "where": "location", "address": "location", "located": "location", "locate": "location",
+    "direction": "location", "landmark": "location",
+    "hour": "hours", "time": "hours", "open": "hours", "opening": "hours", "close": "hours",
+    "closing": "hours", "clos": "hours",
+    "deliver": "delivery", "waybill": "delivery", "dispatch": "delivery", "ship": "delivery",
+    "shipping": "delivery", "transport": "delivery", "carry": "delivery",
+    "pay": "payment", "transfer": "payment", "pos": "payment", "account": "payment",
+    "refund": "return", "exchange": "return",
+    "cost": "price",
+}
+
+# A query term counts toward an indexed term when their bigram Dice similarity reaches this
+FUZZY_MIN_SIMILARITY = 0.6
+
+# auto_responses keys may list several phrasings: "delivery | una dey deliver? | waybill"
+VARIANT_SEPARATOR = "|"
+
+
+def faq_terms(text: str) -> List[str]:
+    """Normalized terms with question words folded onto their concept"""
+    return [FAQ_ALIASES.get(term, term) for term in normalize_terms(text)]
+
+
+def _bigrams(term: str) -> Set[str]:
+    padded = f"^{term}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+@dataclass
+class FaqEntry:
+    """One answer a merchant has configured"""
+    question: str
+    answer: str
+    source: str = "auto_responses"
+
+
+@dataclass
+class FaqMatch:
+    """Best FAQ answer for a message and how well it matched (0-1)"""
+    entry: FaqEntry
+    score: float
+
+
+def format_business_hours(business_hours: Dict[str, object]) -> Optional[str]:
+    """
+    Render MerchantSettings.business_hours for a reply
+
+    Values may be strings ("8am-6pm"), {"open": ..., "close": ...} objects,
+    or null/false/"closed" for closed days.
+    """
+    parts = []
+    for day, hours in business_hours.items():
+        if isinstance(hours, dict):
+            opens, closes = hours.get("open"), hours.get("close")
+            hours = f"{opens}-{closes}" if opens and closes else None
+        if not hours or str(hours).strip().lower() == "closed":
+            hours = "closed"
+        parts.append(f"{str(day).replace('_', ' ').title()} {hours}")
+    return f"🕗 Opening hours: {', '.join(parts)}" if parts else None
+
+
+def merchant_faq_entries(merchant: MerchantSettings) -> List[FaqEntry]:
+    """Every FAQ answer that can be derived from a merchant's settings"""
+    entries = [
+        FaqEntry(question=question, answer=answer)
+        for question, answer in merchant.auto_responses.items()
+        if question and answer
+    ]
+    if merchant.business_address:
+        entries.append(FaqEntry(
+            question="where is your shop location | address",
+            answer=f"📍 {merchant.business_name}: {merchant.business_address}",
+            source="business_address"
+        ))
+    hours = format_business_hours(merchant.business_hours)
+    if hours:
+        entries.append(FaqEntry(
+            question="opening hours | what time do you open | when do you close",
+            answer=hours,
+            source="business_hours"
+        ))
+    return entries
+
+
+class MerchantFaqIndex:
+    """
+    Bigram index over one merchant's FAQ phrasings
+
+    Each phrasing is reduced to a set of normalized terms. A message's terms
+    are matched to indexed terms exactly or by bigram similarity, and each
+    phrasing is scored by the harmonic mean of how much of it the message
+    covers and how much of the message it explains.
+    """
+
+    def __init__(self, entries: List[FaqEntry]):
+        self.entries = entries
+        self._variants: List[Tuple[int, frozenset]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+
+        for entry_index, entry in enumerate(entries):
+            for phrasing in entry.question.split(VARIANT_SEPARATOR):
+                terms = frozenset(faq_terms(phrasing))
+                if not terms:
+                    continue
+                variant = len(self._variants)
+                self._variants.append((entry_index, terms))
+                for term in terms:
+                    if term not in self._postings:
+                        for gram in _bigrams(term):
+                            self._grams[gram].add(term)
+                    self._postings[term].append(variant)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """The term if indexed, otherwise indexed terms spelled closely enough"""
+        if term in self._postings:
+            return [(term, 1.0)]
+        if len(term) < 3:
+            return []
+        query_grams = _bigrams(term)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] += 1
+        matches = []
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(query_grams) + len(candidate) + 1)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches.append((candidate, similarity))
+        return matches
+
+    def match(self, message: str) -> Optional[FaqMatch]:
+        terms = set(faq_terms(message))
+        if not terms or not self._variants:
+            return None
+
+        # Per phrasing: best similarity for each of its terms the message touches
+        covered: Dict[int, Dict[str, float]] = defaultdict(dict)
+        explained: Dict[int, float] = defaultdict(float)
+        for query_term in terms:
+            best_for_variant: Dict[int, float] = {}
+            for term, similarity in self._expand(query_term):
+                for variant in self._postings[term]:
+                    if similarity > covered[variant].get(term, 0.0):
+                        covered[variant][term] = similarity
+                    best_for_variant[variant] = max(best_for_variant.get(variant, 0.0), similarity)
+            for variant, similarity in best_for_variant.items():
+                explained[variant] += similarity
+
+        best: Optional[Tuple[float, int]] = None
+        for variant, term_scores in covered.items():
+            variant_terms = self._variants[variant][1]
+            question_coverage = sum(term_scores.values()) / len(variant_terms)
+            message_coverage = min(explained[variant] / len(terms), 1.0)
+            # Harmonic mean: a phrasing that is one concept ("what time do you
+            # open" is just "hours") must also explain the message, so "I no
+            # get time" or "what time is it in london" cannot pass on "time"
+            score = 2 * question_coverage * message_coverage / (question_coverage + message_coverage)
+            if best is None or score > best[0]:
+                best = (score, variant)
+
+        if best is None:
+            return None
+        score, variant = best
+        return FaqMatch(entry=self.entries[self._variants[variant][0]], score=score)
+
+
+class FaqIndex:
+    """
+    Per-merchant FAQ indexes built from merchant settings
+
+    An index is rebuilt only when the merchant's settings object changes, so
+    repeat questions cost a dictionary lookup plus a few set operations.
+    """
+
+    def __init__(self):
+        self._merchants: Dict[str, Tuple[MerchantSettings, MerchantFaqIndex]] = {}
+
+    def for_merchant(self, merchant: MerchantSettings) -> MerchantFaqIndex:
+        cached = self._merchants.get(merchant.merchant_id)
+        if cached is None or cached[0] is not merchant:
+            index = MerchantFaqIndex(merchant_faq_entries(merchant))
+            cached = self._merchants[merchant.merchant_id] = (merchant, index)
+            logger.debug(f"Indexed {len(index)} FAQ answers for merchant {merchant.merchant_id}")
+        return cached[1]
+
+    def match(self, merchant: MerchantSettings, message: str) -> Optional[FaqMatch]:
+        """Best FAQ answer for a message, with its match score"""
+        faq_match = self.for_merchant(merchant).match(message)
+        if faq_match:
+            FAQ_MATCH_SCORE.observe(faq_match.score)
+        return faq_match
+
+    def invalidate(self, merchant_id: Optional[str] = None):
+        if merchant_id is None:
+            self._merchants.clear()
+        else:
+            self._merchants.pop(merchant_id, None)
@@ -0,0 +1,267 @@
+"""
+WhatsApp message status ingestion for YarnMarket AI
+Coalesces sent/delivered/read/failed callbacks in memory and flushes them to Postgres in bulk
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Later states win when several callbacks arrive for the same message
+STATUS_RANK = {
+    "sent": 1,
+    "delivered": 2,
+    "read": 3,
+    "failed": 4,
+}
+
+# SQL for a status column's rank, so same-second callbacks cannot downgrade a stored status
+_RANK_CASE = "CASE {} " + " ".join(f"WHEN '{status}' THEN {rank}" for status, rank in STATUS_RANK.items()) + " ELSE 0 END"
+
+# Flushes a status is kept for when its message row has not been written yet
+UNMATCHED_RETRIES = 3
+
+# status_updated_at stays NULL: callback timestamps are whole seconds and must not lose to our clock
+OUTBOUND_INSERT_SQL = """
+    INSERT INTO messages (
+        merchant_id, customer_phone, message_text, message_type,
+        status, direction, whatsapp_message_id
+    )
+    VALUES ($1, $2, $3, $4, 'sent', 'outbound', $5)
+    ON CONFLICT (whatsapp_message_id) WHERE whatsapp_message_id IS NOT NULL DO NOTHING
+"""
+
+
+@dataclass
+class MessageStatusUpdate:
+    """Single status callback for an outgoing WhatsApp message"""
+    message_id: str
+    status: str
+    timestamp: datetime
+    recipient: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+    @property
+    def rank(self) -> int:
+        return STATUS_RANK.get(self.status, 0)
+
+
+def parse_status_updates(webhook_data: Dict[str, Any]) -> List[MessageStatusUpdate]:
+    """
+    Extract status callbacks from a WhatsApp webhook payload
+
+    Args:
+        webhook_data (Dict): Webhook payload from Meta
+
+    Returns:
+        List[MessageStatusUpdate]: Parsed status updates
+    """
+    updates: List[MessageStatusUpdate] = []
+
+    if webhook_data.get('object') != 'whatsapp_business_account':
+        return updates
+
+    for entry in webhook_data.get('entry', []):
+        for change in entry.get('changes', []):
+            if change.get('field') != 'messages':
+                continue
+
+            for status in change.get('value', {}).get('statuses', []):
+                message_id = status.get('id')
+                status_name = status.get('status')
+                if not message_id or status_name not in STATUS_RANK:
+                    continue
+
+                try:
+                    timestamp = datetime.utcfromtimestamp(int(status.get('timestamp', 0)))
+                except (TypeError, ValueError):
+                    timestamp = datetime.utcnow()
+
+                errors = status.get('errors') or []
+                updates.append(MessageStatusUpdate(
+                    message_id=message_id,
+                    status=status_name,
+                    timestamp=timestamp,
+                    recipient=status.get('recipient_id'),
+                    error=errors[0].get('title') if errors else None
+                ))
+
+    return updates
+
+
+class MessageStatusBuffer:
+    """
+    In-memory buffer that keeps only the latest status per message ID
+    and periodically writes the survivors with one bulk UPDATE
+    """
+
+    def __init__(
+        self,
+        postgres_pool=None,
+        flush_interval: float = 2.0,
+        batch_size: int = 500,
+        max_pending: int = 50000
+    ):
+        self.postgres_pool = postgres_pool
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self._pending: Dict[str, MessageStatusUpdate] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        # Counters for observability
+        self.received = 0
+        self.coalesced = 0
+        self.written = 0
+
+    async def start(self, postgres_pool=None):
+        """Start the periodic flush loop"""
+        if postgres_pool is not None:
+            self.postgres_pool = postgres_pool
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            logger.info("📬 Message status buffer started")
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def record(self, update: MessageStatusUpdate):
+        """Merge a status update into the buffer"""
+        self.received += 1
+        current = self._pending.get(update.message_id)
+
+        if current is not None:
+            self.coalesced += 1
+            if (update.rank, update.timestamp) <= (current.rank, current.timestamp):
+                return
+        elif len(self._pending) >= self.max_pending:
+            logger.warning(f"Status buffer full ({self.max_pending}), dropping update for {update.message_id}")
+            return
+
+        self._pending[update.message_id] = update
+
+    async def record_sent(
+        self,
+        whatsapp_message_id: str,
+        customer_phone: str,
+        text: str,
+        merchant_id: Optional[int] = None,
+        message_type: str = "text"
+    ):
+        """Store an outbound message under the wamid its status callbacks will refer to"""
+        if not self.postgres_pool or not whatsapp_message_id:
+            return
+        async with self.postgres_pool.acquire() as conn:
+            await conn.execute(
+                OUTBOUND_INSERT_SQL,
+                merchant_id, customer_phone, text, message_type, whatsapp_message_id
+            )
+
+    def record_many(self, updates: List[MessageStatusUpdate]) -> int:
+        """Merge several status updates, returning how many were seen"""
+        for update in updates:
+            self.record(update)
+        return len(updates)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Write all buffered statuses to Postgres"""
+        async with self._flush_lock:
+            if not self._pending or not self.postgres_pool:
+                return 0
+
+            batch = list(self._pending.values())
+            self._pending = {}
+
+            written = 0
+            for start in range(0, len(batch), self.batch_size):
+                chunk = batch[start:start + self.batch_size]
+                try:
+                    matched = await self._write_chunk(chunk)
+                    written += len(matched)
+                    self._requeue_unmatched(chunk, matched)
+                except Exception as e:
+                    logger.error(f"Failed to flush {len(chunk)} message statuses: {e}")
+                    # Put the rest back so the next flush retries them
+                    for update in batch[start:]:
+                        self._requeue(update)
+                    break
+
+            self.written += written
+            return written
+
+    def _requeue_unmatched(self, chunk: List[MessageStatusUpdate], matched: Set[str]):
+        """
+        Keep statuses whose message row is missing for a few more flushes
+
+        A callback can overtake the INSERT of the message it refers to. Rows
+        whose status was already newer also come back unmatched; retrying
+        those is harmless and they are dropped after UNMATCHED_RETRIES.
+        """
+        for update in chunk:
+            if update.message_id in matched or update.attempts >= UNMATCHED_RETRIES:
+                continue
+            update.attempts += 1
+            self._requeue(update)
+
+    def _requeue(self, update: MessageStatusUpdate):
+        """Return an unwritten update to the buffer without counting it as received again"""
+        current = self._pending.get(update.message_id)
+        if current is None or (update.rank, update.timestamp) > (current.rank, current.timestamp):
+            self._pending[update.message_id] = update
+
+    async def _write_chunk(self, chunk: List[MessageStatusUpdate]) -> Set[str]:
+        """Apply one chunk of statuses with a single UPDATE ... FROM (VALUES ...), returning the matched IDs"""
+        values = []
+        params: List[Any] = []
+        for i, update in enumerate(chunk):
+            base = i * 4
+            values.append(f"(${base + 1}::text, ${base + 2}::text, ${base + 3}::timestamp, ${base + 4}::text)")
+            params.extend([update.message_id, update.status, update.timestamp, update.error])
+
+        query = f"""
+            UPDATE messages AS m
+            SET
+                status = v.status,
+                status_updated_at = v.updated_at,
+                error_message = COALESCE(v.error, m.error_message)
+            FROM (VALUES {', '.join(values)}) AS v(message_id, status, updated_at, error)
+            WHERE m.whatsapp_message_id = v.message_id
+              AND (
+                  m.status_updated_at IS NULL
+                  OR m.status_updated_at < v.updated_at
+                  OR (m.status_updated_at = v.updated_at AND {_RANK_CASE.format("m.status")} <= {_RANK_CASE.format("v.status")})
+              )
+            RETURNING m.whatsapp_message_id
+        """
+
+        async with self.postgres_pool.acquire() as conn:
+            rows = await conn.fetch(query, *params)
+        return {row['whatsapp_message_id'] for row in rows}
+
+    async def _flush_loop(self):
+        """Background loop flushing on a fixed interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Message status flush loop error: {e}")
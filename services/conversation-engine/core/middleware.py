@@ -1,13 +1,12 @@
 """
-FastAPI middleware for YarnMarket AI
+ASGI middleware for YarnMarket AI
 """
 
+import random
 import time
 import logging
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 from prometheus_client import Counter, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
@@ -25,55 +24,65 @@ REQUEST_DURATION = Histogram(
 )
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for request logging and metrics"""
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-
-        # Process request
-        response = await call_next(request)
-
-        # Calculate duration
-        duration = time.time() - start_time
-
-        # Log request
-        logger.info(
-            f"{request.method} {request.url.path} - "
-            f"{response.status_code} - {duration:.3f}s"
-        )
-
-        # Update metrics
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status_code=response.status_code
-        ).inc()
-
-        REQUEST_DURATION.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(duration)
-
-        return response
-
-
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    """Middleware for Prometheus metrics collection"""
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Skip metrics collection for /metrics endpoint
-        if request.url.path == "/metrics":
-            return await call_next(request)
-
-        start_time = time.time()
-        response = await call_next(request)
-        duration = time.time() - start_time
-
-        # Record metrics
-        REQUEST_DURATION.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(duration)
-
-        return response
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware for request metrics and sampled request logging
+
+    Requests are labelled by route template (e.g. /conversation/{customer_phone}/history)
+    rather than the raw path, so path parameters never create new metric series.
+    Every request is observed once; only a sample of successful requests is logged,
+    while server errors and slow requests are always logged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        log_sample_rate: float = 0.05,
+        slow_request_threshold: float = 1.0,
+        excluded_paths: tuple = ("/metrics",)
+    ):
+        self.app = app
+        self.log_sample_rate = log_sample_rate
+        self.slow_request_threshold = slow_request_threshold
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            method = scope["method"]
+
+            # The router stores the matched route on the scope
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+
+            REQUEST_COUNT.labels(
+                method=method,
+                endpoint=endpoint,
+                status_code=status_code
+            ).inc()
+            REQUEST_DURATION.labels(
+                method=method,
+                endpoint=endpoint
+            ).observe(duration)
+
+            if (
+                status_code >= 500
+                or duration >= self.slow_request_threshold
+                or random.random() < self.log_sample_rate
+            ):
+                logger.info(f"{method} {scope['path']} - {status_code} - {duration:.3f}s")
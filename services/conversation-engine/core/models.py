@@ -2,7 +2,7 @@
 Pydantic models for the conversation engine
 """
 
-from typing import Optional, List, Dict, Any, Literal
+from typing import Annotated, Optional, List, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -89,6 +89,7 @@ class MerchantSettings(BaseModel):
     business_name: str
     business_type: str
     phone_number: str
+    business_address: Optional[str] = None
 
     # Pricing rules
     min_discount_percentage: float = 0.0
@@ -238,3 +239,23 @@ class ConversationMetrics(BaseModel):
     total_revenue: float
     average_order_value: float
     negotiation_success_rate: float
+
+
+class NegotiationTurn(BaseModel):
+    """One historical negotiation turn to replay"""
+    original_price: float = Field(ge=0)
+    customer_offer: Optional[float] = None
+    round_number: int = Field(default=1, ge=1)
+    cost_price: Optional[float] = None
+
+
+# A fraction of the price, as min_profit_margin and persistence are used
+UnitFraction = Annotated[float, Field(ge=0, lt=1)]
+
+
+class NegotiationSimulationRequest(BaseModel):
+    """What-if replay of negotiation turns across pricing parameters"""
+    # Bounded because the endpoint is unauthenticated: work is turns x margins x persistence values
+    turns: List[NegotiationTurn] = Field(min_length=1, max_length=5000)
+    min_profit_margins: List[UnitFraction] = Field(default=[0.05, 0.1, 0.15, 0.2], min_length=1, max_length=20)
+    persistence_values: List[UnitFraction] = Field(default=[0.3, 0.5, 0.7, 0.9], min_length=1, max_length=20)
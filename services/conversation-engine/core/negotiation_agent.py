@@ -3,16 +3,213 @@ Simplified Negotiation Agent for Price Negotiation
 Basic haggling system for Nigerian market interactions (MVP version)
 """
 
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Sequence
+import itertools
 import logging
-import random
-from datetime import datetime, timedelta
+
+import numpy as np
 
 from .models import NegotiationState, MerchantSettings, CustomerProfile
 from .config import Settings
+from .negotiation_outcomes import NEW_CUSTOMER_STATS, NegotiationOutcome, NegotiationOutcomeStore
 
 logger = logging.getLogger(__name__)
 
+# Action codes used by the vectorized strategy; index into ACTIONS for names
+ACTIONS = ("counter", "accept", "bundle", "reject")
+COUNTER, ACCEPT, BUNDLE, REJECT = range(len(ACTIONS))
+
+DEFAULT_PERSISTENCE = 0.7
+
+
+def _patience(persistence: float) -> int:
+    """
+    Rounds a merchant holds out before compromising
+
+    The default persistence of 0.7 gives 2: bundles are offered up to round 2,
+    the merchant compromises from round 3 and rejects lowballs from round 4.
+    """
+    return round(persistence * 3)
+
+
+def decide_offer(
+    original_price: float,
+    customer_offer: Optional[float],
+    round_number: int,
+    min_profit_margin: float,
+    persistence: float = DEFAULT_PERSISTENCE
+) -> Tuple[str, Optional[float]]:
+    """Pick the action and counter offer for one negotiation turn"""
+    patience = _patience(persistence)
+
+    # Calculate minimum acceptable price based on merchant rules
+    cost_price = original_price * (1 - min_profit_margin)
+    min_acceptable = cost_price * 1.05  # 5% minimum profit
+
+    # Negotiation logic
+    if customer_offer is None:
+        # First interaction - start with slight discount
+        counter_offer = original_price * 0.95
+        action_type = "counter"
+
+    elif customer_offer >= original_price * 0.9:
+        # Good offer - accept or minor counter
+        if customer_offer >= original_price * 0.95:
+            action_type = "accept"
+            counter_offer = customer_offer
+        else:
+            action_type = "counter"
+            counter_offer = original_price * 0.92
+
+    elif customer_offer >= min_acceptable:
+        # Acceptable range - negotiate based on round
+        if round_number >= patience + 1:
+            # Getting tired, more willing to compromise
+            counter_offer = (customer_offer + min_acceptable * 1.1) / 2
+            action_type = "counter"
+        else:
+            # Still negotiating
+            counter_offer = original_price * (0.85 - (round_number * 0.05))
+            action_type = "counter"
+
+    elif customer_offer >= min_acceptable * 0.85:
+        # Low but possible - try bundle or reject
+        if round_number <= patience:
+            # Suggest bundle deal
+            action_type = "bundle"
+            counter_offer = customer_offer * 1.15
+        else:
+            # Final counter
+            action_type = "counter"
+            counter_offer = min_acceptable * 1.02
+
+    else:
+        # Too low - reject
+        if round_number >= patience + 2:
+            action_type = "reject"
+            counter_offer = None
+        else:
+            action_type = "counter"
+            counter_offer = original_price * 0.8
+
+    # Ensure counter offer is not below minimum
+    if counter_offer and counter_offer < min_acceptable:
+        counter_offer = min_acceptable
+
+    return action_type, counter_offer
+
+
+def decide_offers(
+    original_price: np.ndarray,
+    customer_offer: np.ndarray,
+    round_number: np.ndarray,
+    min_profit_margin: float,
+    persistence: float = DEFAULT_PERSISTENCE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    decide_offer over whole arrays of turns at once
+
+    customer_offer uses NaN for "no offer yet". Returns action codes (see
+    ACTIONS) and counter offers, NaN where decide_offer returns None. Every
+    branch repeats the scalar arithmetic in the same order, so results match
+    decide_offer exactly.
+    """
+    original_price = np.asarray(original_price, dtype=np.float64)
+    customer_offer = np.asarray(customer_offer, dtype=np.float64)
+    round_number = np.asarray(round_number)
+    patience = _patience(persistence)
+
+    cost_price = original_price * (1 - min_profit_margin)
+    min_acceptable = cost_price * 1.05
+
+    no_offer = np.isnan(customer_offer)
+    good = customer_offer >= original_price * 0.9
+    great = customer_offer >= original_price * 0.95
+    acceptable = customer_offer >= min_acceptable
+    possible = customer_offer >= min_acceptable * 0.85
+    tired = round_number >= patience + 1
+    early = round_number <= patience
+    done = round_number >= patience + 2
+
+    branches = [
+        no_offer,
+        good & great,
+        good,
+        acceptable & tired,
+        acceptable,
+        possible & early,
+        possible,
+        done,
+    ]
+    with np.errstate(invalid="ignore"):
+        counters = [
+            original_price * 0.95,
+            customer_offer,
+            original_price * 0.92,
+            (customer_offer + min_acceptable * 1.1) / 2,
+            original_price * (0.85 - (round_number * 0.05)),
+            customer_offer * 1.15,
+            min_acceptable * 1.02,
+            np.full_like(original_price, np.nan),
+        ]
+    actions = [COUNTER, ACCEPT, COUNTER, COUNTER, COUNTER, BUNDLE, COUNTER, REJECT]
+
+    action = np.select(branches, actions, default=COUNTER)
+    counter = np.select(branches, counters, default=original_price * 0.8)
+
+    with np.errstate(invalid="ignore"):
+        below = (counter != 0) & ~np.isnan(counter) & (counter < min_acceptable)
+    counter = np.where(below, min_acceptable, counter)
+    return action, counter
+
+
+def simulate_negotiations(
+    original_price: Sequence[float],
+    customer_offer: Sequence[Optional[float]],
+    round_number: Sequence[int],
+    min_profit_margins: Sequence[float],
+    persistence_values: Sequence[float],
+    cost_price: Optional[Sequence[float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Replay historical negotiation turns under every (margin, persistence) pair
+
+    Reports, per grid point, how often each action would be taken, the
+    average discount on turns that would be accepted and the average margin
+    on those sales. Without cost_price, cost is derived from each grid
+    point's margin the same way the strategy derives it.
+    """
+    original_price = np.asarray(original_price, dtype=np.float64)
+    offers = np.array([np.nan if offer is None else offer for offer in customer_offer], dtype=np.float64)
+    round_number = np.asarray(round_number, dtype=np.int64)
+    known_cost = np.asarray(cost_price, dtype=np.float64) if cost_price is not None else None
+    total = len(original_price)
+
+    results = []
+    for margin, persistence in itertools.product(min_profit_margins, persistence_values):
+        action, counter = decide_offers(original_price, offers, round_number, margin, persistence)
+        # Free items have no meaningful discount or margin
+        accepted = (action == ACCEPT) & (original_price > 0) & (counter > 0)
+        cost = known_cost if known_cost is not None else original_price * (1 - margin)
+
+        sale_price = counter[accepted]
+        discount = 1 - sale_price / original_price[accepted]
+        sale_margin = (sale_price - cost[accepted]) / sale_price
+        rates = np.bincount(action, minlength=len(ACTIONS)) / total if total else np.zeros(len(ACTIONS))
+
+        results.append({
+            "min_profit_margin": float(margin),
+            "persistence": float(persistence),
+            "negotiations": total,
+            "acceptance_rate": float(rates[ACCEPT]),
+            "counter_rate": float(rates[COUNTER]),
+            "bundle_rate": float(rates[BUNDLE]),
+            "rejection_rate": float(rates[REJECT]),
+            "avg_discount": float(discount.mean()) if accepted.any() else 0.0,
+            "avg_margin": float(sale_margin.mean()) if accepted.any() else 0.0,
+        })
+    return results
+
 
 class HagglingAgent:
     """
@@ -20,9 +217,9 @@ class HagglingAgent:
     instead of machine learning for MVP
     """
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, outcome_store: Optional[NegotiationOutcomeStore] = None):
         self.settings = settings
-        self.negotiation_history: Dict[str, List[Dict]] = {}
+        self.outcome_store = outcome_store
         
     async def initialize(self):
         """Initialize the negotiation agent"""
@@ -42,60 +239,13 @@ class HagglingAgent:
         customer_offer = negotiation_state.customer_offer
         round_number = negotiation_state.round_number
         
-        # Calculate minimum acceptable price based on merchant rules
-        min_profit_margin = merchant_rules.min_profit_margin or 0.1
-        cost_price = original_price * (1 - min_profit_margin)
-        min_acceptable = cost_price * 1.05  # 5% minimum profit
-        
-        # Negotiation logic
-        if customer_offer is None:
-            # First interaction - start with slight discount
-            counter_offer = original_price * 0.95
-            action_type = "counter"
-            
-        elif customer_offer >= original_price * 0.9:
-            # Good offer - accept or minor counter
-            if customer_offer >= original_price * 0.95:
-                action_type = "accept"
-                counter_offer = customer_offer
-            else:
-                action_type = "counter"
-                counter_offer = original_price * 0.92
-                
-        elif customer_offer >= min_acceptable:
-            # Acceptable range - negotiate based on round
-            if round_number >= 3:
-                # Getting tired, more willing to compromise
-                counter_offer = (customer_offer + min_acceptable * 1.1) / 2
-                action_type = "counter"
-            else:
-                # Still negotiating
-                counter_offer = original_price * (0.85 - (round_number * 0.05))
-                action_type = "counter"
-                
-        elif customer_offer >= min_acceptable * 0.85:
-            # Low but possible - try bundle or reject
-            if round_number <= 2:
-                # Suggest bundle deal
-                action_type = "bundle"
-                counter_offer = customer_offer * 1.15
-            else:
-                # Final counter
-                action_type = "counter"
-                counter_offer = min_acceptable * 1.02
-                
-        else:
-            # Too low - reject
-            if round_number >= 4:
-                action_type = "reject"
-                counter_offer = None
-            else:
-                action_type = "counter"
-                counter_offer = original_price * 0.8
-        
-        # Ensure counter offer is not below minimum
-        if counter_offer and counter_offer < min_acceptable:
-            counter_offer = min_acceptable
+        action_type, counter_offer = decide_offer(
+            original_price,
+            customer_offer,
+            round_number,
+            min_profit_margin=getattr(merchant_rules, "min_profit_margin", None) or self.settings.min_profit_margin,
+            persistence=merchant_rules.personality_traits.get("persistence", DEFAULT_PERSISTENCE)
+        )
         
         # Generate appropriate quick replies based on action
         quick_replies = self._generate_quick_replies(action_type, counter_offer, original_price)
@@ -151,53 +301,32 @@ class HagglingAgent:
         negotiation_state: NegotiationState,
         outcome: str,
         final_price: Optional[float] = None,
-        customer_satisfaction: float = 0.5
+        customer_satisfaction: float = 0.5,
+        customer_phone: str = "unknown",
+        merchant_id: str = "unknown"
     ):
         """Record the outcome of a negotiation for future learning"""
+        original_price = negotiation_state.original_price
+        record = NegotiationOutcome(
+            merchant_id=merchant_id,
+            customer_phone=customer_phone,
+            product_id=negotiation_state.product_id,
+            original_price=original_price,
+            customer_offer=negotiation_state.customer_offer,
+            final_price=final_price,
+            rounds=negotiation_state.round_number,
+            outcome=outcome,  # 'accepted', 'rejected', 'abandoned'
+            discount=(original_price - final_price) / original_price if final_price and original_price else 0,
+            customer_satisfaction=customer_satisfaction
+        )
         
-        customer_phone = negotiation_state.customer_phone if hasattr(negotiation_state, 'customer_phone') else 'unknown'
-        
-        if customer_phone not in self.negotiation_history:
-            self.negotiation_history[customer_phone] = []
-        
-        record = {
-            'timestamp': datetime.utcnow(),
-            'original_price': negotiation_state.original_price,
-            'customer_offer': negotiation_state.customer_offer,
-            'final_price': final_price,
-            'rounds': negotiation_state.round_number,
-            'outcome': outcome,  # 'accepted', 'rejected', 'abandoned'
-            'discount_given': (negotiation_state.original_price - final_price) / negotiation_state.original_price if final_price else 0,
-            'customer_satisfaction': customer_satisfaction
-        }
-        
-        self.negotiation_history[customer_phone].append(record)
-        
-        # Keep only recent history (last 50 negotiations per customer)
-        if len(self.negotiation_history[customer_phone]) > 50:
-            self.negotiation_history[customer_phone] = self.negotiation_history[customer_phone][-50:]
+        if self.outcome_store:
+            await self.outcome_store.record(record)
         
         logger.info(f"Recorded negotiation outcome: {outcome} for customer {customer_phone}")
     
-    def get_customer_negotiation_stats(self, customer_phone: str) -> Dict[str, Any]:
+    async def get_customer_negotiation_stats(self, customer_phone: str) -> Dict[str, Any]:
         """Get negotiation statistics for a specific customer"""
-        
-        if customer_phone not in self.negotiation_history:
-            return {
-                'total_negotiations': 0,
-                'avg_rounds': 0,
-                'avg_discount': 0,
-                'success_rate': 0,
-                'customer_type': 'new'
-            }
-        
-        history = self.negotiation_history[customer_phone]
-        successful = [h for h in history if h['outcome'] == 'accepted']
-        
-        return {
-            'total_negotiations': len(history),
-            'avg_rounds': sum(h['rounds'] for h in history) / len(history),
-            'avg_discount': sum(h['discount_given'] for h in successful) / len(successful) if successful else 0,
-            'success_rate': len(successful) / len(history) if history else 0,
-            'customer_type': 'experienced' if len(history) > 5 else 'regular' if len(history) > 2 else 'new'
-        }
\ No newline at end of file
+        if not self.outcome_store:
+            return dict(NEW_CUSTOMER_STATS)
+        return await self.outcome_store.stats(customer_phone)
@@ -0,0 +1,155 @@
+"""
+Negotiation outcome storage for YarnMarket AI
+Keeps running per-customer aggregates in Redis hashes and streams raw outcomes to analytics
+"""
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NegotiationOutcome:
+    """How one negotiation ended"""
+    merchant_id: str
+    customer_phone: str
+    product_id: str
+    original_price: float
+    customer_offer: Optional[float]
+    final_price: Optional[float]
+    rounds: int
+    outcome: str  # accepted, rejected, abandoned
+    discount: float = 0.0
+    customer_satisfaction: float = 0.5
+    event_time: datetime = field(default_factory=datetime.utcnow)
+
+
+OUTCOME_COLUMNS = [f.name for f in fields(NegotiationOutcome)]
+
+NEW_CUSTOMER_STATS = {
+    'total_negotiations': 0,
+    'avg_rounds': 0,
+    'avg_discount': 0,
+    'success_rate': 0,
+    'customer_type': 'new'
+}
+
+OUTCOMES_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    merchant_id LowCardinality(String),
+    customer_phone String,
+    product_id String,
+    original_price Float64,
+    customer_offer Nullable(Float64),
+    final_price Nullable(Float64),
+    rounds UInt16,
+    outcome LowCardinality(String),
+    discount Float32,
+    customer_satisfaction Float32,
+    event_time DateTime64(3)
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(event_time)
+ORDER BY (merchant_id, event_time)
+TTL toDateTime(event_time) + INTERVAL {retention_days} DAY
+"""
+
+# KEYS[1] = stats hash, KEYS[2] = recent outcomes list
+# ARGV = ttl, rounds, accepted (0/1), discount, satisfaction, outcome json, recent limit
+# Aggregates are only ever incremented, so a stats lookup is one HGETALL.
+RECORD_OUTCOME_SCRIPT = """
+local ttl = tonumber(ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'count', 1)
+redis.call('HINCRBY', KEYS[1], 'rounds_sum', ARGV[2])
+redis.call('HINCRBYFLOAT', KEYS[1], 'satisfaction_sum', ARGV[5])
+if ARGV[3] == '1' then
+    redis.call('HINCRBY', KEYS[1], 'successes', 1)
+    redis.call('HINCRBYFLOAT', KEYS[1], 'discount_sum', ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+
+redis.call('LPUSH', KEYS[2], ARGV[6])
+redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[7]) - 1)
+redis.call('EXPIRE', KEYS[2], ttl)
+return 1
+"""
+
+
+class NegotiationOutcomeStore:
+    """
+    Shared, bounded record of negotiation outcomes per customer
+
+    Each outcome updates the customer's running totals and a capped list of
+    their most recent outcomes in one atomic script, and is queued on the
+    analytics sink (if any) for offline learning.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        sink=None,
+        recent_limit: int = 50,
+        ttl_seconds: int = 180 * 24 * 3600
+    ):
+        self.redis = redis_client
+        self.sink = sink
+        self.recent_limit = recent_limit
+        self.ttl_seconds = ttl_seconds
+        self._record_outcome = redis_client.register_script(RECORD_OUTCOME_SCRIPT)
+
+    @staticmethod
+    def stats_key(customer_phone: str) -> str:
+        return f"negotiation_stats:{customer_phone}"
+
+    @staticmethod
+    def recent_key(customer_phone: str) -> str:
+        return f"negotiation_outcomes:{customer_phone}"
+
+    async def record(self, outcome: NegotiationOutcome):
+        record = asdict(outcome)
+        record["event_time"] = outcome.event_time.isoformat()
+        await self._record_outcome(
+            keys=[self.stats_key(outcome.customer_phone), self.recent_key(outcome.customer_phone)],
+            args=[
+                self.ttl_seconds,
+                outcome.rounds,
+                1 if outcome.outcome == "accepted" else 0,
+                repr(float(outcome.discount)),
+                repr(float(outcome.customer_satisfaction)),
+                json.dumps(record),
+                self.recent_limit
+            ]
+        )
+        if self.sink:
+            self.sink.add(outcome)
+
+    async def stats(self, customer_phone: str) -> Dict[str, Any]:
+        """Negotiation statistics for a customer from their running totals"""
+        raw = await self.redis.hgetall(self.stats_key(customer_phone))
+        totals = {
+            (name.decode("utf-8") if isinstance(name, bytes) else name): float(value)
+            for name, value in raw.items()
+        }
+        count = int(totals.get("count", 0))
+        successes = int(totals.get("successes", 0))
+
+        if not count:
+            return dict(NEW_CUSTOMER_STATS)
+
+        return {
+            'total_negotiations': count,
+            'avg_rounds': totals.get("rounds_sum", 0.0) / count,
+            'avg_discount': totals.get("discount_sum", 0.0) / successes if successes else 0,
+            'success_rate': successes / count,
+            'customer_type': 'experienced' if count > 5 else 'regular' if count > 2 else 'new'
+        }
+
+    async def recent(self, customer_phone: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent outcomes for a customer, newest first"""
+        limit = limit or self.recent_limit
+        items = await self.redis.lrange(self.recent_key(customer_phone), 0, limit - 1)
+        return [json.loads(item) for item in items]
@@ -0,0 +1,139 @@
+"""
+Negotiation state storage for YarnMarket AI
+Keeps each negotiation as a compact Redis hash updated atomically by Lua scripts
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .models import NegotiationState
+
+logger = logging.getLogger(__name__)
+
+
+# KEYS[1] = negotiation hash
+# ARGV = ttl, offer, sentiment, product_id, original_price, started_at
+# Creates the hash when product details are supplied, applies the customer
+# offer (bumping round_number) and refreshes the TTL in one atomic step.
+# Returns the hash as a flat field/value list, or nil when it does not exist.
+RECORD_OFFER_SCRIPT = """
+local key = KEYS[1]
+local ttl = tonumber(ARGV[1])
+local offer = ARGV[2]
+local sentiment = ARGV[3]
+
+if redis.call('EXISTS', key) == 0 then
+    if ARGV[4] == '' then
+        return nil
+    end
+    redis.call('HSET', key,
+        'product_id', ARGV[4],
+        'original_price', ARGV[5],
+        'round_number', 1,
+        'customer_sentiment', 0,
+        'started_at', ARGV[6])
+end
+
+if offer ~= '' then
+    redis.call('HSET', key, 'customer_offer', offer, 'customer_sentiment', sentiment)
+    redis.call('HINCRBY', key, 'round_number', 1)
+    redis.call('HINCRBY', key, 'offer_count', 1)
+end
+
+redis.call('EXPIRE', key, ttl)
+return redis.call('HGETALL', key)
+"""
+
+# KEYS[1] = negotiation hash
+# ARGV = ttl, counter
+RECORD_COUNTER_SCRIPT = """
+local key = KEYS[1]
+if redis.call('EXISTS', key) == 0 then
+    return 0
+end
+redis.call('HSET', key, 'current_counter', ARGV[2])
+redis.call('HINCRBY', key, 'offer_count', 1)
+redis.call('EXPIRE', key, tonumber(ARGV[1]))
+return 1
+"""
+
+
+class NegotiationStore:
+    """Atomic, compact negotiation state store on Redis hashes"""
+
+    def __init__(self, redis_client, ttl_seconds: int = 24 * 3600):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self._record_offer = redis_client.register_script(RECORD_OFFER_SCRIPT)
+        self._record_counter = redis_client.register_script(RECORD_COUNTER_SCRIPT)
+
+    @staticmethod
+    def key(customer_phone: str, merchant_id: str) -> str:
+        return f"negotiation:{customer_phone}:{merchant_id}"
+
+    async def record_offer(
+        self,
+        key: str,
+        offer: Optional[float] = None,
+        sentiment: float = 0.0,
+        product_id: Optional[str] = None,
+        original_price: Optional[float] = None
+    ) -> Optional[NegotiationState]:
+        """
+        Apply a customer offer to a negotiation in one round-trip
+
+        Pass product_id and original_price to start a new negotiation when
+        none exists; without them a missing negotiation returns None.
+        """
+        result = await self._record_offer(
+            keys=[key],
+            args=[
+                self.ttl_seconds,
+                "" if offer is None else repr(float(offer)),
+                repr(float(sentiment)),
+                product_id or "",
+                "" if original_price is None else repr(float(original_price)),
+                datetime.utcnow().isoformat()
+            ]
+        )
+        if not result:
+            return None
+        return self._decode(result)
+
+    async def record_counter(self, key: str, counter: float) -> bool:
+        """Store the merchant's counter offer and refresh the TTL"""
+        return bool(await self._record_counter(
+            keys=[key],
+            args=[self.ttl_seconds, repr(float(counter))]
+        ))
+
+    async def clear(self, key: str):
+        """End a negotiation"""
+        await self.redis.delete(key)
+
+    @staticmethod
+    def _decode(flat: List) -> NegotiationState:
+        """Build a NegotiationState from an HGETALL field/value list"""
+        fields: Dict[str, str] = {}
+        for i in range(0, len(flat), 2):
+            name, value = flat[i], flat[i + 1]
+            if isinstance(name, bytes):
+                name = name.decode("utf-8")
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            fields[name] = value
+
+        def as_float(name: str) -> Optional[float]:
+            value = fields.get(name)
+            return float(value) if value not in (None, "") else None
+
+        return NegotiationState(
+            product_id=fields["product_id"],
+            original_price=float(fields["original_price"]),
+            customer_offer=as_float("customer_offer"),
+            current_counter=as_float("current_counter"),
+            round_number=int(fields.get("round_number", 1)),
+            customer_sentiment=as_float("customer_sentiment") or 0.0,
+            started_at=datetime.fromisoformat(fields["started_at"]) if fields.get("started_at") else datetime.utcnow()
+        )
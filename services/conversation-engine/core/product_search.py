@@ -0,0 +1,284 @@
+"""
+In-process product search for YarnMarket AI
+Per-merchant BM25 inverted index with Pidgin/English normalization and trigram typo tolerance
+"""
+
+import heapq
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .catalog import CatalogListener
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters; name terms count more than description terms
+K1 = 1.2
+B = 0.75
+NAME_WEIGHT = 3.0
+CATEGORY_WEIGHT = 1.5
+DESCRIPTION_WEIGHT = 1.0
+
+# Unknown query terms are matched to indexed terms sharing enough trigrams
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_MAX_CANDIDATES = 3
+
+# Filler that carries no product meaning in shopping messages
+STOPWORDS = {
+    # English
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "with", "is", "are", "be",
+    "i", "me", "my", "you", "your", "we", "it", "this", "that", "these", "those", "do", "does",
+    "have", "has", "want", "need", "looking", "show", "see", "sell", "buy", "any", "some",
+    "please", "pls", "plz", "how", "much", "price", "what", "which", "can", "get", "there",
+    "available", "hello", "hi", "good", "morning", "afternoon", "evening", "sir", "ma",
+    # Pidgin
+    "abeg", "wetin", "wey", "dey", "na", "una", "wan", "make", "fit", "sef", "sha", "oya",
+    "abi", "shey", "o", "oh", "e", "don", "go", "dem", "am", "de", "biko",
+}
+
+# Local spellings and Pidgin terms mapped onto the word a catalog is likely to use.
+# Applied to both catalog text and queries after stemming.
+TERM_ALIASES = {
+    "canvas": "sneaker",
+    "kanvas": "sneaker",
+    "snicker": "sneaker",
+    "trainer": "sneaker",
+    "trousa": "trouser",
+    "trowser": "trouser",
+    "pant": "trouser",
+    "jean": "jeans",
+    "tshirt": "shirt",
+    "tee": "shirt",
+    "singlet": "vest",
+    "palm": "slipper",
+    "okrika": "thrift",
+    "handset": "phone",
+    "pomade": "cream",
+    "attachment": "wig",
+}
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents (Yoruba/Igbo diacritics, curly quotes)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _stem(token: str) -> str:
+    """Strip English plurals so 'dresses' and 'dress' share a term"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_terms(text: str, keep_stopwords: bool = False) -> List[str]:
+    """Tokenize text into normalized search terms"""
+    terms = []
+    # "t-shirt" and "t shirt" both become "tshirt"
+    folded = re.sub(r"\bt[\s-]+shirt", "tshirt", _fold(text))
+    for token in re.findall(r"[a-z0-9]+", folded):
+        if not keep_stopwords and token in STOPWORDS:
+            continue
+        if token.isdigit():
+            continue  # prices and quantities are handled as filters
+        if token not in TERM_ALIASES:
+            token = _stem(token)
+        terms.append(TERM_ALIASES.get(token, token))
+    return terms
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _MerchantIndex:
+    """Inverted index over one merchant's catalog"""
+
+    def __init__(self):
+        self.products: Dict[str, Product] = {}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        # Per-product BM25 length normalization, rebuilt after the catalog changes
+        self._norms: Optional[Dict[str, float]] = None
+
+    def add(self, product: Product):
+        if product.id in self.products:
+            self.discard(product.id)
+
+        weights: Counter = Counter()
+        for term in normalize_terms(product.name):
+            weights[term] += NAME_WEIGHT
+        for term in normalize_terms(product.category):
+            weights[term] += CATEGORY_WEIGHT
+        for term in normalize_terms(product.description or ""):
+            weights[term] += DESCRIPTION_WEIGHT
+
+        self._norms = None
+        self.products[product.id] = product
+        self.doc_terms[product.id] = dict(weights)
+        length = sum(weights.values())
+        self.doc_lengths[product.id] = length
+        self.total_length += length
+        for term, weight in weights.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                for gram in _trigrams(term):
+                    self.grams[gram].add(term)
+            posting[product.id] = weight
+
+    def discard(self, product_id: str):
+        if self.products.pop(product_id, None) is None:
+            return
+        self._norms = None
+        self.total_length -= self.doc_lengths.pop(product_id)
+        for term in self.doc_terms.pop(product_id):
+            posting = self.postings[term]
+            del posting[product_id]
+            if not posting:
+                del self.postings[term]
+                for gram in _trigrams(term):
+                    self.grams[gram].discard(term)
+                    if not self.grams[gram]:
+                        del self.grams[gram]
+
+    def expand(self, term: str) -> List[Tuple[str, float]]:
+        """The term itself if indexed, otherwise close spellings weighted by similarity"""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < 3:
+            return []
+
+        query_grams = _trigrams(term)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] += 1
+
+        candidates = []
+        for candidate, count in shared.items():
+            # Dice coefficient; a padded term of n letters has n trigrams
+            similarity = 2 * count / (len(query_grams) + len(candidate))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                candidates.append((candidate, similarity))
+        return heapq.nlargest(FUZZY_MAX_CANDIDATES, candidates, key=lambda item: item[1])
+
+    def _length_norms(self) -> Dict[str, float]:
+        if self._norms is None:
+            average_length = self.total_length / len(self.products) or 1.0
+            self._norms = {
+                product_id: K1 * (1 - B + B * length / average_length)
+                for product_id, length in self.doc_lengths.items()
+            }
+        return self._norms
+
+    def search(self, terms: List[str], k: int, accept=None) -> List[Tuple[Product, float]]:
+        count = len(self.products)
+        if not count:
+            return []
+        norms = self._length_norms()
+
+        scores: Dict[str, float] = defaultdict(float)
+        for query_term in terms:
+            for term, similarity in self.expand(query_term):
+                posting = self.postings[term]
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                weight = similarity * idf * (K1 + 1)
+                for product_id, tf in posting.items():
+                    scores[product_id] += weight * tf / (tf + norms[product_id])
+
+        scored = scores.items()
+        if accept is not None:
+            scored = [(product_id, score) for product_id, score in scored if accept(self.products[product_id])]
+        best = heapq.nlargest(k, scored, key=lambda item: item[1])
+        return [(self.products[product_id], score) for product_id, score in best]
+
+
+class ProductSearchIndex(CatalogListener):
+    """
+    Top-k product search over every cached merchant catalog
+
+    Registered as a ProductCatalog listener, so it is built when a catalog
+    loads and updated product by product from the change feed.
+    """
+
+    def __init__(self):
+        self._merchants: Dict[str, _MerchantIndex] = {}
+
+    def has_merchant(self, merchant_id: str) -> bool:
+        return merchant_id in self._merchants
+
+    def replace(self, merchant_id: str, products: List[Product]):
+        index = _MerchantIndex()
+        for product in products:
+            index.add(product)
+        self._merchants[merchant_id] = index
+
+    def upsert(self, merchant_id: str, products: List[Product]):
+        index = self._merchants.get(merchant_id)
+        if index is None:
+            return
+        for product in products:
+            index.add(product)
+
+    def remove(self, merchant_id: str, product_ids: List[str]):
+        index = self._merchants.get(merchant_id)
+        if index is None:
+            return
+        for product_id in product_ids:
+            index.discard(product_id)
+
+    def evict(self, merchant_id: str):
+        self._merchants.pop(merchant_id, None)
+
+    def search(
+        self,
+        merchant_id: str,
+        query: str,
+        k: int = 10,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock_only: bool = False
+    ) -> List[Product]:
+        """
+        Best matching products for a free-text query
+
+        A query with no product words (e.g. "abeg wetin una get?") returns the
+        filtered catalog instead, in-stock items first.
+        """
+        index = self._merchants.get(merchant_id)
+        if index is None:
+            return []
+
+        category = category.lower() if category else None
+
+        def accept(product: Product) -> bool:
+            if category and product.category.lower() != category:
+                return False
+            if min_price is not None and product.price < min_price:
+                return False
+            if max_price is not None and product.price > max_price:
+                return False
+            return product.in_stock or not in_stock_only
+
+        filtered = bool(category) or min_price is not None or max_price is not None or in_stock_only
+        terms = normalize_terms(query)
+        if not terms:
+            browse = [product for product in index.products.values() if accept(product)]
+            browse.sort(key=lambda product: not product.in_stock)
+            return browse[:k]
+
+        return [product for product, _ in index.search(terms, k, accept if filtered else None)]
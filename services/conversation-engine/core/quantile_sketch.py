@@ -0,0 +1,227 @@
+"""
+Mergeable latency sketches for YarnMarket AI
+DDSketch quantile sketches per merchant and intent, merged across replicas in Redis
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ALL_INTENTS = "all"
+
+
+class DDSketch:
+    """
+    DDSketch quantile sketch with relative-error guarantees
+
+    Values are counted in logarithmic buckets, so any quantile is returned
+    within `relative_accuracy` of the true value. Bucket counts are additive,
+    which makes sketches mergeable by summing counts (locally or with HINCRBY).
+    Memory is bounded by max_bins; when exceeded the lowest buckets collapse,
+    which only affects accuracy of the smallest quantiles.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, weight: int = 1):
+        if value <= self.min_value:
+            self.zero_count += weight
+        else:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+
+    def merge(self, other: "DDSketch"):
+        for key, weight in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + weight
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = keys[:len(keys) - self.max_bins + 1]
+        target = keys[len(excess)]
+        self.bins[target] += sum(self.bins.pop(key) for key in excess)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0..1), or None for an empty sketch"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.bins))
+
+    def to_fields(self) -> Dict[str, int]:
+        """Bucket counts as hash fields ("z" holds the zero bucket)"""
+        fields = {str(key): weight for key, weight in self.bins.items()}
+        if self.zero_count:
+            fields["z"] = self.zero_count
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Dict, relative_accuracy: float = 0.01) -> "DDSketch":
+        sketch = cls(relative_accuracy)
+        for name, weight in fields.items():
+            name = name.decode("utf-8") if isinstance(name, bytes) else name
+            weight = int(weight)
+            if name == "z":
+                sketch.zero_count += weight
+            else:
+                sketch.bins[int(name)] = sketch.bins.get(int(name), 0) + weight
+            sketch.count += weight
+        return sketch
+
+
+class LatencySketches:
+    """
+    Response-time sketches per merchant and intent, shared across replicas
+
+    Each replica accumulates a local delta sketch per key and periodically adds
+    its bucket counts into an hourly Redis hash with HINCRBY. Reading merges the
+    hourly hashes for the requested period, so every replica sees the same
+    quantiles and memory stays bounded per key.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        relative_accuracy: float = 0.01,
+        window_seconds: int = 3600,
+        retention_seconds: int = 8 * 24 * 3600,
+        flush_interval: float = 10.0,
+        key_prefix: str = "latency_sketch"
+    ):
+        self.redis = redis_client
+        self.relative_accuracy = relative_accuracy
+        self.window_seconds = window_seconds
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.key_prefix = key_prefix
+
+        self._pending: Dict[Tuple[str, str, int], DDSketch] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _window(self, timestamp: float) -> int:
+        return int(timestamp // self.window_seconds) * self.window_seconds
+
+    def _redis_key(self, merchant_id: str, intent: str, window: int) -> str:
+        return f"{self.key_prefix}:{merchant_id}:{intent}:{window}"
+
+    async def start(self):
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def add(self, merchant_id: str, intent: str, seconds: float):
+        """Record one response time for the merchant, per intent and overall"""
+        window = self._window(time.time())
+        for key_intent in (intent, ALL_INTENTS):
+            key = (merchant_id, key_intent, window)
+            sketch = self._pending.get(key)
+            if sketch is None:
+                sketch = self._pending[key] = DDSketch(self.relative_accuracy)
+            sketch.add(seconds)
+
+    async def flush(self) -> int:
+        """Add pending bucket counts into the shared Redis hashes"""
+        if not self._pending or self.redis is None:
+            return 0
+        pending, self._pending = self._pending, {}
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for (merchant_id, intent, window), sketch in pending.items():
+                    redis_key = self._redis_key(merchant_id, intent, window)
+                    for field, weight in sketch.to_fields().items():
+                        pipe.hincrby(redis_key, field, weight)
+                    pipe.expire(redis_key, self.retention_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Latency sketch flush failed, keeping {len(pending)} sketches: {e}")
+            for key, sketch in pending.items():
+                existing = self._pending.get(key)
+                if existing is None:
+                    self._pending[key] = sketch
+                else:
+                    existing.merge(sketch)
+            return 0
+        return len(pending)
+
+    async def merged(self, merchant_id: str, intents: Iterable[str] = (ALL_INTENTS,), hours: int = 24) -> Dict[str, DDSketch]:
+        """Merge the last `hours` hourly sketches for each intent"""
+        intents = list(intents)
+        latest = self._window(time.time())
+        windows = [latest - i * self.window_seconds for i in range(max(1, hours * 3600 // self.window_seconds))]
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for intent in intents:
+                for window in windows:
+                    pipe.hgetall(self._redis_key(merchant_id, intent, window))
+            results = await pipe.execute()
+
+        sketches: Dict[str, DDSketch] = {}
+        for i, intent in enumerate(intents):
+            sketch = DDSketch(self.relative_accuracy)
+            for fields in results[i * len(windows):(i + 1) * len(windows)]:
+                if fields:
+                    sketch.merge(DDSketch.from_fields(fields, self.relative_accuracy))
+            sketches[intent] = sketch
+        return sketches
+
+    async def percentiles(self, merchant_id: str, intents: Iterable[str] = (ALL_INTENTS,), hours: int = 24) -> Dict[str, Dict[str, int]]:
+        """p50/p95/p99 response times in milliseconds for each intent with samples"""
+        sketches = await self.merged(merchant_id, intents, hours)
+        return {
+            intent: {
+                "p50": round(sketch.quantile(0.5) * 1000),
+                "p95": round(sketch.quantile(0.95) * 1000),
+                "p99": round(sketch.quantile(0.99) * 1000),
+                "count": sketch.count,
+            }
+            for intent, sketch in sketches.items()
+            if sketch.count
+        }
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Latency sketch flush loop error: {e}")
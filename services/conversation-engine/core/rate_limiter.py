@@ -0,0 +1,215 @@
+"""
+Rate limiting for YarnMarket AI
+Per-customer and per-merchant limits using an in-process token bucket fast path
+backed by a Redis GCRA limiter shared across replicas
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import Counter
+
+from .models import Language
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    'conversation_rate_limited_total',
+    'Messages throttled by the rate limiter',
+    ['scope', 'source']
+)
+
+
+# GCRA over every key in KEYS; ARGV[i] is the emission interval (ms) for KEYS[i].
+# Burst tolerance equals one full window, so a key may send `limit` messages
+# back-to-back and then one per interval. Nothing is consumed unless all keys allow.
+# Returns {allowed, index of the limiting key, retry_after_ms}.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[#ARGV])
+local new_tats = {}
+
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - window
+    if allow_at > now then
+        return {0, i, allow_at - now}
+    end
+    new_tats[i] = new_tat
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, new_tats[i], 'PX', window)
+end
+return {1, 0, 0}
+"""
+
+THROTTLED_REPLIES = {
+    Language.PIDGIN: "Abeg small small o! You don send plenty messages. Give me one minute, I go answer you sharp sharp. 🙏",
+    Language.ENGLISH: "You're sending messages a little too quickly. Please give me a minute and I'll get right back to you. 🙏",
+}
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    scope: Optional[str] = None
+    retry_after: float = 0.0
+
+
+class TokenBucket:
+    """Simple token bucket refilled continuously"""
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated_at", "notified_until")
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        # Until when the throttled reply has been sent to this key
+        self.notified_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def peek(self) -> Tuple[bool, float]:
+        """Check whether a token is available, returning (ok, seconds until one is)"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return True, 0.0
+        return False, (1 - self.tokens) / self.refill_rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class ConversationRateLimiter:
+    """
+    Per-customer and per-merchant message rate limiter
+
+    The local token buckets reject obvious floods without touching Redis.
+    Traffic that passes locally is checked against Redis so the limit holds
+    across replicas. If Redis is unavailable the local buckets alone decide,
+    and Redis is retried after a short back-off.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        customer_limit: int = 60,
+        merchant_limit: int = 600,
+        window_seconds: int = 60,
+        max_local_keys: int = 100000,
+        redis_retry_seconds: float = 5.0
+    ):
+        self.redis = redis_client
+        self.limits = {"customer": customer_limit, "merchant": merchant_limit}
+        self.window_seconds = window_seconds
+        self.max_local_keys = max_local_keys
+        self.redis_retry_seconds = redis_retry_seconds
+
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._gcra = redis_client.register_script(GCRA_SCRIPT) if redis_client else None
+        self._redis_down_until = 0.0
+
+    def _bucket(self, scope: str, key: str) -> TokenBucket:
+        bucket_key = f"{scope}:{key}"
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            limit = self.limits[scope]
+            bucket = TokenBucket(limit, limit / self.window_seconds)
+            self._buckets[bucket_key] = bucket
+            if len(self._buckets) > self.max_local_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(bucket_key)
+        return bucket
+
+    async def check(self, customer_phone: str, merchant_id: str) -> RateLimitDecision:
+        """Check and consume one message for the customer and merchant"""
+        buckets: Dict[str, TokenBucket] = {
+            "customer": self._bucket("customer", customer_phone),
+            "merchant": self._bucket("merchant", merchant_id),
+        }
+
+        # Fast path: this replica alone has already seen too much
+        for scope, bucket in buckets.items():
+            ok, retry_after = bucket.peek()
+            if not ok:
+                RATE_LIMITED.labels(scope=scope, source="local").inc()
+                return RateLimitDecision(allowed=False, scope=scope, retry_after=retry_after)
+
+        decision = await self._check_redis(customer_phone, merchant_id)
+        if decision.allowed:
+            for bucket in buckets.values():
+                bucket.consume()
+        else:
+            RATE_LIMITED.labels(scope=decision.scope, source="redis").inc()
+        return decision
+
+    async def _check_redis(self, customer_phone: str, merchant_id: str) -> RateLimitDecision:
+        """Shared GCRA check; fails open to the local decision when Redis is unavailable"""
+        if self._gcra is None or time.monotonic() < self._redis_down_until:
+            return RateLimitDecision(allowed=True)
+
+        window_ms = self.window_seconds * 1000
+        try:
+            allowed, index, retry_ms = await self._gcra(
+                keys=[f"ratelimit:customer:{customer_phone}", f"ratelimit:merchant:{merchant_id}"],
+                args=[
+                    window_ms / self.limits["customer"],
+                    window_ms / self.limits["merchant"],
+                    window_ms
+                ]
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter falling back to local buckets, Redis unavailable: {e}")
+            self._redis_down_until = time.monotonic() + self.redis_retry_seconds
+            return RateLimitDecision(allowed=True)
+
+        if allowed:
+            return RateLimitDecision(allowed=True)
+        scope = "customer" if int(index) == 1 else "merchant"
+        return RateLimitDecision(allowed=False, scope=scope, retry_after=float(retry_ms) / 1000)
+
+    async def claim_throttle_notice(self, customer_phone: str) -> bool:
+        """
+        Whether to send the throttled reply for this message
+
+        True at most once per customer per window (across replicas while
+        Redis is up), so a bot answering every reply cannot keep a loop of
+        paid sends going.
+        """
+        bucket = self._bucket("customer", customer_phone)
+        now = time.monotonic()
+        if now < bucket.notified_until:
+            return False
+        bucket.notified_until = now + self.window_seconds
+
+        if self.redis is None or now < self._redis_down_until:
+            return True
+        try:
+            return bool(await self.redis.set(
+                f"ratelimit:notice:{customer_phone}", 1, nx=True, px=self.window_seconds * 1000
+            ))
+        except Exception as e:
+            logger.warning(f"Rate limiter falling back to local buckets, Redis unavailable: {e}")
+            self._redis_down_until = time.monotonic() + self.redis_retry_seconds
+            return True
+
+    @staticmethod
+    def throttled_reply(language: Optional[Language]) -> str:
+        """Canned reply for throttled messages (no LLM call)"""
+        return THROTTLED_REPLIES.get(language, THROTTLED_REPLIES[Language.ENGLISH])
@@ -0,0 +1,183 @@
+"""
+Response planning for YarnMarket AI
+Answers confident, routine messages from merchant FAQs and templates so only open-ended ones reach the LLM
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .faq_index import FaqIndex
+from .models import Language, MerchantSettings
+from .product_search import normalize_terms
+from .response_templates import TemplateRegistry
+from .telemetry import GENERAL_RESPONSES, LLM_AVOIDANCE_RATIO
+
+logger = logging.getLogger(__name__)
+
+# Where a general-chat reply came from
+SOURCE_FAQ = "faq"
+SOURCE_TEMPLATE = "template"
+SOURCE_LLM = "llm"
+
+# Questions answered from a merchant's own general.<topic> templates, by the (stemmed) words that
+# signal them; without one, the merchant's FAQ entries or the LLM answer instead
+INFO_TOPICS: Dict[str, set] = {
+    "location": {"location", "address", "where", "located", "locate", "direction"},
+    "hours": {"hour", "time", "open", "opening", "close", "closing"},
+    "delivery": {"delivery", "deliver", "transport", "shipping", "ship", "dispatch", "waybill"},
+    "payment": {"payment", "pay", "transfer", "pos", "account", "cash"},
+}
+
+# Pleasantries answered only when the message contains nothing else
+SMALLTALK_TOPICS: Dict[str, set] = {
+    "thanks": {"thank", "thanks", "thx", "tanx", "tnx", "nagode", "dalu", "ese", "appreciate"},
+    "farewell": {"bye", "goodbye", "byee", "goodnight", "ciao"},
+    "acknowledge": {"ok", "okay", "alright", "noted", "sure", "fine", "k", "kk", "oky"},
+}
+
+_TOPIC_WORDS = set().union(*INFO_TOPICS.values(), *SMALLTALK_TOPICS.values())
+
+# Forms of address and intensifiers that do not change what is being asked
+FILLER_WORDS = {
+    "so", "very", "too", "lot", "again", "really", "oga", "madam", "boss", "bro", "sis",
+    "dear", "customer", "guy", "ooo", "oo", "jare", "sha", "now", "today",
+}
+
+# Each word a matched answer does not account for lowers its score by this share of a matched word,
+# so a single topic word among other content ("do you deliver to abuja") cannot pass
+EXTRA_TERM_WEIGHT = 0.5
+
+
+@dataclass
+class ResponsePlan:
+    """How to answer a general-chat message"""
+    source: str
+    score: float
+    text: Optional[str] = None
+    topics: List[str] = field(default_factory=list)
+
+    @property
+    def needs_llm(self) -> bool:
+        return self.text is None
+
+
+def _coverage(matched: int, extra: int) -> float:
+    """Share of the message an answer accounts for, softened so one stray word beside two matched ones passes"""
+    if not matched:
+        return 0.0
+    return matched / (matched + EXTRA_TERM_WEIGHT * extra)
+
+
+class ResponsePlanner:
+    """
+    Template-first planner for general chat
+
+    A message is scored against the merchant's FAQ index and the built-in
+    topics; the score is the classifier confidence scaled by how well the
+    answer matches the message. Informational topics are answered only from
+    the merchant's own data, never from generic policy text. Plans scoring at least
+    confidence_threshold are answered directly, everything else goes to the
+    LLM.
+    """
+
+    def __init__(
+        self,
+        templates: TemplateRegistry,
+        faq_index: Optional[FaqIndex] = None,
+        confidence_threshold: float = 0.7
+    ):
+        self.templates = templates
+        self.faq_index = faq_index or FaqIndex()
+        self.confidence_threshold = confidence_threshold
+        self.counts: Dict[str, int] = {SOURCE_FAQ: 0, SOURCE_TEMPLATE: 0, SOURCE_LLM: 0}
+
+    def plan(
+        self,
+        message: str,
+        language: Language,
+        merchant: MerchantSettings,
+        intent_confidence: float
+    ) -> ResponsePlan:
+        terms = set(normalize_terms(message)) - FILLER_WORDS
+        if not terms:
+            return ResponsePlan(source=SOURCE_LLM, score=0.0)
+
+        faq_plan = self._plan_faq(message, merchant, intent_confidence)
+        if faq_plan and faq_plan.score >= self.confidence_threshold:
+            return faq_plan
+
+        template_plan = self._plan_template(terms, language, merchant, intent_confidence)
+        if template_plan and template_plan.score >= self.confidence_threshold:
+            return template_plan
+
+        best = max(
+            (plan for plan in (faq_plan, template_plan) if plan),
+            key=lambda plan: plan.score,
+            default=None
+        )
+        return ResponsePlan(source=SOURCE_LLM, score=best.score if best else 0.0)
+
+    def _plan_faq(
+        self,
+        message: str,
+        merchant: MerchantSettings,
+        intent_confidence: float
+    ) -> Optional[ResponsePlan]:
+        """The merchant's own answer to the question, if one is close enough"""
+        faq_match = self.faq_index.match(merchant, message)
+        if faq_match is None:
+            return None
+        return ResponsePlan(
+            source=SOURCE_FAQ,
+            score=intent_confidence * faq_match.score,
+            text=faq_match.entry.answer,
+            topics=[faq_match.entry.question]
+        )
+
+    def _plan_template(
+        self,
+        terms: set,
+        language: Language,
+        merchant: MerchantSettings,
+        intent_confidence: float
+    ) -> Optional[ResponsePlan]:
+        """Answer every informational topic asked about from the merchant's templates, or a bare pleasantry"""
+        extra = len(terms - _TOPIC_WORDS)
+        topics = [topic for topic, words in INFO_TOPICS.items() if terms & words]
+        if not topics:
+            if extra:
+                return None
+            topics = [topic for topic, words in SMALLTALK_TOPICS.items() if terms & words][:1]
+            if not topics:
+                return None
+
+        matched = len(terms & _TOPIC_WORDS)
+        values = {"business": merchant.business_name}
+        answers = []
+        for topic in topics:
+            template = self.templates.choose(
+                f"general.{topic}", language, merchant.merchant_id,
+                fallback=Language.ENGLISH, merchant_only=topic in INFO_TOPICS
+            )
+            if template is None:
+                return None
+            answers.append(template.render(values))
+
+        return ResponsePlan(
+            source=SOURCE_TEMPLATE,
+            score=intent_confidence * _coverage(matched, extra),
+            text=" ".join(answers),
+            topics=topics
+        )
+
+    def record(self, source: str):
+        """Count how a reply was produced and update the LLM-avoidance ratio"""
+        self.counts[source] = self.counts.get(source, 0) + 1
+        GENERAL_RESPONSES.labels(source=source).inc()
+        LLM_AVOIDANCE_RATIO.set(self.llm_avoidance_rate)
+
+    @property
+    def llm_avoidance_rate(self) -> float:
+        total = sum(self.counts.values())
+        return (total - self.counts.get(SOURCE_LLM, 0)) / total if total else 0.0
@@ -0,0 +1,466 @@
+"""
+Response templates for YarnMarket AI
+Templates are compiled once into typed-slot renderers and can be overridden per merchant and language from files
+"""
+
+import json
+import logging
+import os
+import random
+import string
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .models import Language
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateError(ValueError):
+    """A template or template file failed validation"""
+
+
+def format_currency(amount: Optional[float]) -> str:
+    """Format an amount in Nigerian Naira"""
+    if amount is None:
+        return "the price"
+    return f"₦{amount:,.0f}" if amount >= 1000 else f"₦{amount:.0f}"
+
+
+def _format_quantity(value: Any) -> str:
+    return str(int(value)) if value is not None else "some"
+
+
+def _format_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+# How each slot type turns a value into text
+SLOT_TYPES: Dict[str, Callable[[Any], str]] = {
+    "currency": format_currency,
+    "quantity": _format_quantity,
+    "name": _format_text,
+    "text": _format_text,
+}
+
+_NEGOTIATION_SLOTS = {
+    "offer": "currency",
+    "counter": "currency",
+    "price": "currency",
+    "bundle_price": "currency",
+    "individual_price": "currency",
+    "bundle_quantity": "quantity",
+}
+_GREETING_SLOTS = {"title": "name", "customer": "name"}
+_GENERAL_SLOTS = {"business": "name"}
+
+# Every category a template file may define, with the placeholders its templates may use
+CATEGORY_SLOTS: Dict[str, Dict[str, str]] = {
+    "greeting.morning": _GREETING_SLOTS,
+    "greeting.afternoon": _GREETING_SLOTS,
+    "greeting.evening": _GREETING_SLOTS,
+    "negotiation.counter_soft": _NEGOTIATION_SLOTS,
+    "negotiation.counter_firm": _NEGOTIATION_SLOTS,
+    "negotiation.bundle_offer": _NEGOTIATION_SLOTS,
+    "negotiation.acceptance": _NEGOTIATION_SLOTS,
+    "negotiation.rejection": _NEGOTIATION_SLOTS,
+    "showcase": {"product": "text", "brand": "text", "price": "currency", "description": "text"},
+    "trust": {},
+    "complaint": {},
+    # Merchant policies: no built-in text, only merchants/<merchant_id> files define these
+    "general.location": _GENERAL_SLOTS,
+    "general.hours": _GENERAL_SLOTS,
+    "general.delivery": _GENERAL_SLOTS,
+    "general.payment": _GENERAL_SLOTS,
+    "general.thanks": _GENERAL_SLOTS,
+    "general.farewell": _GENERAL_SLOTS,
+    "general.acknowledge": _GENERAL_SLOTS,
+    "general.fallback": {},
+}
+
+_FORMATTER = string.Formatter()
+
+
+class CompiledTemplate:
+    """
+    A template parsed into literal text and typed slots
+
+    Parsing and validation happen once; render() fills every slot in a
+    single pass over the parts.
+    """
+
+    __slots__ = ("source", "slots", "_parts")
+
+    def __init__(self, source: str, slot_types: Dict[str, str]):
+        self.source = source
+        parts: List[Union[str, Tuple[str, Callable[[Any], str]]]] = []
+        slots = set()
+        try:
+            parsed = list(_FORMATTER.parse(source))
+        except ValueError as e:
+            raise TemplateError(f"{e} in template {source!r}") from None
+
+        for literal, field, format_spec, conversion in parsed:
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if field not in slot_types:
+                allowed = ", ".join(sorted(slot_types)) or "none"
+                raise TemplateError(f"Unknown placeholder {{{field}}} in template {source!r} (allowed: {allowed})")
+            if format_spec or conversion:
+                raise TemplateError(f"Placeholder {{{field}}} in template {source!r} cannot take a format spec")
+            parts.append((field, SLOT_TYPES[slot_types[field]]))
+            slots.add(field)
+
+        self.slots = frozenset(slots)
+        self._parts = tuple(parts)
+
+    def render(self, values: Dict[str, Any]) -> str:
+        return "".join(
+            part if part.__class__ is str else part[1](values.get(part[0]))
+            for part in self._parts
+        )
+
+    def __repr__(self) -> str:
+        return f"CompiledTemplate({self.source!r})"
+
+
+CompiledTemplates = Dict[str, List[CompiledTemplate]]
+
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """{"negotiation": {"acceptance": [...]}} -> {"negotiation.acceptance": [...]}"""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def compile_templates(data: Dict[str, Any], origin: str) -> CompiledTemplates:
+    """Validate and compile one language's templates, keyed by category"""
+    if not isinstance(data, dict):
+        raise TemplateError(f"{origin}: expected an object of template categories")
+
+    compiled: CompiledTemplates = {}
+    for category, templates in _flatten(data).items():
+        slot_types = CATEGORY_SLOTS.get(category)
+        if slot_types is None:
+            raise TemplateError(f"{origin}: unknown template category {category!r}")
+        if isinstance(templates, str):
+            templates = [templates]
+        if not templates or not all(isinstance(t, str) and t.strip() for t in templates):
+            raise TemplateError(f"{origin}: {category} must be a non-empty list of strings")
+        try:
+            compiled[category] = [CompiledTemplate(template, slot_types) for template in templates]
+        except TemplateError as e:
+            raise TemplateError(f"{origin}: {category}: {e}") from None
+    return compiled
+
+
+# Built-in phrasing; a templates_dir file only needs the categories it changes
+DEFAULT_TEMPLATES: Dict[Language, Dict[str, Any]] = {
+    Language.PIDGIN: {
+        "greeting": {
+            "morning": [
+                "Good morning o! How you dey today? Wetin you wan buy?",
+                "Morning my {customer}! You come early today o. How we fit help you?",
+                "Eh! Good morning! Welcome to our shop. Wetin dey worry you today?",
+                "Good morning {title}! Hope you sleep well? Come make we do business!",
+            ],
+            "afternoon": [
+                "Good afternoon! You dey try well well to come today. Wetin you need?",
+                "Afternoon my brother/sister! Hope say afternoon dey treat you well?",
+                "Welcome! Good afternoon o! Come make we see wetin we fit do for you today.",
+                "Afternoon {customer}! You come at the right time. Wetin you wan buy?",
+            ],
+            "evening": [
+                "Good evening {title}! You still dey work hard o. Wetin bring you come?",
+                "Evening my person! Hope your day go well? Make we do quick business.",
+                "Good evening o! Even for evening you still dey find quality things. I respect you!",
+                "Evening my {customer}! You know where to find original things. Wetin you need?",
+            ],
+        },
+        "negotiation": {
+            "counter_soft": [
+                "Ah customer! {offer} go wound me o! But because say na you, make we do {counter}. Na final price be that o!",
+                "My person, {offer} no go work at all! But I go manage {counter} for you because you be my customer.",
+                "Oga/Madam, you too sabi price well well! {offer} dey pain me o, but make we meet at {counter}.",
+                "Ah! You want make I close shop? {offer} no reach at all o! Best I fit do na {counter} sharp sharp.",
+            ],
+            "counter_firm": [
+                "My friend, {offer}? You wan make I sell at loss? I no dey sell fake o! {counter} na my final word!",
+                "Oga, {offer} no reach at all at all! This na original quality. {counter} or nothing!",
+                "Customer, be serious! {offer} for this kind quality? Make we talk {counter} finish!",
+                "You dey craze? {offer} for this thing wey cost me plenty money? {counter} final answer!",
+            ],
+            "bundle_offer": [
+                "Okay make I help you! Instead of {individual_price} each, I go give you {bundle_quantity} for {bundle_price}. Na better deal be that!",
+                "You wan save money abi? Buy {bundle_quantity} pieces make I give you {bundle_price}. You go thank me later!",
+                "Customer, you get sense! Take {bundle_quantity} for {bundle_price}. E better pass to buy one by one.",
+            ],
+            "acceptance": [
+                "Ah! You get good eye for business! {price} deal! Make we package am for you sharp sharp!",
+                "See negotiation! {price} accepted! You sabi do business well well!",
+                "Okay, you win! {price} final. But na because you be correct customer o!",
+                "Alright, make we close the deal at {price}! You drive hard bargain o!",
+            ],
+            "rejection": [
+                "I sorry o, but {offer} no possible at all! Maybe you fit check other place.",
+                "My hands dey tied. {offer} go make me lose money. I no fit do am!",
+                "Customer, I like you but {offer} no go work. The thing cost me pass that price sef.",
+            ],
+        },
+        "showcase": [
+            "See this fine {product}! Na original {brand} be this o! Only {price} you go get am. E no get duplicate anywhere!",
+            "Customer, this {product} na fire! Look the quality sef - {description}. For just {price}, na steal be this!",
+            "Ah! You get good eye! This {product} dey sell like pure water. {price} naira and na your own!",
+            "This {product} na the latest in market o! Very limited edition. {price} and you go be the owner!",
+        ],
+        "trust": [
+            "I no dey sell fake o! All my things na original!",
+            "You fit ask anybody for this area, I dey sell quality things!",
+            "Na God go bless you if you buy from me!",
+            "I get plenty customers wey dey come back because my things dey last!",
+            "Check am well well, you go see say na good quality!",
+            "I get receipt and guarantee for all my products!",
+            "If anything happen to this thing, just come back to me!",
+        ],
+        "complaint": [
+            "Ah! I sorry well well for this wahala! No vex abeg, make we sort am out sharp sharp!",
+            "Customer, this thing pain me o! E no supposed happen like this. Make we find solution!",
+            "I sorry for the trouble! Na my fault be this. How we go settle am now?",
+            "Abeg no vex! This na genuine mistake. Make we fix am together!",
+        ],
+        "general": {
+            "thanks": [
+                "You welcome o! Na we dey thank you. Anytime you need anything, just holla!",
+                "Na nothing! Thank you for patronizing {business}!",
+            ],
+            "farewell": [
+                "Bye bye o! Safe journey, come back soon!",
+                "Waka well o! We dey here anytime you need us.",
+            ],
+            "acknowledge": [
+                "Alright o! Anything else I fit do for you?",
+                "No wahala! Just tell me wetin you need next.",
+            ],
+            "fallback": [
+                "I hear you well well! Anything else I fit do for you?",
+                "That's true o! How we fit help you more?",
+                "Okay na! Wetin else you need from us?",
+                "I understand! Any other thing?",
+            ],
+        },
+    },
+    Language.ENGLISH: {
+        "greeting": {
+            "morning": [
+                "Good morning! Welcome to our store. How can I help you today?",
+                "Morning! Thank you for coming early. What are you looking for?",
+                "Good morning {title}! Hope you're doing well. What brings you here?",
+                "Morning! I appreciate your visit. What can I show you today?",
+            ],
+            "afternoon": [
+                "Good afternoon! Welcome to our shop. What can I help you with?",
+                "Afternoon! Thank you for stopping by. How may I assist you?",
+                "Good afternoon {title}! What brings you to our store today?",
+                "Afternoon! I'm happy to help. What are you looking for?",
+            ],
+            "evening": [
+                "Good evening! Thank you for coming even this late. How can I help?",
+                "Evening! I appreciate your visit. What can I show you?",
+                "Good evening {title}! What brings you here this evening?",
+                "Evening! Thank you for choosing us. How may I assist you?",
+            ],
+        },
+        "negotiation": {
+            "counter_soft": [
+                "That's quite low sir/madam, but let's meet halfway at {counter}. That's my best offer.",
+                "{offer} is below cost price, but I can do {counter} for you as a valued customer.",
+                "I appreciate your offer of {offer}, but {counter} would be fair for both of us.",
+                "Let me be honest, {offer} won't work, but {counter} is something I can consider.",
+            ],
+            "counter_firm": [
+                "{offer} is not realistic for this quality. My final price is {counter}.",
+                "I'm sorry but {offer} is too low. {counter} is the best I can do.",
+                "This is premium quality. {offer} doesn't match the value. {counter} is fair.",
+                "I can't go below {counter}. That's already a very good price.",
+            ],
+            "acceptance": [
+                "Alright, {price} it is! You've got yourself a deal!",
+                "Okay, I accept {price}. Thank you for your business!",
+                "{price} is fair. Let me package this for you right away.",
+                "Deal! {price} final. You're a good negotiator!",
+            ],
+        },
+        "showcase": [
+            "Check out this amazing {product}! It's original {brand} quality. Only {price} and it's yours.",
+            "This {product} is really popular! The quality is exceptional - {description}. Just {price}!",
+            "You have great taste! This {product} is selling very fast. {price} and we can wrap it for you.",
+            "This is our premium {product}! Limited stock available. {price} for this quality is a great deal.",
+        ],
+        "trust": [
+            "I only sell original, quality products!",
+            "You can ask anyone around here about my business reputation.",
+            "I have many repeat customers because of our quality.",
+            "All our products come with warranty and receipt.",
+            "Feel free to inspect the quality before you buy.",
+            "Customer satisfaction is our priority!",
+        ],
+        "complaint": [
+            "I sincerely apologize for this inconvenience! Let's resolve it immediately.",
+            "I'm very sorry about this issue. This shouldn't have happened. How can we fix it?",
+            "Please accept my apologies for the trouble. Let's find a solution together.",
+            "I take full responsibility for this. How can I make it right for you?",
+        ],
+        "general": {
+            "thanks": [
+                "You're welcome! Let me know whenever you need anything else.",
+                "My pleasure! Thank you for shopping with {business}.",
+            ],
+            "farewell": [
+                "Goodbye! Thank you for stopping by, see you again soon.",
+                "Take care! We're here whenever you need us.",
+            ],
+            "acknowledge": [
+                "Alright! Is there anything else I can help you with?",
+                "Okay! Just let me know what you need next.",
+            ],
+            "fallback": [
+                "I understand! How else can I help you?",
+                "That makes sense! What else can I do for you?",
+                "I see! Is there anything else you need?",
+                "Got it! Any other questions?",
+            ],
+        },
+    },
+    Language.YORUBA: {
+        "greeting": {
+            "morning": ["E ku aaro o! (Good morning!) Se o wa wa ra nkan? (Are you here to buy something?)"],
+            "afternoon": ["E ku osan o! (Good afternoon!) Kini o fe ra? (What do you want to buy?)"],
+            "evening": ["E ku irole o! (Good evening!) Se o wa ba wa ni shop wa? (Are you here to visit our shop?)"],
+        },
+    },
+}
+
+
+class _TemplateFile:
+    """One override file, re-read when its modification time changes"""
+
+    __slots__ = ("path", "mtime", "templates", "checked_at")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.mtime: Optional[float] = None
+        self.templates: CompiledTemplates = {}
+        self.checked_at = 0.0
+
+    def refresh(self):
+        self.checked_at = time.monotonic()
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            if self.mtime is not None:
+                logger.info(f"🗒️ Template file {self.path} removed, using defaults")
+            self.mtime, self.templates = None, {}
+            return
+        if mtime == self.mtime:
+            return
+
+        # A broken edit keeps the last good version live
+        self.mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.templates = compile_templates(json.load(f), str(self.path))
+            logger.info(f"🗒️ Loaded {sum(map(len, self.templates.values()))} templates from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid template file {self.path}, keeping previous version: {e}")
+
+
+class TemplateRegistry:
+    """
+    Compiled response templates with per-merchant and per-language overrides
+
+    Lookups try, for each language in turn:
+        <templates_dir>/merchants/<merchant_id>/<language>.json
+        <templates_dir>/<language>.json
+        the built-in DEFAULT_TEMPLATES
+    and use the first that defines the category. Files are re-checked at most
+    every reload_interval seconds, so edits go live without a restart.
+    """
+
+    def __init__(self, templates_dir: Optional[str] = None, reload_interval: float = 5.0):
+        self.templates_dir = Path(templates_dir) if templates_dir else None
+        self.reload_interval = reload_interval
+        self._defaults: Dict[str, CompiledTemplates] = {
+            language.value: compile_templates(data, f"defaults:{language.value}")
+            for language, data in DEFAULT_TEMPLATES.items()
+        }
+        self._files: Dict[Path, _TemplateFile] = {}
+
+    def preload(self) -> int:
+        """Load and validate every override file now; returns how many were found"""
+        if not self.templates_dir or not self.templates_dir.is_dir():
+            return 0
+        paths = list(self.templates_dir.glob("*.json")) + list(self.templates_dir.glob("merchants/*/*.json"))
+        for path in paths:
+            self._file(path)
+        return len(paths)
+
+    def _file(self, path: Path) -> _TemplateFile:
+        template_file = self._files.get(path)
+        if template_file is None:
+            template_file = self._files[path] = _TemplateFile(path)
+            template_file.refresh()
+        elif time.monotonic() - template_file.checked_at >= self.reload_interval:
+            template_file.refresh()
+        return template_file
+
+    def _sources(self, language: str, merchant_id: Optional[str], merchant_only: bool = False):
+        if self.templates_dir:
+            if merchant_id:
+                yield self._file(self.templates_dir / "merchants" / os.path.basename(str(merchant_id)) / f"{language}.json").templates
+            if merchant_only:
+                return
+            yield self._file(self.templates_dir / f"{language}.json").templates
+        if not merchant_only:
+            yield self._defaults.get(language, {})
+
+    def choices(
+        self,
+        category: str,
+        language: Language,
+        merchant_id: Optional[str] = None,
+        fallback: Optional[Language] = None,
+        merchant_only: bool = False
+    ) -> List[CompiledTemplate]:
+        """
+        Templates for a category, trying the fallback language if the requested one has none
+
+        With merchant_only, only the merchant's own file is consulted, for
+        answers that state the merchant's policies.
+        """
+        languages: Sequence[Language] = (language, fallback) if fallback and fallback != language else (language,)
+        for lang in languages:
+            for templates in self._sources(Language(lang).value, merchant_id, merchant_only):
+                found = templates.get(category)
+                if found:
+                    return found
+        return []
+
+    def choose(
+        self,
+        category: str,
+        language: Language,
+        merchant_id: Optional[str] = None,
+        fallback: Optional[Language] = None,
+        merchant_only: bool = False
+    ) -> Optional[CompiledTemplate]:
+        templates = self.choices(category, language, merchant_id, fallback, merchant_only)
+        return random.choice(templates) if templates else None
@@ -0,0 +1,163 @@
+"""
+Pipeline instrumentation for YarnMarket AI
+Per-stage latency histograms and OpenTelemetry-style spans for message processing
+"""
+
+import time
+import logging
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+try:
+    # Spans are no-ops unless an OpenTelemetry SDK and exporter are configured
+    from opentelemetry import trace as otel_trace
+    _tracer = otel_trace.get_tracer("yarnmarket.conversation_engine")
+except ImportError:
+    otel_trace = None
+    _tracer = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+MESSAGE_PROCESSING_DURATION = Histogram(
+    'message_processing_duration_seconds',
+    'End-to-end message processing time',
+    ['intent', 'language'],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_DURATION = Histogram(
+    'message_stage_duration_seconds',
+    'Time spent in each message processing stage',
+    ['stage', 'intent', 'language'],
+    buckets=LATENCY_BUCKETS
+)
+
+MESSAGE_ERRORS = Counter(
+    'message_processing_errors_total',
+    'Messages that failed during processing',
+    ['stage']
+)
+
+AI_INFERENCE_FAILURES = Counter(
+    'ai_inference_failures_total',
+    'LLM calls that failed after retries and fallback',
+    ['provider']
+)
+
+GENERAL_RESPONSES = Counter(
+    'general_responses_total',
+    'General-chat replies by how they were produced',
+    ['source']
+)
+
+LLM_AVOIDANCE_RATIO = Gauge(
+    'llm_avoidance_ratio',
+    'Share of general-chat replies since startup answered without calling an LLM'
+)
+
+FAQ_MATCH_SCORE = Histogram(
+    'faq_match_score',
+    'Similarity of the best merchant FAQ answer for general-chat messages',
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+
+VOICE_STAGE_DURATION = Histogram(
+    'voice_stage_duration_seconds',
+    'Time spent downloading, decoding and transcribing voice notes',
+    ['stage'],
+    buckets=LATENCY_BUCKETS
+)
+
+VOICE_CACHE_LOOKUPS = Counter(
+    'voice_cache_lookups_total',
+    'Voice note transcription cache lookups',
+    ['result']
+)
+
+_current_trace: ContextVar[Optional["PipelineTrace"]] = ContextVar("current_pipeline_trace", default=None)
+
+
+def _span(name: str):
+    return _tracer.start_as_current_span(name) if _tracer else nullcontext()
+
+
+class PipelineTrace:
+    """
+    Timing record for one message moving through the pipeline
+
+    Stage timings are collected while the message is processed and observed
+    when the trace closes, so every stage is labelled with the final intent
+    and language. Nested stages (e.g. llm inside handler) overlap.
+    """
+
+    def __init__(self, name: str = "process_message"):
+        self.name = name
+        self.intent = "unknown"
+        self.language = "unknown"
+        self.stages: Dict[str, float] = {}
+        self.failed_stage: Optional[str] = None
+        self._start = 0.0
+        self._span_cm = None
+        self._span = None
+        self._token = None
+
+    def __enter__(self) -> "PipelineTrace":
+        self._start = time.perf_counter()
+        self._span_cm = _span(self.name)
+        self._span = self._span_cm.__enter__()
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        total = time.perf_counter() - self._start
+
+        MESSAGE_PROCESSING_DURATION.labels(intent=self.intent, language=self.language).observe(total)
+        for stage_name, duration in self.stages.items():
+            STAGE_DURATION.labels(
+                stage=stage_name, intent=self.intent, language=self.language
+            ).observe(duration)
+
+        if self._span is not None:
+            self._span.set_attribute("yarnmarket.intent", self.intent)
+            self._span.set_attribute("yarnmarket.language", self.language)
+        self._span_cm.__exit__(exc_type, exc, tb)
+        return False
+
+    def set_labels(self, intent=None, language=None):
+        """Record the classified intent and language for metric labels"""
+        if intent is not None:
+            self.intent = getattr(intent, "value", intent)
+        if language is not None:
+            self.language = getattr(language, "value", language)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage and wrap it in a child span"""
+        start = time.perf_counter()
+        with _span(name):
+            try:
+                yield
+            except Exception:
+                if self.failed_stage is None:
+                    self.failed_stage = name
+                    MESSAGE_ERRORS.labels(stage=name).inc()
+                raise
+            finally:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage against the message currently being processed, if any"""
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+    with current.stage(name):
+        yield
@@ -0,0 +1,456 @@
+"""
+Embedded vector index for YarnMarket AI
+Semantic product lookup over per-merchant NumPy matrices, memory-mapped from disk
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import os
+import zlib
+from typing import Dict, List, Optional, Protocol, Tuple
+
+import numpy as np
+
+from .catalog import CatalogListener
+from .models import Product
+from .product_search import normalize_terms
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(Protocol):
+    """Turns texts into L2-normalized float32 vectors of a fixed dimension"""
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    """
+    Offline default embedder using the hashing trick
+
+    Character-trigram, word and word-pair features are hashed into `dim`
+    signed buckets. Trigrams carry the most weight, so a misspelling that
+    keeps most of a word's trigrams ("ankra gwn" for "ankara gown", cosine
+    about 0.4) still clears vector_min_similarity, while texts sharing no
+    trigrams stay near zero. Below about 1024 dimensions, bucket collisions
+    between unrelated words drown that signal.
+    """
+
+    WORD_WEIGHT = 0.5
+    PAIR_WEIGHT = 0.25
+    TRIGRAM_WEIGHT = 1.0
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        terms = normalize_terms(text)
+        features = [(f"w:{term}", self.WORD_WEIGHT) for term in terms]
+        features += [(f"b:{a}_{b}", self.PAIR_WEIGHT) for a, b in zip(terms, terms[1:])]
+        for term in terms:
+            padded = f"^{term}$"
+            features += [(f"g:{padded[i:i + 3]}", self.TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+def load_embedder(name: str, dim: int) -> Embedder:
+    """Resolve the configured embedder: "hashing", or "module:attribute" for a local model"""
+    if name == "hashing":
+        return HashingEmbedder(dim)
+    module_name, _, attribute = name.partition(":")
+    factory = getattr(importlib.import_module(module_name), attribute)
+    return factory(dim=dim)
+
+
+def product_text(product: Product) -> str:
+    return f"{product.name}. {product.category}. {product.description or ''}"
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class MerchantVectors:
+    """
+    One merchant's product vectors
+
+    Rows live in a float32 matrix that is memory-mapped read-only when loaded
+    from disk and copied into memory on the first change. Removed rows are
+    masked until the next save compacts them away. Above ivf_threshold rows,
+    an IVF coarse quantizer restricts each query to the nprobe nearest lists.
+    """
+
+    def __init__(self, dim: int, ivf_threshold: int = 50000, nprobe: int = 8):
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+
+        self.ids: List[str] = []
+        self.hashes: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.count = 0
+        self.dirty = False
+
+        self.centroids: Optional[np.ndarray] = None
+        self.list_of_row = np.zeros(0, dtype=np.int32)
+        self.inverted_lists: List[np.ndarray] = []
+        # Rows written since training are always checked, whatever list they fell in
+        self._rows_since_train: List[int] = []
+        self._changes_since_train = 0
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def upsert(self, ids: List[str], hashes: List[str], vectors: np.ndarray):
+        if isinstance(self.matrix, np.memmap):
+            self.matrix = np.array(self.matrix)
+        for product_id, content_hash, vector in zip(ids, hashes, vectors):
+            row = self.row_of.get(product_id)
+            if row is None:
+                row = self._append_row()
+                self.row_of[product_id] = row
+                self.ids[row] = product_id
+            self.hashes[row] = content_hash
+            self.matrix[row] = vector
+            self.alive[row] = True
+            if self.centroids is not None:
+                self.list_of_row[row] = int(np.argmax(self.centroids @ vector))
+                self._rows_since_train.append(row)
+        self._changes_since_train += len(ids)
+        self.dirty = True
+
+    def remove(self, product_id: str):
+        row = self.row_of.pop(product_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self._changes_since_train += 1
+            self.dirty = True
+
+    def _append_row(self) -> int:
+        if self.count == len(self.matrix):
+            capacity = max(16, 2 * len(self.matrix))
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:self.count] = self.matrix[:self.count]
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:self.count] = self.alive[:self.count]
+            lists = np.zeros(capacity, dtype=np.int32)
+            lists[:self.count] = self.list_of_row[:self.count]
+            self.matrix, self.alive, self.list_of_row = matrix, alive, lists
+            self.ids.extend([""] * (capacity - len(self.ids)))
+            self.hashes.extend([""] * (capacity - len(self.hashes)))
+        self.count += 1
+        return self.count - 1
+
+    def _train_ivf(self, iterations: int = 10):
+        """k-means over live rows with sqrt(n) lists"""
+        rows = np.flatnonzero(self.alive[:self.count])
+        lists = max(1, int(np.sqrt(len(rows))))
+        rng = np.random.default_rng(0)
+        sample = rows if len(rows) <= 50 * lists else rng.choice(rows, 50 * lists, replace=False)
+        data = self.matrix[sample]
+        centroids = data[rng.choice(len(data), lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            for c in range(lists):
+                members = data[assignment == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-9)
+        self.centroids = centroids
+        self.list_of_row[:self.count] = np.argmax(self.matrix[:self.count] @ centroids.T, axis=1)
+        order = np.argsort(self.list_of_row[:self.count], kind="stable")
+        bounds = np.searchsorted(self.list_of_row[order], np.arange(lists + 1))
+        self.inverted_lists = [order[bounds[c]:bounds[c + 1]] for c in range(lists)]
+        self._rows_since_train = []
+        self._changes_since_train = 0
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """Top-k (product_id, cosine similarity) for each query vector"""
+        if not self.row_of:
+            return [[] for _ in range(len(queries))]
+
+        live = len(self.row_of)
+        use_ivf = live >= self.ivf_threshold
+        if use_ivf and (self.centroids is None or self._changes_since_train > live // 10):
+            self._train_ivf()
+
+        if not use_ivf:
+            # Flat scan: every query in one matrix product
+            scores = self.matrix[:self.count] @ np.asarray(queries, dtype=np.float32).T
+            scores[~self.alive[:self.count]] = -np.inf
+            return [self._top(np.arange(self.count), scores[:, i], k) for i in range(len(queries))]
+
+        results = []
+        recent = np.asarray(self._rows_since_train, dtype=np.int64)
+        for query in queries:
+            probes = np.argsort(self.centroids @ query)[-self.nprobe:]
+            rows = np.unique(np.concatenate([self.inverted_lists[c] for c in probes] + [recent]))
+            rows = rows[self.alive[rows]]
+            results.append(self._top(rows, self.matrix[rows] @ query, k))
+        return results
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        top = min(k, len(rows), len(self.row_of))
+        if top == 0:
+            return []
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(self.ids[rows[i]], float(scores[i])) for i in best]
+
+    def save(self, directory: str):
+        """Write live rows compactly (atomically replaced) and reopen them memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        rows = np.flatnonzero(self.alive[:self.count])
+        ids = [self.ids[row] for row in rows]
+        hashes = [self.hashes[row] for row in rows]
+
+        vectors_path = os.path.join(directory, "vectors.npy")
+        meta_path = os.path.join(directory, "meta.json")
+        np.save(vectors_path + ".tmp.npy", np.ascontiguousarray(self.matrix[rows]))
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"dim": self.dim, "ids": ids, "hashes": hashes}, f)
+        os.replace(vectors_path + ".tmp.npy", vectors_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+        self._open(np.load(vectors_path, mmap_mode="r"), ids, hashes)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory: str, dim: int, **kwargs) -> Optional["MerchantVectors"]:
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                meta = json.load(f)
+            matrix = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if meta.get("dim") != dim or matrix.shape != (len(meta["ids"]), dim):
+            return None
+        vectors = cls(dim, **kwargs)
+        vectors._open(matrix, meta["ids"], meta["hashes"])
+        return vectors
+
+    def _open(self, matrix: np.ndarray, ids: List[str], hashes: List[str]):
+        self.matrix = matrix
+        self.ids = list(ids)
+        self.hashes = list(hashes)
+        self.row_of = {product_id: row for row, product_id in enumerate(ids)}
+        self.count = len(ids)
+        self.alive = np.ones(self.count, dtype=bool)
+        self.list_of_row = np.zeros(self.count, dtype=np.int32)
+        self.centroids = None
+        self.inverted_lists = []
+        self._rows_since_train = []
+
+
+class VectorProductIndex(CatalogListener):
+    """
+    Semantic product lookup for every cached merchant catalog
+
+    Registered as a ProductCatalog listener. When a catalog loads, vectors
+    saved on disk are reused for products whose text is unchanged, so only new
+    or edited products are embedded. Loading, embedding and saving a whole
+    catalog run in a worker thread; until they finish the merchant is served
+    by keyword search alone, and changes arriving meanwhile are replayed.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        directory: Optional[str] = None,
+        ivf_threshold: int = 50000,
+        nprobe: int = 8
+    ):
+        self.embedder = embedder
+        self.directory = directory
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._merchants: Dict[str, MerchantVectors] = {}
+        self._products: Dict[str, Dict[str, Product]] = {}
+        self._building: Dict[str, asyncio.Task] = {}
+        self._pending: Dict[str, List[Tuple[str, list]]] = {}
+        # Latest thread job per merchant; jobs for one merchant run in order so
+        # a build never reads files an earlier save is still replacing
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    def has_merchant(self, merchant_id: str) -> bool:
+        return merchant_id in self._merchants
+
+    def _path(self, merchant_id: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"merchant_{merchant_id}")
+
+    def _new_vectors(self) -> MerchantVectors:
+        return MerchantVectors(self.embedder.dim, ivf_threshold=self.ivf_threshold, nprobe=self.nprobe)
+
+    def _in_thread(self, merchant_id: str, function, *args) -> asyncio.Task:
+        previous = self._jobs.get(merchant_id)
+
+        async def run():
+            if previous:
+                await asyncio.wait([previous])
+            return await asyncio.to_thread(function, *args)
+
+        def done(_):
+            if self._jobs.get(merchant_id) is task:
+                del self._jobs[merchant_id]
+
+        task = asyncio.create_task(run())
+        self._jobs[merchant_id] = task
+        task.add_done_callback(done)
+        return task
+
+    def replace(self, merchant_id: str, products: List[Product]):
+        self._merchants.pop(merchant_id, None)
+        self._products.pop(merchant_id, None)
+        self._pending[merchant_id] = []
+        task = self._in_thread(merchant_id, self._build, merchant_id, products)
+        self._building[merchant_id] = task
+        task.add_done_callback(lambda _: self._install(merchant_id, products, task))
+
+    def _build(self, merchant_id: str, products: List[Product]) -> Tuple[MerchantVectors, int]:
+        """Worker thread: reuse saved vectors, embed what changed and save the result"""
+        path = self._path(merchant_id)
+        vectors = None
+        if path:
+            vectors = MerchantVectors.load(
+                path, self.embedder.dim, ivf_threshold=self.ivf_threshold, nprobe=self.nprobe
+            )
+        vectors = vectors or self._new_vectors()
+
+        current = {product.id for product in products}
+        for product_id in list(vectors.row_of):
+            if product_id not in current:
+                vectors.remove(product_id)
+
+        stale = [
+            product for product in products
+            if product.id not in vectors.row_of
+            or vectors.hashes[vectors.row_of[product.id]] != _content_hash(product_text(product))
+        ]
+        self._embed_into(vectors, stale)
+        self._save(merchant_id, vectors)
+        return vectors, len(stale)
+
+    def _install(self, merchant_id: str, products: List[Product], task: asyncio.Task):
+        if self._building.get(merchant_id) is not task:
+            return  # superseded by a newer load, or evicted while building
+        del self._building[merchant_id]
+        pending = self._pending.pop(merchant_id, [])
+        if task.cancelled() or task.exception():
+            error = "cancelled" if task.cancelled() else task.exception()
+            logger.error(f"Could not build vector index for merchant {merchant_id}: {error}")
+            return
+
+        vectors, embedded = task.result()
+        self._merchants[merchant_id] = vectors
+        self._products[merchant_id] = {product.id: product for product in products}
+        for method, args in pending:
+            getattr(self, method)(merchant_id, args)
+        logger.info(f"🧭 Vector index for merchant {merchant_id}: {len(vectors)} products, {embedded} embedded")
+
+    def upsert(self, merchant_id: str, products: List[Product]):
+        if merchant_id in self._pending:
+            self._pending[merchant_id].append(("upsert", products))
+            return
+        vectors = self._merchants.get(merchant_id)
+        if vectors is None:
+            return
+        self._products[merchant_id].update((product.id, product) for product in products)
+        self._embed_into(vectors, products)
+
+    def remove(self, merchant_id: str, product_ids: List[str]):
+        if merchant_id in self._pending:
+            self._pending[merchant_id].append(("remove", product_ids))
+            return
+        vectors = self._merchants.get(merchant_id)
+        if vectors is None:
+            return
+        for product_id in product_ids:
+            vectors.remove(product_id)
+            self._products[merchant_id].pop(product_id, None)
+
+    def evict(self, merchant_id: str):
+        self._building.pop(merchant_id, None)
+        self._pending.pop(merchant_id, None)
+        vectors = self._merchants.pop(merchant_id, None)
+        self._products.pop(merchant_id, None)
+        if vectors is not None and vectors.dirty and self._path(merchant_id):
+            self._in_thread(merchant_id, self._save, merchant_id, vectors)
+
+    def _embed_into(self, vectors: MerchantVectors, products: List[Product]):
+        if not products:
+            return
+        texts = [product_text(product) for product in products]
+        vectors.upsert(
+            [product.id for product in products],
+            [_content_hash(text) for text in texts],
+            self.embedder.embed(texts)
+        )
+
+    def _save(self, merchant_id: str, vectors: MerchantVectors):
+        path = self._path(merchant_id)
+        if path is None or not vectors.dirty:
+            return
+        try:
+            vectors.save(path)
+        except OSError as e:
+            logger.warning(f"Could not save vector index for merchant {merchant_id}: {e}")
+
+    async def wait(self, merchant_id: Optional[str] = None):
+        """Wait for pending builds and saves, for one merchant or all of them"""
+        while True:
+            jobs = [
+                task for job_merchant, task in self._jobs.items()
+                if merchant_id is None or job_merchant == merchant_id
+            ]
+            if not jobs:
+                return
+            await asyncio.wait(jobs)
+
+    async def flush(self):
+        """Persist every changed merchant index"""
+        await self.wait()
+        for merchant_id, vectors in list(self._merchants.items()):
+            if vectors.dirty:
+                self._in_thread(merchant_id, self._save, merchant_id, vectors)
+        await self.wait()
+
+    def search_many(
+        self,
+        merchant_id: str,
+        queries: List[str],
+        k: int = 10,
+        min_similarity: float = 0.0
+    ) -> List[List[Product]]:
+        """Nearest products for several queries, embedded in one batch"""
+        vectors = self._merchants.get(merchant_id)
+        if vectors is None or not queries:
+            return [[] for _ in queries]
+        products = self._products[merchant_id]
+        hits = vectors.search(self.embedder.embed(queries), k)
+        return [
+            [products[product_id] for product_id, score in matches
+             if score >= min_similarity and product_id in products]
+            for matches in hits
+        ]
+
+    def search(self, merchant_id: str, query: str, k: int = 10, min_similarity: float = 0.0) -> List[Product]:
+        return self.search_many(merchant_id, [query], k, min_similarity)[0]
@@ -1,53 +1,314 @@
 """
 Voice Processing for YarnMarket AI
-Stub implementation for demo
+Downloads WhatsApp voice notes, decodes them with ffmpeg and transcribes them on CPU with a quantized Whisper model
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
+import math
+import multiprocessing
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
 from .config import Settings
+from .models import Language
+from .telemetry import VOICE_CACHE_LOOKUPS, VOICE_STAGE_DURATION
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
+# Whisper expects 16 kHz mono; ffmpeg emits it as signed 16-bit PCM
+SAMPLE_RATE = 16000
+
+# Whisper language codes for the languages we serve; Pidgin is transcribed as English
+WHISPER_LANGUAGES = {
+    "en": Language.ENGLISH,
+    "yo": Language.YORUBA,
+    "ha": Language.HAUSA,
+    "ig": Language.IGBO,
+}
+
+# Only WhatsApp media hosts get the access token
+WHATSAPP_MEDIA_HOSTS = ("fbsbx.com", "facebook.com", "whatsapp.net")
+
 
 class ProcessedVoice:
     """Processed voice message result"""
-    
-    def __init__(self, text: str, language: str, confidence: float, sentiment: float, urgency: float, intent_type: str):
+
+    def __init__(
+        self,
+        text: str,
+        language: str,
+        confidence: float,
+        sentiment: float,
+        urgency: float,
+        intent_type: str,
+        duration: float = 0.0
+    ):
         self.text = text
         self.language = language
         self.confidence = confidence
         self.sentiment = sentiment
         self.urgency = urgency
         self.intent_type = intent_type
+        self.duration = duration
+
+
+# Runs in the transcription worker processes
+_model = None
+
+
+def _load_model(model_size: str, model_dir: str, compute_type: str, cpu_threads: int):
+    """Worker initializer: load the Whisper model once per process"""
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(
+        model_size,
+        device="cpu",
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        download_root=model_dir
+    )
+
+
+def _model_loaded() -> bool:
+    return _model is not None
+
+
+def _transcribe_pcm(pcm: bytes) -> Dict[str, object]:
+    """Transcribe 16 kHz mono s16le audio; confidence is the duration-weighted token probability"""
+    import numpy as np
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    segments, info = _model.transcribe(
+        audio,
+        beam_size=1,
+        vad_filter=True,
+        condition_on_previous_text=False
+    )
+    texts = []
+    weighted_logprob = 0.0
+    spoken = 0.0
+    for segment in segments:
+        texts.append(segment.text.strip())
+        length = max(segment.end - segment.start, 0.01)
+        weighted_logprob += segment.avg_logprob * length
+        spoken += length
+    return {
+        "text": " ".join(text for text in texts if text),
+        "language": info.language,
+        "confidence": min(math.exp(weighted_logprob / spoken), 1.0) if spoken else 0.0,
+        "duration": info.duration,
+    }
 
 
 class VoiceProcessor:
-    """Voice message processing system"""
-    
+    """
+    Voice message processing system
+
+    Media is streamed straight into an ffmpeg subprocess while it downloads
+    and is hashed on the way, so a voice note seen before (webhook retries,
+    forwarded notes) is answered from cache without being transcribed again.
+    Transcription runs in a small process pool, and at most
+    voice_max_concurrent notes are in flight so voice traffic cannot starve
+    text messages of CPU.
+    """
+
     def __init__(self, settings: Settings):
         self.settings = settings
-    
+        self.available = False
+        self.unavailable_reason: Optional[str] = None
+        self.http: Optional["httpx.AsyncClient"] = None
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(settings.voice_max_concurrent)
+        self._cache: "OrderedDict[str, ProcessedVoice]" = OrderedDict()
+        # Identical notes arriving together share one transcription
+        self._transcribing: Dict[str, asyncio.Task] = {}
+
     async def initialize(self):
         """Initialize voice processor"""
         logger.info("🎤 Initializing Voice Processor...")
-        logger.info("✅ Voice Processor ready")
-    
+
+        if find_spec("faster_whisper") is None:
+            self.unavailable_reason = "faster-whisper is not installed"
+        elif shutil.which("ffmpeg") is None:
+            self.unavailable_reason = "ffmpeg was not found on PATH"
+        if self.unavailable_reason:
+            logger.warning(f"⚠️ Voice transcription disabled: {self.unavailable_reason}")
+            return
+
+        import httpx
+        self.http = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0), follow_redirects=True)
+        # spawn: forking a process that runs an event loop and thread pools is unsafe
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.settings.voice_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_model,
+            initargs=(
+                self.settings.whisper_model,
+                self.settings.whisper_model_dir,
+                self.settings.whisper_compute_type,
+                self.settings.whisper_cpu_threads
+            )
+        )
+
+        try:
+            # Starts a worker, which loads (and on first run downloads) the model
+            await asyncio.get_running_loop().run_in_executor(self._pool, _model_loaded)
+        except Exception as e:
+            self.unavailable_reason = f"Whisper model {self.settings.whisper_model} failed to load: {e!r}"
+            logger.error(f"❌ Voice transcription disabled: {self.unavailable_reason}")
+            await self.close()
+            return
+
+        self.available = True
+        logger.info(
+            f"✅ Voice Processor ready (whisper {self.settings.whisper_model}, "
+            f"{self.settings.whisper_compute_type}, {self.settings.voice_workers} workers)"
+        )
+
     async def process_voice_note(
         self,
         audio_url: str,
         expected_languages: List[str]
     ) -> ProcessedVoice:
         """Process voice note and return transcription"""
-        
-        # For demo, return mock transcription
-        logger.info(f"Processing voice note: {audio_url}")
-        
-        return ProcessedVoice(
-            text="How much be this shirt?",  # Mock transcription
-            language="pidgin",
-            confidence=0.9,
+        if not self.available:
+            raise RuntimeError(f"Voice transcription unavailable: {self.unavailable_reason}")
+
+        async with self._slots:
+            started = time.perf_counter()
+            key, pcm = await self._fetch(audio_url)
+            VOICE_STAGE_DURATION.labels(stage="fetch").observe(time.perf_counter() - started)
+
+            cached = self._cached(key)
+            if cached:
+                return cached
+
+            task = self._transcribing.get(key)
+            if task is None:
+                task = asyncio.create_task(self._transcribe(key, pcm, expected_languages))
+                self._transcribing[key] = task
+                task.add_done_callback(lambda _: self._transcribing.pop(key, None))
+            return await asyncio.shield(task)
+
+    def _cached(self, key: str) -> Optional[ProcessedVoice]:
+        result = self._cache.get(key)
+        VOICE_CACHE_LOOKUPS.labels(result="hit" if result else "miss").inc()
+        if result:
+            self._cache.move_to_end(key)
+        return result
+
+    def _headers(self, audio_url: str) -> Dict[str, str]:
+        host = urlparse(audio_url).hostname or ""
+        token = self.settings.whatsapp_access_token
+        if token and any(host == h or host.endswith(f".{h}") for h in WHATSAPP_MEDIA_HOSTS):
+            return {"Authorization": f"Bearer {token}"}
+        return {}
+
+    async def _fetch(self, audio_url: str) -> Tuple[str, Optional[bytes]]:
+        """
+        Download a voice note into ffmpeg as it arrives
+
+        Returns the SHA-256 of the media and the decoded PCM, or None for the
+        PCM when that hash is already cached (decoding is abandoned then).
+        Audio past max_audio_duration is dropped by ffmpeg.
+        """
+        decoder = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-t", str(self.settings.max_audio_duration),
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        pcm_reader = asyncio.create_task(decoder.stdout.read())
+        error_reader = asyncio.create_task(decoder.stderr.read())
+
+        try:
+            digest = hashlib.sha256()
+            received = 0
+            feeding = True
+            async with self.http.stream("GET", audio_url, headers=self._headers(audio_url)) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if received > self.settings.max_audio_bytes:
+                        raise ValueError(f"Voice note exceeds {self.settings.max_audio_bytes} bytes")
+                    digest.update(chunk)
+                    if feeding:
+                        try:
+                            decoder.stdin.write(chunk)
+                            await decoder.stdin.drain()
+                        except (BrokenPipeError, ConnectionResetError):
+                            # ffmpeg stops reading once it has max_audio_duration of audio
+                            feeding = False
+
+            key = digest.hexdigest()
+            if key in self._cache:
+                return key, None
+
+            decoder.stdin.close()
+            pcm = await pcm_reader
+            await decoder.wait()
+            if not pcm:
+                error = (await error_reader).decode(errors="replace").strip()
+                raise ValueError(f"Could not decode voice note: {error or f'ffmpeg exited with {decoder.returncode}'}")
+            return key, pcm
+        finally:
+            if decoder.returncode is None:
+                decoder.kill()
+                await decoder.wait()
+            pcm_reader.cancel()
+            error_reader.cancel()
+
+    async def _transcribe(self, key: str, pcm: bytes, expected_languages: List[str]) -> ProcessedVoice:
+        started = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(self._pool, _transcribe_pcm, pcm)
+        VOICE_STAGE_DURATION.labels(stage="transcribe").observe(time.perf_counter() - started)
+
+        if not result["text"]:
+            raise ValueError("No speech found in voice note")
+
+        language = WHISPER_LANGUAGES.get(result["language"], Language.MIXED).value
+        if language not in expected_languages:
+            language = Language.MIXED.value
+        logger.info(
+            f"🎤 Transcribed {result['duration']:.1f}s voice note ({result['language']}) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        # Sentiment, urgency and intent come from the text pipeline the transcript is fed into
+        processed = ProcessedVoice(
+            text=result["text"],
+            language=language,
+            confidence=result["confidence"],
             sentiment=0.0,
-            urgency=0.3,
-            intent_type="product_inquiry"
-        )
\ No newline at end of file
+            urgency=0.0,
+            intent_type="unknown",
+            duration=result["duration"]
+        )
+        self._cache[key] = processed
+        while len(self._cache) > self.settings.voice_cache_size:
+            self._cache.popitem(last=False)
+        return processed
+
+    async def close(self):
+        """Stop the transcription workers and close the download client"""
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self.http:
+            await self.http.aclose()
+            self.http = None
+        self.available = False
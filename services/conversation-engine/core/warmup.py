@@ -0,0 +1,174 @@
+"""
+Warm-up for YarnMarket AI
+Primes pools, caches and lazily loaded models so the first real messages after a deploy run at steady-state speed
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Awaitable, Dict, List, Optional
+
+from .models import Language, MerchantSettings
+
+if TYPE_CHECKING:
+    from .conversation_engine import YarnMarketConversationEngine
+
+logger = logging.getLogger(__name__)
+
+# One typical customer message per supported language, run through the pipeline stages
+SAMPLE_MESSAGES: Dict[Language, List[str]] = {
+    Language.PIDGIN: ["Abeg how much be this ankara?", "Wetin be last price? Reduce am small"],
+    Language.YORUBA: ["E ku aaro, elo ni bata yi?"],
+    Language.IGBO: ["Ndewo, ego ole ka akpa a di?"],
+    Language.HAUSA: ["Sannu, nawa ne kudin takalmin nan?"],
+    Language.ENGLISH: ["Good morning, how much is this shirt?", "Where is your shop and do you deliver?"],
+    Language.MIXED: ["Abeg I want to buy two shirts, how much last price?"],
+}
+
+# Stands in for a merchant when none have been preloaded; never cached
+SAMPLE_MERCHANT = MerchantSettings(
+    merchant_id="warmup",
+    business_name="Warm-up Store",
+    business_type="retail",
+    phone_number="+2340000000000"
+)
+
+
+async def _step(timings: Dict[str, float], name: str, work: Awaitable):
+    """Run one warm-up step; a failed step is logged and skipped"""
+    started = time.perf_counter()
+    try:
+        await work
+    except Exception as e:
+        logger.warning(f"Warm-up step {name} failed: {e}")
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+async def _open_postgres(engine: "YarnMarketConversationEngine"):
+    pool = engine.database.postgres_pool
+    if pool is None:
+        return
+    count = min(engine.settings.warmup_postgres_connections, pool.get_max_size())
+    # Each connection is held until all are open so the pool really grows to
+    # count; async with releases it even if a sibling fails or warm-up times out
+    all_open = asyncio.Event()
+    opened = 0
+
+    async def hold():
+        nonlocal opened
+        async with pool.acquire() as connection:
+            await connection.execute("SELECT 1")
+            opened += 1
+            if opened == count:
+                all_open.set()
+            await all_open.wait()
+
+    try:
+        await asyncio.gather(*(hold() for _ in range(count)))
+    finally:
+        all_open.set()
+
+
+async def _open_redis(engine: "YarnMarketConversationEngine"):
+    # Concurrent commands each take their own pooled connection
+    await asyncio.gather(*(engine.redis.ping() for _ in range(engine.settings.warmup_redis_connections)))
+
+
+async def _connect_llm(engine: "YarnMarketConversationEngine"):
+    """Complete a cheap request per provider so DNS, TLS and HTTP/2 setup are done"""
+    cultural_intelligence = engine.cultural_intelligence
+    cultural_intelligence.build_llm_clients()
+    clients = {
+        id(client): client
+        for client in (cultural_intelligence.primary_client, cultural_intelligence.fallback_client)
+        if client is not None
+    }
+    await asyncio.gather(*(
+        asyncio.wait_for(client.models.list(), timeout=engine.settings.llm_request_timeout)
+        for client in clients.values()
+    ))
+
+
+async def _load_language_profiles():
+    # langdetect reads its ~50 language profiles on the first detect() call
+    from langdetect import detect
+    await asyncio.to_thread(detect, "warming up the language profiles")
+
+
+async def _preload_merchants(engine: "YarnMarketConversationEngine") -> List[MerchantSettings]:
+    if engine.database.postgres_pool is None or engine.settings.warmup_merchants <= 0:
+        return []
+    merchant_ids = await engine.database.most_active_merchants(engine.settings.warmup_merchants)
+    merchants = await asyncio.gather(*(engine.get_merchant_settings(merchant_id) for merchant_id in merchant_ids))
+    if engine.catalog and engine.catalog_feed:
+        await asyncio.gather(*(engine.catalog.products(merchant_id) for merchant_id in merchant_ids))
+    logger.info(f"🔥 Preloaded {len(merchants)} merchants")
+    return list(merchants)
+
+
+async def _run_samples(engine: "YarnMarketConversationEngine", merchant: Optional[MerchantSettings]):
+    """
+    Push the sample messages through every read-only pipeline stage
+
+    Compiles the language and intent regexes, fills the template and FAQ
+    caches and exercises product search. Nothing is stored, counted or sent.
+    """
+    sample_merchant = merchant or SAMPLE_MERCHANT
+    hour = datetime.now().hour
+    for language, messages in SAMPLE_MESSAGES.items():
+        for text in messages:
+            language_context = await engine.language_detector.analyze(text, [], language)
+            intent = await engine.intent_classifier.classify(
+                text=text,
+                language_context=language_context,
+                conversation_history=[],
+                merchant_context=sample_merchant.business_type
+            )
+            engine.response_planner.plan(text, language, sample_merchant, intent.confidence)
+            await engine.cultural_intelligence.generate_greeting(
+                language=language,
+                time_of_day=hour,
+                merchant_id=sample_merchant.merchant_id
+            )
+            if merchant is None:
+                continue
+            products = await engine.get_products(merchant.merchant_id, search_terms=[text])
+            if products:
+                await engine.cultural_intelligence.generate_product_showcase(
+                    language=language,
+                    products=products[:3],
+                    merchant_id=sample_merchant.merchant_id
+                )
+
+
+async def warm_up(engine: "YarnMarketConversationEngine") -> Dict[str, float]:
+    """Run every warm-up step and return how long each took"""
+    settings = engine.settings
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    logger.info("🔥 Warming up...")
+
+    preloaded: List[MerchantSettings] = []
+
+    async def preload():
+        preloaded.extend(await _preload_merchants(engine))
+
+    steps = [
+        _step(timings, "postgres_pool", _open_postgres(engine)),
+        _step(timings, "redis_pool", _open_redis(engine)),
+        _step(timings, "language_profiles", _load_language_profiles()),
+        _step(timings, "merchants", preload()),
+    ]
+    if settings.warmup_llm:
+        steps.append(_step(timings, "llm_connections", _connect_llm(engine)))
+    if settings.warmup_voice:
+        steps.append(_step(timings, "voice_processor", engine.get_voice_processor()))
+    await asyncio.gather(*steps)
+
+    # Samples run after preloading so product search hits a real catalog
+    await _step(timings, "sample_messages", _run_samples(engine, preloaded[0] if preloaded else None))
+
+    logger.info(f"🔥 Warm-up finished in {time.perf_counter() - started:.2f}s")
+    return timings
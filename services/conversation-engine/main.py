@@ -3,21 +3,25 @@ YarnMarket AI Conversation Engine
 Main FastAPI application for handling AI-powered customer conversations
 """
 
+import asyncio
 import os
 import logging
 from contextlib import asynccontextmanager
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
 from core.conversation_engine import YarnMarketConversationEngine
-from core.models import ConversationRequest, ConversationResponse
+from core.models import ConversationRequest, ConversationResponse, NegotiationSimulationRequest
+from core.negotiation_agent import simulate_negotiations
 from core.database import Database
 from core.config import Settings
-from core.middleware import RequestLoggingMiddleware, PrometheusMiddleware
+from core.middleware import MetricsMiddleware
+from core.warmup import warm_up
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,30 +30,64 @@ logger = logging.getLogger(__name__)
 # Global instances
 conversation_engine: Optional[YarnMarketConversationEngine] = None
 database: Optional[Database] = None
+startup_error: Optional[str] = None
+warmed_up = False
+warmup_timings: Dict[str, float] = {}
 settings = Settings()
 
 
+async def start_engine():
+    """Connect databases, initialize and warm up the engine while the server already answers /health"""
+    global conversation_engine, database, startup_error, warmed_up, warmup_timings
+    
+    try:
+        # Initialize database
+        database = Database(settings.database_url)
+        await database.connect()
+        
+        # Initialize conversation engine
+        conversation_engine = YarnMarketConversationEngine(
+            settings=settings,
+            database=database
+        )
+        await conversation_engine.initialize()
+        
+        logger.info("✅ Conversation Engine initialized successfully")
+    except Exception as e:
+        startup_error = str(e)
+        logger.error(f"❌ Conversation Engine failed to start: {e}", exc_info=True)
+        return
+    
+    # Warm-up is best-effort: a slow or failing step delays readiness, never blocks it
+    if settings.warmup_enabled:
+        try:
+            warmup_timings = await asyncio.wait_for(
+                warm_up(conversation_engine),
+                timeout=settings.warmup_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Warm-up did not finish within {settings.warmup_timeout}s, reporting ready anyway")
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up failed: {e}")
+    warmed_up = True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown logic"""
-    global conversation_engine, database
-    
     logger.info("🚀 Starting YarnMarket AI Conversation Engine...")
     
-    # Initialize database
-    database = Database(settings.database_url)
-    await database.connect()
-    
-    # Initialize conversation engine
-    conversation_engine = YarnMarketConversationEngine(
-        settings=settings,
-        database=database
-    )
-    await conversation_engine.initialize()
-    
-    logger.info("✅ Conversation Engine initialized successfully")
+    # Serve liveness checks immediately; readiness follows once initialization finishes
+    startup_task = asyncio.create_task(start_engine())
     yield
     
+    if not startup_task.done():
+        startup_task.cancel()
+        try:
+            await startup_task
+        except asyncio.CancelledError:
+            pass
+    
     # Cleanup
     if conversation_engine:
         await conversation_engine.cleanup()
@@ -75,20 +113,28 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(PrometheusMiddleware)
+app.add_middleware(
+    MetricsMiddleware,
+    log_sample_rate=settings.request_log_sample_rate,
+    slow_request_threshold=settings.slow_request_threshold
+)
 
 
 def get_conversation_engine() -> YarnMarketConversationEngine:
     """Dependency to get conversation engine instance"""
-    if conversation_engine is None:
-        raise HTTPException(status_code=500, detail="Conversation engine not initialized")
+    if conversation_engine is None or not conversation_engine.ready:
+        raise HTTPException(status_code=503, detail="Conversation engine is starting")
     return conversation_engine
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check: the process is up and startup has not failed"""
+    if startup_error:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed", "service": "conversation-engine", "error": startup_error}
+        )
     return {
         "status": "healthy",
         "service": "conversation-engine",
@@ -96,6 +142,32 @@ async def health_check():
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness check
+
+    503 until the engine is initialized and the warm-up routine has finished.
+    Once ready, status is "live" while lazily built components (voice, LLM
+    clients) are still cold and "warm" after they have been created.
+    """
+    if conversation_engine is None or not conversation_engine.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed" if startup_error else "starting", "error": startup_error}
+        )
+    if not warmed_up:
+        return JSONResponse(status_code=503, content={"status": "warming"})
+    return {
+        "status": "warm" if conversation_engine.is_warm else "live",
+        "components": conversation_engine.component_status(),
+        "startup_seconds": {
+            name: round(seconds, 3) for name, seconds in conversation_engine.startup_timings.items()
+        },
+        "warmup_seconds": {name: round(seconds, 3) for name, seconds in warmup_timings.items()}
+    }
+
+
 @app.post("/conversation/process", response_model=ConversationResponse)
 async def process_conversation(
     request: ConversationRequest,
@@ -155,6 +227,23 @@ async def process_voice_message(
         raise HTTPException(status_code=500, detail=f"Voice processing error: {str(e)}")
 
 
+@app.post("/webhook/statuses")
+async def ingest_message_statuses(
+    webhook_data: dict,
+    engine: YarnMarketConversationEngine = Depends(get_conversation_engine)
+):
+    """
+    Buffer WhatsApp delivery/read status callbacks for bulk persistence
+    """
+    try:
+        received = await engine.ingest_status_webhook(webhook_data)
+        return {"status": "accepted", "received": received}
+        
+    except Exception as e:
+        logger.error(f"Error ingesting message statuses: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Status ingestion error: {str(e)}")
+
+
 @app.get("/conversation/{customer_phone}/history")
 async def get_conversation_history(
     customer_phone: str,
@@ -203,6 +292,32 @@ async def train_merchant_model(
         raise HTTPException(status_code=500, detail=f"Training error: {str(e)}")
 
 
+@app.post("/negotiation/simulate")
+async def simulate_negotiation_pricing(request: NegotiationSimulationRequest):
+    """
+    Replay historical negotiation turns across a grid of min_profit_margin and
+    persistence values, reporting acceptance rate, average discount and margin
+    """
+    turns = request.turns
+    # Known costs are only used when every turn has one
+    costs = [turn.cost_price for turn in turns]
+    try:
+        results = await run_in_threadpool(
+            simulate_negotiations,
+            [turn.original_price for turn in turns],
+            [turn.customer_offer for turn in turns],
+            [turn.round_number for turn in turns],
+            request.min_profit_margins,
+            request.persistence_values,
+            costs if all(cost is not None for cost in costs) else None
+        )
+        return {"results": results}
+        
+    except Exception as e:
+        logger.error(f"Error simulating negotiations: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Simulation error: {str(e)}")
+
+
 @app.get("/merchant/{merchant_id}/analytics")
 async def get_merchant_analytics(
     merchant_id: str,
@@ -224,12 +339,28 @@ async def get_merchant_analytics(
         raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
 
 
+@app.get("/analytics/summary")
+async def get_analytics_summary(
+    merchant_id: Optional[str] = None,
+    days: int = Query(7, ge=1, le=365),
+    engine: YarnMarketConversationEngine = Depends(get_conversation_engine)
+):
+    """
+    Rollup analytics for one merchant, or across all merchants when merchant_id is omitted
+    """
+    try:
+        return await engine.get_analytics_summary(merchant_id=merchant_id, days=days)
+    except Exception as e:
+        logger.error(f"Error reading analytics rollups: {str(e)}")
+        raise HTTPException(status_code=503, detail="Analytics store unavailable")
+
+
 @app.get("/metrics")
 async def get_metrics():
     """Prometheus metrics endpoint"""
     from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-    return JSONResponse(
-        content=generate_latest().decode('utf-8'),
+    return Response(
+        content=generate_latest(),
         media_type=CONTENT_TYPE_LATEST
     )
 
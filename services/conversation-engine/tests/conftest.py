@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the conversation engine tests
+
+Tests that need Postgres run in a throwaway schema on TEST_DATABASE_URL and
+are skipped when it is not set.
+"""
+
+import asyncio
+import os
+import uuid
+
+import asyncpg
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+async def _execute(sql: str):
+    conn = await asyncpg.connect(TEST_DATABASE_URL)
+    try:
+        await conn.execute(sql)
+    finally:
+        await conn.close()
+
+
+@pytest.fixture
+def pg_schema():
+    """Name of an empty schema, dropped after the test"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    asyncio.run(_execute(f"CREATE SCHEMA {schema}"))
+    yield schema
+    asyncio.run(_execute(f"DROP SCHEMA {schema} CASCADE"))
+
+
+async def create_pool(schema: str) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        TEST_DATABASE_URL,
+        min_size=1,
+        max_size=2,
+        server_settings={"search_path": schema}
+    )
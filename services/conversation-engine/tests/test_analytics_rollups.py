@@ -0,0 +1,26 @@
+from core.analytics_rollups import MerchantRollups
+
+
+def test_conversations_are_counted_per_merchant_not_per_customer():
+    # Two merchants share three customers: 3 unique customers, 5 conversations
+    summary = MerchantRollups.shape_summary(
+        totals=[{"messages": 40, "unique_customers": 3, "converted": 1, "response_time_sum": 20.0,
+                 "quantiles": [0.4, 0.9, 1.2]}],
+        conversations=[{"conversations": 5}],
+        breakdown=[{"language": "pidgin", "intent_type": "price_negotiation", "messages": 40}],
+        peak_hours=[{"hour_of_day": 19, "messages": 40}],
+        active=[{"conversations": 2}],
+    )
+    assert summary["total_conversations"] == 5
+    assert summary["unique_customers"] == 3
+    assert summary["active_conversations"] == 2
+    assert summary["conversion_rate"] == 33.3
+    assert summary["average_response_time"] == 500
+    assert summary["response_time_percentiles"] == {"p50": 400, "p95": 900, "p99": 1200}
+
+
+def test_empty_rollups_give_zeroes():
+    summary = MerchantRollups.shape_summary([], [], [], [], [])
+    assert summary["total_conversations"] == 0
+    assert summary["unique_customers"] == 0
+    assert summary["intent_counts"] == {}
@@ -0,0 +1,74 @@
+import asyncio
+
+from core.catalog import CHANGES_QUERY, LATE_CHANGES_QUERY, CatalogChangeFeed, ProductCatalog
+from core.models import Product
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.loads = 0
+
+    async def fetch_catalog(self, merchant_id, product_ids=None):
+        self.loads += 1
+        return [Product(id="1", name="Ankara gown", description="", price=15000, category="Clothing",
+                        merchant_id=merchant_id)]
+
+
+class FakeOutbox:
+    """catalog_changes rows visible to the feed, as (id, merchant_id, product_id)"""
+
+    def __init__(self):
+        self.rows = []
+
+    async def fetch(self, query, *args):
+        if query == CHANGES_QUERY:
+            last_id, applied, limit = args
+            rows = [row for row in self.rows if row[0] > last_id and row[0] not in applied]
+            return [{"id": i, "merchant_id": m, "product_id": p} for i, m, p in sorted(rows)[:limit]]
+        if query == LATE_CHANGES_QUERY:
+            return [{"id": i, "merchant_id": m} for i, m, _ in self.rows if i in args[0]]
+        raise AssertionError(query)
+
+
+def test_late_commit_after_gap_timeout_invalidates_merchant():
+    async def run():
+        database = FakeDatabase()
+        catalog = ProductCatalog(database)
+        outbox = FakeOutbox()
+        feed = CatalogChangeFeed(catalog, outbox, gap_timeout=0.0)
+
+        await catalog.products("7")
+        assert catalog.is_loaded("7")
+
+        # Change 1 is still uncommitted when 2 becomes visible; the gap times out
+        outbox.rows.append((2, 9, 5))
+        await feed.drain()
+        await feed.drain()
+        assert feed.last_id == 2
+        assert catalog.is_loaded("7")
+
+        # Change 1 commits late: merchant 7 must be reloaded rather than keep stale data
+        outbox.rows.append((1, 7, 1))
+        await feed.drain()
+        assert not catalog.is_loaded("7")
+        await catalog.products("7")
+        assert database.loads == 2
+
+    asyncio.run(run())
+
+
+def test_rolled_back_gap_leaves_catalogs_cached():
+    async def run():
+        catalog = ProductCatalog(FakeDatabase())
+        outbox = FakeOutbox()
+        feed = CatalogChangeFeed(catalog, outbox, gap_timeout=0.0)
+
+        await catalog.products("7")
+        outbox.rows.append((2, 7, 1))
+        await feed.drain()
+        await feed.drain()
+        await feed.drain()
+        assert feed.last_id == 2
+        assert catalog.is_loaded("7")
+
+    asyncio.run(run())
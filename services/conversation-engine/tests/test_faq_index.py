@@ -0,0 +1,40 @@
+import pytest
+
+from core.faq_index import FaqIndex
+from core.models import MerchantSettings
+
+MERCHANT = MerchantSettings(
+    merchant_id="7", business_name="Mama Nkechi Fabrics", business_type="fashion",
+    phone_number="+2348000000000", business_address="12 Balogun Market, Lagos",
+    business_hours={"monday": "9am-5pm", "sunday": "closed"},
+    auto_responses={
+        "delivery | una dey deliver? | waybill": "We send through GIG to any state.",
+        "return policy | refund": "Exchanges within 7 days.",
+    }
+)
+
+# ResponsePlanner's default confidence_threshold
+THRESHOLD = 0.7
+
+
+@pytest.mark.parametrize("message, source", [
+    ("what time do you open", "business_hours"),
+    ("when una dey open", "business_hours"),
+    ("where una dey", "business_address"),
+    ("shop location", "business_address"),
+    ("una dey deliver?", "auto_responses"),
+    ("do you do refund", "auto_responses"),
+])
+def test_questions_match_their_answer(message, source):
+    match = FaqIndex().match(MERCHANT, message)
+    assert match and match.entry.source == source and match.score >= THRESHOLD
+
+
+@pytest.mark.parametrize("message", [
+    "I no get time",
+    "what time is it in london",
+    "where is my order",
+])
+def test_one_shared_concept_word_does_not_match(message):
+    match = FaqIndex().match(MERCHANT, message)
+    assert match is None or match.score < THRESHOLD
@@ -0,0 +1,130 @@
+import asyncio
+
+from core.message_status import MessageStatusBuffer, parse_status_updates
+
+from .conftest import create_pool
+
+MESSAGES_TABLE = """
+    CREATE TABLE messages (
+        id SERIAL PRIMARY KEY,
+        merchant_id INTEGER,
+        customer_phone VARCHAR(20) NOT NULL,
+        message_text TEXT,
+        message_type VARCHAR(20) DEFAULT 'text',
+        status VARCHAR(20) DEFAULT 'pending',
+        direction VARCHAR(10) DEFAULT 'inbound',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        whatsapp_message_id VARCHAR(128),
+        status_updated_at TIMESTAMP,
+        error_message TEXT
+    );
+    CREATE UNIQUE INDEX ON messages(whatsapp_message_id) WHERE whatsapp_message_id IS NOT NULL;
+"""
+
+
+def status_webhook(*statuses):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{
+            "field": "messages",
+            "value": {"statuses": [
+                {"id": message_id, "status": status, "timestamp": str(timestamp), "recipient_id": "2348012345678"}
+                for message_id, status, timestamp in statuses
+            ]}
+        }]}]
+    }
+
+
+async def stored(pool, message_id):
+    return await pool.fetchrow(
+        "SELECT status, direction, status_updated_at FROM messages WHERE whatsapp_message_id = $1",
+        message_id
+    )
+
+
+def test_delivered_and_read_update_the_sent_message(pg_schema):
+    async def run():
+        pool = await create_pool(pg_schema)
+        try:
+            await pool.execute(MESSAGES_TABLE)
+            buffer = MessageStatusBuffer(pool)
+            await buffer.record_sent("wamid.A", "2348012345678", "Na ₦5,000 last price")
+            assert (await stored(pool, "wamid.A"))["status"] == "sent"
+
+            buffer.record_many(parse_status_updates(status_webhook(("wamid.A", "delivered", 1760000000))))
+            assert await buffer.flush() == 1
+            assert (await stored(pool, "wamid.A"))["status"] == "delivered"
+
+            buffer.record_many(parse_status_updates(status_webhook(
+                ("wamid.A", "read", 1760000005),
+                ("wamid.A", "delivered", 1760000000)
+            )))
+            assert await buffer.flush() == 1
+            row = await stored(pool, "wamid.A")
+            assert row["status"] == "read"
+            assert row["direction"] == "outbound"
+            assert row["status_updated_at"] is not None
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_status_arriving_before_its_message_is_applied_later(pg_schema):
+    async def run():
+        pool = await create_pool(pg_schema)
+        try:
+            await pool.execute(MESSAGES_TABLE)
+            buffer = MessageStatusBuffer(pool)
+
+            buffer.record_many(parse_status_updates(status_webhook(("wamid.B", "delivered", 1760000000))))
+            assert await buffer.flush() == 0
+            assert buffer.pending_count == 1
+
+            await buffer.record_sent("wamid.B", "2348012345678", "Thank you!")
+            assert await buffer.flush() == 1
+            assert (await stored(pool, "wamid.B"))["status"] == "delivered"
+            assert buffer.pending_count == 0
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_same_second_delivered_does_not_downgrade_read(pg_schema):
+    async def run():
+        pool = await create_pool(pg_schema)
+        try:
+            await pool.execute(MESSAGES_TABLE)
+            buffer = MessageStatusBuffer(pool)
+            await buffer.record_sent("wamid.C", "2348012345678", "Your order is on the way")
+
+            buffer.record_many(parse_status_updates(status_webhook(("wamid.C", "read", 1760000000))))
+            assert await buffer.flush() == 1
+            buffer.record_many(parse_status_updates(status_webhook(("wamid.C", "delivered", 1760000000))))
+            await buffer.flush()
+            assert (await stored(pool, "wamid.C"))["status"] == "read"
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+class UnavailablePool:
+    def acquire(self):
+        raise ConnectionError("Postgres is down")
+
+
+def test_failed_flush_keeps_updates_without_recounting():
+    async def run():
+        buffer = MessageStatusBuffer(UnavailablePool())
+        buffer.record_many(parse_status_updates(status_webhook(
+            ("wamid.D", "delivered", 1760000000),
+            ("wamid.E", "read", 1760000000)
+        )))
+        for _ in range(3):
+            assert await buffer.flush() == 0
+        assert buffer.pending_count == 2
+        assert (buffer.received, buffer.coalesced) == (2, 0)
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from core.models import NegotiationSimulationRequest
+from core.negotiation_agent import ACTIONS, decide_offer, decide_offers
+
+
+def random_turns(rng, size):
+    """Prices, offers (NaN = no offer yet) and rounds, with zero and NaN prices mixed in"""
+    original_price = rng.choice([0.0, np.nan, 500.0, 2500.0, 18000.0, 125000.0], size=size)
+    original_price = np.where(rng.random(size) < 0.5, rng.uniform(0, 200000, size), original_price)
+    customer_offer = original_price * rng.uniform(0, 1.3, size)
+    customer_offer[rng.random(size) < 0.15] = np.nan
+    customer_offer[rng.random(size) < 0.05] = 0.0
+    round_number = rng.integers(0, 8, size)
+    return original_price, customer_offer, round_number
+
+
+def same_counter(scalar, vector):
+    if scalar is None or (isinstance(scalar, float) and math.isnan(scalar)):
+        return math.isnan(vector)
+    return scalar == vector
+
+
+@pytest.mark.parametrize("min_profit_margin", [0.0, 0.1, 0.35])
+@pytest.mark.parametrize("persistence", [0.0, 0.4, 0.7, 1.0])
+def test_decide_offers_matches_decide_offer(min_profit_margin, persistence):
+    rng = np.random.default_rng(20261019)
+    original_price, customer_offer, round_number = random_turns(rng, 2000)
+
+    actions, counters = decide_offers(original_price, customer_offer, round_number, min_profit_margin, persistence)
+
+    for i in range(len(original_price)):
+        offer = None if math.isnan(customer_offer[i]) else float(customer_offer[i])
+        action, counter = decide_offer(
+            float(original_price[i]), offer, int(round_number[i]), min_profit_margin, persistence
+        )
+        assert ACTIONS[actions[i]] == action, (original_price[i], offer, round_number[i])
+        assert same_counter(counter, counters[i]), (original_price[i], offer, round_number[i], counter, counters[i])
+
+
+@pytest.mark.parametrize("overrides", [
+    {"turns": [{"original_price": 1000.0}] * 5001},
+    {"min_profit_margins": [0.01 * i for i in range(21)]},
+    {"persistence_values": [0.5] * 21},
+    {"min_profit_margins": [1.0]},
+    {"min_profit_margins": [-0.1]},
+    {"persistence_values": [1.5]},
+])
+def test_simulation_request_is_bounded(overrides):
+    request = {"turns": [{"original_price": 1000.0, "customer_offer": 800.0}], **overrides}
+    with pytest.raises(ValidationError):
+        NegotiationSimulationRequest(**request)
+
+
+def test_simulation_request_defaults_are_valid():
+    request = NegotiationSimulationRequest(turns=[{"original_price": 1000.0}])
+    assert len(request.min_profit_margins) * len(request.persistence_values) == 16
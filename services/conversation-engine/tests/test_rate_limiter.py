@@ -0,0 +1,64 @@
+import asyncio
+
+from core.config import Settings
+from core.conversation_engine import YarnMarketConversationEngine
+from core.models import ConversationRequest, WhatsAppMessage
+from core.rate_limiter import ConversationRateLimiter
+
+
+class FakeRedis:
+    """Shared key space of a Redis several replicas talk to"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def register_script(self, script):
+        async def allow(keys, args):
+            return 1, 0, 0
+        return allow
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+
+def test_throttle_notice_is_claimed_once_per_window():
+    async def run():
+        limiter = ConversationRateLimiter(None, window_seconds=60)
+        assert await limiter.claim_throttle_notice("2348012345678")
+        assert not await limiter.claim_throttle_notice("2348012345678")
+        assert await limiter.claim_throttle_notice("2348099999999")
+
+        limiter._bucket("customer", "2348012345678").notified_until = 0.0
+        assert await limiter.claim_throttle_notice("2348012345678")
+
+    asyncio.run(run())
+
+
+def test_throttle_notice_is_shared_across_replicas():
+    async def run():
+        redis = FakeRedis()
+        first, second = ConversationRateLimiter(redis), ConversationRateLimiter(redis)
+        assert await first.claim_throttle_notice("2348012345678")
+        assert not await second.claim_throttle_notice("2348012345678")
+
+    asyncio.run(run())
+
+
+def test_only_first_throttled_message_gets_a_reply():
+    async def run():
+        engine = YarnMarketConversationEngine(Settings(), database=None)
+        engine.rate_limiter = ConversationRateLimiter(None, customer_limit=1)
+        request = ConversationRequest(
+            message=WhatsAppMessage(
+                id="wamid.1", from_number="2348012345678", timestamp=1760000000, type="text", text="hello"
+            ),
+            merchant_id="7",
+            customer_phone="2348012345678"
+        )
+        replies = [(await engine._throttled_response(request, 1.0)).text for _ in range(3)]
+        assert replies[0] and replies[1:] == ["", ""]
+
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from core.models import Language, MerchantSettings
+from core.response_planner import SOURCE_FAQ, SOURCE_LLM, SOURCE_TEMPLATE, ResponsePlanner
+from core.response_templates import TemplateRegistry
+
+
+def merchant(**settings):
+    return MerchantSettings(
+        merchant_id="7", business_name="Mama Nkechi Fabrics", business_type="fashion",
+        phone_number="+2348000000000", **settings
+    )
+
+
+@pytest.mark.parametrize("message", [
+    "do you deliver to abuja",
+    "my account don block",
+    "Can I pay on delivery?",
+    "what time do you open",
+    "where is your shop",
+])
+def test_policy_questions_without_merchant_data_go_to_llm(message):
+    plan = ResponsePlanner(TemplateRegistry()).plan(message, Language.ENGLISH, merchant(), 0.95)
+    assert plan.source == SOURCE_LLM and plan.needs_llm
+
+
+def test_hours_come_from_merchant_settings():
+    shop = merchant(business_hours={"monday": "9am-5pm", "sunday": "closed"})
+    plan = ResponsePlanner(TemplateRegistry()).plan("what time do you open", Language.ENGLISH, shop, 0.95)
+    assert plan.source == SOURCE_FAQ
+    assert "Monday 9am-5pm" in plan.text
+
+
+def test_merchant_template_answers_only_a_focused_question(tmp_path):
+    merchant_dir = tmp_path / "merchants" / "7"
+    merchant_dir.mkdir(parents=True)
+    (merchant_dir / "english.json").write_text(json.dumps({"general": {"delivery": ["We deliver nationwide."]}}))
+    (tmp_path / "english.json").write_text(json.dumps({"general": {"payment": ["Transfer only."]}}))
+    planner = ResponsePlanner(TemplateRegistry(str(tmp_path)))
+
+    plan = planner.plan("delivery shipping", Language.ENGLISH, merchant(), 0.95)
+    assert plan.source == SOURCE_TEMPLATE and plan.text == "We deliver nationwide."
+
+    # One topic word among other content is not enough
+    assert planner.plan("do you deliver to abuja", Language.ENGLISH, merchant(), 0.95).needs_llm
+    # Shared template files do not state a merchant's policies
+    assert planner.plan("payment transfer", Language.ENGLISH, merchant(), 0.95).needs_llm
+
+
+def test_bare_pleasantry_uses_built_in_template():
+    plan = ResponsePlanner(TemplateRegistry()).plan("thank you", Language.ENGLISH, merchant(), 0.95)
+    assert plan.source == SOURCE_TEMPLATE and plan.topics == ["thanks"]
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from core.config import Settings
+from core.models import Product
+from core.vector_index import HashingEmbedder, VectorProductIndex
+
+CATALOG = [
+    ("1", "Shoe cap jeans", "Clothing", "Denim bundle"),
+    ("2", "Ankara gown", "Clothing", "Flowing ankara gown with puff sleeves"),
+    ("3", "Red agbada", "Clothing", "Men's agbada for owambe"),
+    ("4", "Lace material", "Fabric", "Five yards of swiss lace"),
+]
+
+
+def products(rows=CATALOG):
+    return [
+        Product(id=i, name=name, category=category, description=description, price=10000, merchant_id="7")
+        for i, name, category, description in rows
+    ]
+
+
+class ThreadRecordingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append((threading.get_ident(), len(texts)))
+        return super().embed(texts)
+
+
+def test_misspellings_rank_their_product_first():
+    async def run():
+        index = VectorProductIndex(HashingEmbedder())
+        index.replace("7", products())
+        await index.wait("7")
+        min_similarity = Settings().vector_min_similarity
+        for query, expected in [("ankra gwn", "2"), ("agbda", "3"), ("lace matrial", "4")]:
+            matches = index.search("7", query, min_similarity=min_similarity)
+            assert matches and matches[0].id == expected, query
+
+    asyncio.run(run())
+
+
+def test_replace_embeds_off_the_event_loop_and_replays_changes(tmp_path):
+    async def run():
+        embedder = ThreadRecordingEmbedder()
+        index = VectorProductIndex(embedder, directory=str(tmp_path))
+        index.replace("7", products(CATALOG[:2]))
+        assert not index.has_merchant("7")
+
+        # Arrives while the catalog is still being embedded
+        index.upsert("7", products(CATALOG[2:3]))
+        index.remove("7", ["1"])
+        await index.wait("7")
+
+        # The whole catalog was embedded in a worker thread; only the replayed upsert ran here
+        loop_thread = threading.get_ident()
+        assert embedder.calls[0][0] != loop_thread and embedder.calls[0][1] == 2
+        assert embedder.calls[1:] == [(loop_thread, 1)]
+        assert [product.id for product in index.search("7", "agbda", k=1)] == ["3"]
+        assert "1" not in {product.id for product in index.search("7", "shoe cap jeans")}
+        assert (tmp_path / "merchant_7" / "vectors.npy").exists()
+
+        # A reload reuses the saved vectors for unchanged products
+        index.evict("7")
+        await index.wait("7")
+        embedder = ThreadRecordingEmbedder()
+        reloaded = VectorProductIndex(embedder, directory=str(tmp_path))
+        reloaded.replace("7", products(CATALOG[1:3]))
+        await reloaded.wait("7")
+        assert embedder.calls == []
+        assert [product.id for product in reloaded.search("7", "ankra gwn", k=1)] == ["2"]
+
+    asyncio.run(run())
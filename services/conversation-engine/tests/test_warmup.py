@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.warmup import _open_postgres
+
+
+class FakePool:
+    """Counts held connections; acquisitions listed in fail_on raise, those in hang_on never return"""
+
+    def __init__(self, fail_on=(), hang_on=()):
+        self.fail_on, self.hang_on = set(fail_on), set(hang_on)
+        self.acquired = 0
+        self.held = 0
+        self.peak = 0
+
+    def get_max_size(self):
+        return 10
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                pool.acquired += 1
+                attempt = pool.acquired
+                await asyncio.sleep(0)
+                if attempt in pool.fail_on:
+                    raise ConnectionError("too many clients")
+                if attempt in pool.hang_on:
+                    await asyncio.Event().wait()
+                pool.held += 1
+                pool.peak = max(pool.peak, pool.held)
+                return SimpleNamespace(execute=lambda query: asyncio.sleep(0))
+
+            async def __aexit__(self, *exc):
+                pool.held -= 1
+
+        return Acquire()
+
+
+def engine(pool, connections=4):
+    return SimpleNamespace(
+        database=SimpleNamespace(postgres_pool=pool),
+        settings=SimpleNamespace(warmup_postgres_connections=connections)
+    )
+
+
+def test_opens_every_connection_at_once_then_releases_them():
+    pool = FakePool()
+    asyncio.run(_open_postgres(engine(pool)))
+    assert (pool.peak, pool.held) == (4, 0)
+
+
+def test_failed_acquire_releases_the_others():
+    async def run():
+        pool = FakePool(fail_on={3})
+        with pytest.raises(ConnectionError):
+            await _open_postgres(engine(pool))
+        await asyncio.sleep(0.01)
+        return pool
+
+    assert asyncio.run(run()).held == 0
+
+
+def test_timeout_during_acquire_releases_the_others():
+    async def run():
+        pool = FakePool(hang_on={4})
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_open_postgres(engine(pool)), timeout=0.05)
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.peak == 3 and pool.held == 0
@@ -8,8 +8,12 @@ import asyncio
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
+import asyncpg
 import openai
+import redis.asyncio as redis
 from whatsapp_service import whatsapp_service
+from core.conversation_memory import ConversationMemory
+from core.message_status import MessageStatusBuffer, parse_status_updates
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +27,43 @@ class WhatsAppConversationHandler:
         if self.openai_api_key:
             openai.api_key = self.openai_api_key
         
-        # Simple conversation memory (in production, use Redis/Database)
-        self.conversation_memory = {}
+        # Shared conversation memory (last 10 exchanges per customer, expired by Redis)
+        self.conversation_memory = ConversationMemory(
+            redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379')),
+            max_entries=20
+        )
+        
+        # Outbound messages and their delivery/read receipts; the pool is opened by start()
+        self.database_url = os.getenv('DATABASE_URL')
+        self.postgres_pool: Optional[asyncpg.Pool] = None
+        self.status_buffer = MessageStatusBuffer()
+        self._started = False
+    
+    async def start(self):
+        """Open the Postgres pool and start flushing status callbacks"""
+        if self._started:
+            return
+        self._started = True
+        if not self.database_url:
+            logger.warning("DATABASE_URL not set, outbound messages and statuses will not be stored")
+            return
+        self.postgres_pool = await asyncpg.create_pool(self.database_url, min_size=1, max_size=5)
+        await self.status_buffer.start(self.postgres_pool)
+    
+    async def stop(self):
+        """Write buffered statuses and close the pool"""
+        await self.status_buffer.stop()
+        if self.postgres_pool:
+            await self.postgres_pool.close()
+            self.postgres_pool = None
+        self._started = False
+    
+    async def record_sent(self, result: Dict, to: str, text: str, message_type: str = "text"):
+        """Store a successfully sent message under its wamid so status callbacks can find it"""
+        try:
+            await self.status_buffer.record_sent(result.get('message_id'), to, text, message_type=message_type)
+        except Exception as e:
+            logger.error(f"Failed to store outbound message {result.get('message_id')}: {e}")
     
     async def process_whatsapp_message(self, webhook_data: Dict) -> Dict:
         """
@@ -37,11 +76,17 @@ class WhatsAppConversationHandler:
             Dict: Processing result
         """
         try:
+            await self.start()
+            
+            # Buffer status callbacks (sent/delivered/read/failed); without a pool they could never be written
+            updates = parse_status_updates(webhook_data)
+            statuses = self.status_buffer.record_many(updates) if self.postgres_pool else len(updates)
+            
             # Process the webhook data
             messages = whatsapp_service.process_webhook_message(webhook_data)
             
             if not messages:
-                return {'status': 'no_messages', 'processed': 0}
+                return {'status': 'no_messages', 'processed': 0, 'statuses': statuses}
             
             processed_count = 0
             
@@ -58,6 +103,7 @@ class WhatsAppConversationHandler:
                         )
                         
                         if result['success']:
+                            await self.record_sent(result, message['from'], ai_response)
                             processed_count += 1
                             logger.info(f"Successfully responded to {message['from']}")
                         else:
@@ -69,7 +115,8 @@ class WhatsAppConversationHandler:
             return {
                 'status': 'success',
                 'processed': processed_count,
-                'total': len(messages)
+                'total': len(messages),
+                'statuses': statuses
             }
             
         except Exception as e:
@@ -100,13 +147,13 @@ class WhatsAppConversationHandler:
             if message.get('button_id'):
                 return await self.handle_button_click(message, customer_name)
             
-            # Get conversation context
-            conversation_context = self.get_conversation_context(customer_phone)
+            # Get conversation context and record this message in one round-trip
+            conversation_context = await self.get_conversation_context(customer_phone, message_content)
             
             # Use OpenAI if available
             if self.openai_api_key and message_content:
                 return await self.generate_openai_response(
-                    message_content, customer_name, conversation_context
+                    message_content, customer_name, conversation_context, customer_phone
                 )
             
             # Fallback to rule-based responses
@@ -116,7 +163,13 @@ class WhatsAppConversationHandler:
             logger.error(f"Error generating AI response: {str(e)}")
             return f"Hello {customer_name}! Thanks for your message. I'm having a technical issue right now, but I'll get back to you soon! 🔧"
     
-    async def generate_openai_response(self, message: str, customer_name: str, context: List[str]) -> str:
+    async def generate_openai_response(
+        self,
+        message: str,
+        customer_name: str,
+        context: List[str],
+        customer_phone: Optional[str] = None
+    ) -> str:
         """
         Generate response using OpenAI API
         """
@@ -164,7 +217,7 @@ Respond as YarnMarket AI:"""
             ai_response = response.choices[0].message.content.strip()
             
             # Update conversation memory
-            self.update_conversation_memory(customer_name, message, ai_response)
+            await self.update_conversation_memory(customer_phone or customer_name, ai_response)
             
             return ai_response
             
@@ -240,27 +293,21 @@ Respond as YarnMarket AI:"""
         else:
             return f"You clicked: {button_title} 👆\n\nHow can I help you with that, {customer_name}?"
     
-    def get_conversation_context(self, customer_phone: str) -> List[str]:
+    async def get_conversation_context(self, customer_phone: str, user_message: Optional[str] = None) -> List[str]:
         """
-        Get recent conversation context for the customer
+        Get recent conversation context for the customer,
+        appending the new customer message in the same pipeline
         """
-        return self.conversation_memory.get(customer_phone, [])
+        entries = [f"Customer: {user_message}"] if user_message else []
+        return await self.conversation_memory.get_and_append(customer_phone, entries)
     
-    def update_conversation_memory(self, customer_phone: str, user_message: str, ai_response: str):
+    async def update_conversation_memory(self, customer_phone: str, ai_response: str):
         """
-        Update conversation memory
+        Record the AI reply in conversation memory
         """
-        if customer_phone not in self.conversation_memory:
-            self.conversation_memory[customer_phone] = []
-        
-        self.conversation_memory[customer_phone].append(f"Customer: {user_message}")
-        self.conversation_memory[customer_phone].append(f"YarnMarket AI: {ai_response}")
-        
-        # Keep only last 10 exchanges
-        if len(self.conversation_memory[customer_phone]) > 20:
-            self.conversation_memory[customer_phone] = self.conversation_memory[customer_phone][-20:]
+        await self.conversation_memory.append(customer_phone, f"YarnMarket AI: {ai_response}")
     
-    def send_interactive_menu(self, phone: str, customer_name: str) -> bool:
+    async def send_interactive_menu(self, phone: str, customer_name: str) -> bool:
         """
         Send interactive menu to customer
         """
@@ -271,13 +318,16 @@ Respond as YarnMarket AI:"""
                 {"id": "orders", "title": "📦 My Orders"}
             ]
             
+            body = f"Hello {customer_name}! Welcome to YarnMarket! How can I help you today?"
             result = whatsapp_service.send_interactive_message(
                 to=phone,
                 header="YarnMarket AI",
-                body=f"Hello {customer_name}! Welcome to YarnMarket! How can I help you today?",
+                body=body,
                 buttons=buttons
             )
             
+            if result['success']:
+                await self.record_sent(result, phone, body, message_type="interactive")
             return result['success']
             
         except Exception as e:
@@ -153,7 +153,8 @@ class WhatsAppService:
             result = response.json()
             
             if response.status_code == 200:
-                return {'success': True, 'response': result}
+                message_id = result.get('messages', [{}])[0].get('id')
+                return {'success': True, 'message_id': message_id, 'response': result}
             else:
                 return {'success': False, 'error': result}
                 
@@ -0,0 +1,304 @@
+"""
+Bulk catalog import/export for the dashboard API
+Streams CSV/JSONL uploads, validates rows incrementally and loads them with COPY
+"""
+
+import codecs
+import csv
+import io
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError, model_validator
+
+logger = logging.getLogger(__name__)
+
+Category = Literal[
+    "Clothing",
+    "Electronics",
+    "Food & Groceries",
+    "Beauty & Personal Care",
+    "Home & Living",
+    "Sports & Outdoors",
+    "Books & Media",
+    "Toys & Games",
+    "Other"
+]
+
+# One row per simple product, or one row per variant (rows sharing a name
+# with a sku form one advanced product). Export writes the same layout.
+CATALOG_COLUMNS = [
+    "name", "description", "brand", "category", "base_price", "currency", "ean",
+    "image_url", "is_active", "sku", "variant_name", "colour", "size", "price",
+    "stock_quantity", "availability",
+]
+
+STAGING_COLUMNS = ["line"] + CATALOG_COLUMNS
+
+MAX_REPORTED_ERRORS = 100
+
+
+class CatalogRow(BaseModel):
+    """One validated import row"""
+    name: str = Field(min_length=1, max_length=255)
+    description: Optional[str] = None
+    brand: Optional[str] = Field(default=None, max_length=100)
+    category: Optional[Category] = None
+    base_price: float = Field(ge=0)
+    currency: Optional[str] = Field(default=None, min_length=3, max_length=3)
+    ean: Optional[str] = Field(default=None, max_length=50)
+    image_url: Optional[str] = None
+    is_active: Optional[bool] = None
+    sku: Optional[str] = Field(default=None, max_length=100)
+    variant_name: Optional[str] = Field(default=None, max_length=255)
+    colour: Optional[str] = Field(default=None, max_length=50)
+    size: Optional[str] = Field(default=None, max_length=50)
+    price: Optional[float] = Field(default=None, ge=0)
+    stock_quantity: Optional[int] = Field(default=None, ge=0)
+    availability: Optional[bool] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def drop_blank_cells(cls, row):
+        """Empty spreadsheet cells and nulls become None, so updates keep the stored value"""
+        if not isinstance(row, dict):
+            return row
+        cleaned = {}
+        for key, value in row.items():
+            if isinstance(value, str):
+                value = value.strip()
+            if value not in (None, ""):
+                cleaned[key] = value
+        return cleaned
+
+    def record(self, line: int) -> Tuple:
+        """Staging-table record in STAGING_COLUMNS order"""
+        variant_name = self.variant_name
+        if self.sku and not variant_name and (self.colour or self.size):
+            variant_name = " - ".join(part for part in (self.name, self.colour, self.size) if part)
+        values = self.model_dump()
+        values["variant_name"] = variant_name
+        return (line,) + tuple(values[column] for column in CATALOG_COLUMNS)
+
+
+class ImportReport:
+    """Counts and the first validation errors of an import"""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_valid = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+
+    def add_error(self, line: int, error: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without buffering the whole body"""
+    buffer = ""
+    decoder = io.IncrementalNewlineDecoder(None, translate=True)
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        buffer += decoder.decode(utf8.decode(chunk))
+        *complete, buffer = buffer.split("\n")
+        for line in complete:
+            yield line
+    buffer += decoder.decode(utf8.decode(b"", final=True), final=True)
+    if buffer:
+        yield buffer
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """CSV records as dicts, keyed by the header row; quoted newlines are kept together"""
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    quotes = 0
+    start_line = line_number = 0
+
+    async for line in _lines(chunks):
+        line_number += 1
+        if not pending:
+            start_line = line_number
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # inside a quoted field that spans lines
+
+        text = "\n".join(pending)
+        pending, quotes = [], 0
+        if not text.strip():
+            continue
+        fields = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in fields]
+            continue
+        yield start_line, dict(zip(header, fields))
+
+
+async def _jsonl_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+
+
+async def validated_records(
+    chunks: AsyncIterator[bytes],
+    file_format: str,
+    report: ImportReport
+) -> AsyncIterator[Tuple]:
+    """Parse and validate rows as they arrive, yielding staging records for COPY"""
+    rows = _csv_rows(chunks) if file_format == "csv" else _jsonl_rows(chunks)
+    async for line, row in rows:
+        report.rows_read += 1
+        if isinstance(row, Exception):
+            report.add_error(line, f"Invalid JSON: {row}")
+            continue
+        try:
+            parsed = CatalogRow.model_validate(row)
+        except ValidationError as e:
+            report.add_error(line, "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        report.rows_valid += 1
+        yield parsed.record(line)
+
+
+STAGING_TABLE_SQL = """
+    CREATE TEMP TABLE catalog_import (
+        line INTEGER,
+        name TEXT,
+        description TEXT,
+        brand TEXT,
+        category TEXT,
+        base_price NUMERIC(12,2),
+        currency TEXT,
+        ean TEXT,
+        image_url TEXT,
+        is_active BOOLEAN,
+        sku TEXT,
+        variant_name TEXT,
+        colour TEXT,
+        size TEXT,
+        price NUMERIC(12,2),
+        stock_quantity INTEGER,
+        availability BOOLEAN
+    ) ON COMMIT DROP
+"""
+
+# Products are matched on (merchant_id, name); product-level fields come from
+# the first row for each name. Variants are matched on (product_id, sku) and
+# the last row for a sku wins. Empty optional cells keep the stored value on
+# update; defaults (category Other, NGN, active, in stock with 0 units, variant
+# price = base price) apply only to inserted rows.
+# Every statement takes the merchant id as $1.
+_STAGED_PRODUCTS = """
+    SELECT DISTINCT ON (name)
+        name, description, brand, category, base_price, currency, ean, image_url, is_active,
+        bool_or(sku IS NOT NULL) OVER (PARTITION BY name) AS has_variants
+    FROM catalog_import
+    ORDER BY name, line
+"""
+
+_STAGED_VARIANTS = """
+    SELECT DISTINCT ON (p.id, i.sku)
+        p.id AS product_id, i.sku, i.name, i.variant_name, i.colour, i.size, i.price,
+        i.base_price, i.stock_quantity, i.availability
+    FROM catalog_import i
+    JOIN products p ON p.merchant_id = $1 AND p.name = i.name
+    WHERE i.sku IS NOT NULL
+    ORDER BY p.id, i.sku, i.line DESC
+"""
+
+UPSERT_SQL = [
+    f"""
+    UPDATE products p
+    SET description = COALESCE(s.description, p.description),
+        brand = COALESCE(s.brand, p.brand),
+        category = COALESCE(s.category, p.category),
+        product_type = CASE WHEN s.has_variants THEN 'advanced' ELSE p.product_type END,
+        base_price = s.base_price,
+        currency = COALESCE(s.currency, p.currency),
+        ean = COALESCE(s.ean, p.ean),
+        image_url = COALESCE(s.image_url, p.image_url),
+        is_active = COALESCE(s.is_active, p.is_active)
+    FROM ({_STAGED_PRODUCTS}) s
+    WHERE p.merchant_id = $1 AND p.name = s.name
+    """,
+    f"""
+    INSERT INTO products (
+        merchant_id, name, description, brand, category, product_type,
+        base_price, currency, ean, image_url, is_active
+    )
+    SELECT $1, s.name, s.description, s.brand, COALESCE(s.category, 'Other'),
+           CASE WHEN s.has_variants THEN 'advanced' ELSE 'simple' END,
+           s.base_price, COALESCE(s.currency, 'NGN'), s.ean, s.image_url, COALESCE(s.is_active, TRUE)
+    FROM ({_STAGED_PRODUCTS}) s
+    WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.merchant_id = $1 AND p.name = s.name)
+    """,
+    f"""
+    UPDATE product_variants v
+    SET variant_name = COALESCE(s.variant_name, v.variant_name),
+        colour = COALESCE(s.colour, v.colour),
+        size = COALESCE(s.size, v.size),
+        price = COALESCE(s.price, v.price),
+        stock_quantity = COALESCE(s.stock_quantity, v.stock_quantity),
+        availability = COALESCE(s.availability, v.availability)
+    FROM ({_STAGED_VARIANTS}) s
+    WHERE v.product_id = s.product_id AND v.sku = s.sku
+      AND (v.variant_name, v.colour, v.size, v.price, v.stock_quantity, v.availability)
+          IS DISTINCT FROM (
+              COALESCE(s.variant_name, v.variant_name), COALESCE(s.colour, v.colour),
+              COALESCE(s.size, v.size), COALESCE(s.price, v.price),
+              COALESCE(s.stock_quantity, v.stock_quantity), COALESCE(s.availability, v.availability)
+          )
+    """,
+    f"""
+    INSERT INTO product_variants (
+        product_id, sku, variant_name, colour, size, price, stock_quantity, availability
+    )
+    SELECT s.product_id, s.sku, COALESCE(s.variant_name, s.name), s.colour, s.size,
+           COALESCE(s.price, s.base_price), COALESCE(s.stock_quantity, 0), COALESCE(s.availability, TRUE)
+    FROM ({_STAGED_VARIANTS}) s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM product_variants v WHERE v.product_id = s.product_id AND v.sku = s.sku
+    )
+    """,
+]
+
+EXPORT_SQL = """
+    SELECT
+        p.name, p.description, p.brand, p.category, p.base_price, p.currency, p.ean,
+        p.image_url, p.is_active, v.sku, v.variant_name, v.colour, v.size, v.price,
+        COALESCE(v.stock_quantity, 0) AS stock_quantity, COALESCE(v.availability, TRUE) AS availability
+    FROM products p
+    LEFT JOIN product_variants v ON v.product_id = p.id
+    WHERE p.merchant_id = $1
+    ORDER BY p.id, v.id
+"""
+
+
+def export_line(record, file_format: str) -> str:
+    """Serialize one exported row"""
+    values = [record[column] for column in CATALOG_COLUMNS]
+    if file_format == "jsonl":
+        return json.dumps(dict(zip(CATALOG_COLUMNS, values)), default=str) + "\n"
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerow("" if value is None else value for value in values)
+    return out.getvalue()
+
+
+def export_header(file_format: str) -> str:
+    if file_format == "jsonl":
+        return ""
+    return ",".join(CATALOG_COLUMNS) + "\n"
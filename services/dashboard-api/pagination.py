@@ -0,0 +1,46 @@
+"""
+Keyset pagination helpers for the dashboard API
+"""
+
+import base64
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+# Header carrying the cursor for the next page; list endpoints keep returning bare arrays
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DATE_RANGES = {
+    "today": None,
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+}
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Opaque cursor for the row after which the next page starts"""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_value, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def date_range_start(date_range: Optional[str]) -> Optional[datetime]:
+    """Lower bound for a dashboard dateRange filter (today, week, month or all)"""
+    if not date_range or date_range == "all":
+        return None
+    if date_range not in DATE_RANGES:
+        raise HTTPException(status_code=400, detail=f"Invalid dateRange: {date_range}")
+    now = datetime.utcnow()
+    span = DATE_RANGES[date_range]
+    if span is None:
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return now - span
@@ -0,0 +1,174 @@
+"""
+Real-time dashboard updates
+Fans Postgres NOTIFY events out to WebSocket and SSE subscribers per merchant
+"""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Channel written by the triggers in scripts/add-dashboard-notify.sql
+CHANNEL = "dashboard_events"
+
+METRICS_BY_MERCHANT_QUERY = """
+    SELECT
+        merchant_id,
+        SUM(total_conversations)::BIGINT AS total_conversations,
+        SUM(active_conversations)::BIGINT AS active_conversations,
+        SUM(total_messages)::BIGINT AS total_messages
+    FROM merchant_counters
+    WHERE merchant_id = ANY($1::INT[])
+    GROUP BY merchant_id
+"""
+
+
+class Subscription:
+    """
+    Outgoing event queue for one dashboard connection
+
+    Events with the same key are coalesced: a conversation updated five times
+    before the client reads is sent once, with its latest state. If a slow
+    client lets more than max_pending distinct events build up, the backlog is
+    dropped and replaced with a single `resync` event telling it to refetch.
+    """
+
+    def __init__(self, merchant_id: Optional[int], max_pending: int = 500):
+        self.merchant_id = merchant_id
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, key: Any, event: Dict[str, Any]):
+        if key in self._pending:
+            self._pending[key] = event
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+            self._pending["resync"] = {"type": "resync"}
+        self._pending[key] = event
+        self._ready.set()
+
+    async def next_batch(self):
+        """Wait for events and take everything pending"""
+        await self._ready.wait()
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class DashboardHub:
+    """Single LISTEN connection shared by every dashboard subscriber"""
+
+    def __init__(self, pool: Optional[asyncpg.Pool], metrics_interval: float = 2.0, reconnect_delay: float = 5.0):
+        self.pool = pool
+        self.metrics_interval = metrics_interval
+        self.reconnect_delay = reconnect_delay
+        self.subscribers: Dict[Optional[int], Set[Subscription]] = {}
+
+        self._dirty_merchants: Set[int] = set()
+        self._listen_task: Optional[asyncio.Task] = None
+        self._metrics_task: Optional[asyncio.Task] = None
+
+    async def start(self, database_url: str):
+        self._listen_task = asyncio.create_task(self._listen_loop(database_url))
+        self._metrics_task = asyncio.create_task(self._metrics_loop())
+
+    async def stop(self):
+        for task in (self._listen_task, self._metrics_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def subscribe(self, merchant_id: Optional[int] = None) -> Subscription:
+        """Subscribe to one merchant's events, or to every merchant with None"""
+        subscription = Subscription(merchant_id)
+        self.subscribers.setdefault(merchant_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self.subscribers.get(subscription.merchant_id)
+        if subscribers:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.merchant_id]
+
+    def publish(self, merchant_id: Optional[int], key: Any, event: Dict[str, Any]):
+        """Deliver an event to the merchant's subscribers and to all-merchant subscribers"""
+        targets = list(self.subscribers.get(None, ()))
+        if merchant_id is not None:
+            targets.extend(self.subscribers.get(merchant_id, ()))
+        for subscription in targets:
+            subscription.push(key, event)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed dashboard event: {payload[:200]}")
+            return
+
+        merchant_id = event.get("merchant_id")
+        if event.get("type") == "message":
+            # Messages are distinct events; status changes to the same message coalesce
+            key = ("message", event.get("id"))
+        else:
+            key = (event.get("type"), event.get("id"))
+        self.publish(merchant_id, key, event)
+
+        if merchant_id is not None:
+            self._dirty_merchants.add(merchant_id)
+
+    async def _listen_loop(self, database_url: str):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(database_url)
+                await connection.add_listener(CHANNEL, self._on_notify)
+                logger.info(f"📡 Listening for dashboard events on {CHANNEL}")
+                # Wait until the connection drops
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await closed.wait()
+                logger.warning("Dashboard event connection closed, reconnecting")
+            except asyncio.CancelledError:
+                if connection and not connection.is_closed():
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.error(f"Dashboard event listener error: {e}")
+
+            # Anything may have been missed while disconnected
+            self.publish(None, "resync", {"type": "resync"})
+            for merchant_id in list(self.subscribers):
+                if merchant_id is not None:
+                    self.publish(merchant_id, "resync", {"type": "resync"})
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _metrics_loop(self):
+        """Send at most one metrics snapshot per merchant per interval"""
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            if not self._dirty_merchants or not self.pool:
+                continue
+            merchants, self._dirty_merchants = list(self._dirty_merchants), set()
+            try:
+                async with self.pool.acquire() as conn:
+                    rows = await conn.fetch(METRICS_BY_MERCHANT_QUERY, merchants)
+            except Exception as e:
+                logger.error(f"Error reading merchant counters for push: {e}")
+                continue
+            for row in rows:
+                event = {"type": "metrics", **dict(row)}
+                self.publish(row["merchant_id"], ("metrics", row["merchant_id"]), event)
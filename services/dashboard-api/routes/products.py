@@ -4,12 +4,18 @@ Handles product catalog management for merchants
 Supports both simple products and advanced products with variants
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
 from datetime import datetime
 import logging
 
+from catalog_import import (
+    EXPORT_SQL, STAGING_COLUMNS, STAGING_TABLE_SQL, UPSERT_SQL,
+    ImportReport, export_header, export_line, validated_records
+)
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/products", tags=["products"])
@@ -56,6 +62,98 @@ class Product(BaseModel):
     variants: Optional[List[ProductVariant]] = []
 
 
+# Reconciles a product's variants against the submitted list in one statement.
+# Each incoming variant is matched by id, or by sku when its id is missing or
+# stale; matched rows are updated only if something changed, unmatched ones
+# are inserted and variants absent from the list are deleted. The result is
+# the full variant set after the change.
+RECONCILE_VARIANTS_SQL = """
+    WITH incoming AS (
+        SELECT *
+        FROM unnest(
+            $2::INT[], $3::TEXT[], $4::TEXT[], $5::TEXT[], $6::TEXT[],
+            $7::NUMERIC[], $8::INT[], $9::BOOLEAN[], $10::TEXT[], $11::JSONB[]
+        ) AS t(id, sku, variant_name, colour, size, price, stock_quantity, availability, image_url, metadata)
+    ),
+    matched AS (
+        SELECT i.*, COALESCE(
+            (SELECT v.id FROM product_variants v WHERE v.id = i.id AND v.product_id = $1),
+            (SELECT v.id FROM product_variants v
+             WHERE v.product_id = $1 AND v.sku = i.sku
+               AND NOT EXISTS (SELECT 1 FROM incoming o WHERE o.id = v.id)
+             ORDER BY v.id
+             LIMIT 1)
+        ) AS variant_id
+        FROM incoming i
+    ),
+    removed AS (
+        DELETE FROM product_variants v
+        WHERE v.product_id = $1
+          AND NOT EXISTS (SELECT 1 FROM matched m WHERE m.variant_id = v.id)
+        RETURNING v.id
+    ),
+    upserted AS (
+        INSERT INTO product_variants AS v (
+            id, product_id, sku, variant_name, colour, size, price,
+            stock_quantity, availability, image_url, metadata
+        )
+        SELECT COALESCE(m.variant_id, nextval(pg_get_serial_sequence('product_variants', 'id'))),
+               $1, m.sku, m.variant_name, m.colour, m.size, m.price,
+               m.stock_quantity, m.availability, m.image_url, m.metadata
+        FROM matched m
+        ON CONFLICT (id) DO UPDATE SET
+            sku = EXCLUDED.sku,
+            variant_name = EXCLUDED.variant_name,
+            colour = EXCLUDED.colour,
+            size = EXCLUDED.size,
+            price = EXCLUDED.price,
+            stock_quantity = EXCLUDED.stock_quantity,
+            availability = EXCLUDED.availability,
+            image_url = EXCLUDED.image_url,
+            metadata = EXCLUDED.metadata
+        WHERE (v.sku, v.variant_name, v.colour, v.size, v.price, v.stock_quantity,
+               v.availability, v.image_url, v.metadata)
+              IS DISTINCT FROM
+              (EXCLUDED.sku, EXCLUDED.variant_name, EXCLUDED.colour, EXCLUDED.size, EXCLUDED.price,
+               EXCLUDED.stock_quantity, EXCLUDED.availability, EXCLUDED.image_url, EXCLUDED.metadata)
+        RETURNING v.id, v.sku, v.variant_name, v.colour, v.size, v.price, v.stock_quantity, v.availability
+    )
+    SELECT * FROM upserted
+    UNION ALL
+    SELECT v.id, v.sku, v.variant_name, v.colour, v.size, v.price, v.stock_quantity, v.availability
+    FROM product_variants v
+    JOIN matched m ON m.variant_id = v.id
+    WHERE NOT EXISTS (SELECT 1 FROM upserted u WHERE u.id = v.id)
+    ORDER BY id
+"""
+
+
+async def reconcile_variants(conn, product_id: int, variants: List[ProductVariant]) -> List[dict]:
+    """Bring a product's variants in line with `variants`, touching only rows that differ"""
+    import json
+
+    ids = [variant.id for variant in variants if variant.id is not None]
+    skus = [variant.sku for variant in variants if variant.sku]
+    if len(ids) != len(set(ids)) or len(skus) != len(set(skus)):
+        raise HTTPException(status_code=400, detail="Variant ids and skus must be unique within a product")
+
+    rows = await conn.fetch(
+        RECONCILE_VARIANTS_SQL,
+        product_id,
+        [variant.id for variant in variants],
+        [variant.sku for variant in variants],
+        [variant.variant_name for variant in variants],
+        [variant.colour for variant in variants],
+        [variant.size for variant in variants],
+        [variant.price for variant in variants],
+        [variant.stock_quantity for variant in variants],
+        [variant.availability for variant in variants],
+        [variant.image_url for variant in variants],
+        [json.dumps(variant.metadata or {}) for variant in variants]
+    )
+    return [dict(row) for row in rows]
+
+
 @router.get("")
 async def get_products(merchant_id: int = 1):
     """Get all products for a merchant with their variants"""
@@ -81,6 +179,112 @@ async def get_products(merchant_id: int = 1):
         return []
 
 
+@router.post("/import")
+async def import_products(
+    request: Request,
+    merchant_id: int = 1,
+    format: Optional[Literal["csv", "jsonl"]] = Query(None),
+    dry_run: bool = False
+):
+    """
+    Bulk import products from a CSV or JSONL upload
+
+    The body is parsed and validated as it streams in and valid rows are
+    COPYed into a staging table; products and variants are then upserted in
+    the same transaction. Invalid rows are skipped and reported by line.
+    """
+    from main import db_pool
+
+    if not db_pool:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    file_format = format or ("jsonl" if "json" in request.headers.get("content-type", "") else "csv")
+    report = ImportReport()
+
+    try:
+        async with db_pool.acquire() as conn:
+            async with conn.transaction():
+                # Serialize imports per merchant so name matching cannot race
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('catalog_import'), $1)", merchant_id)
+                await conn.execute(STAGING_TABLE_SQL)
+                await conn.copy_records_to_table(
+                    "catalog_import",
+                    records=validated_records(request.stream(), file_format, report),
+                    columns=STAGING_COLUMNS
+                )
+
+                before = await conn.fetchrow("""
+                    SELECT
+                        (SELECT COUNT(*) FROM products WHERE merchant_id = $1) AS products,
+                        (SELECT COUNT(*) FROM product_variants v JOIN products p ON p.id = v.product_id
+                         WHERE p.merchant_id = $1) AS variants
+                """, merchant_id)
+                for statement in UPSERT_SQL:
+                    await conn.execute(statement, merchant_id)
+                after = await conn.fetchrow("""
+                    SELECT
+                        (SELECT COUNT(*) FROM products WHERE merchant_id = $1) AS products,
+                        (SELECT COUNT(*) FROM product_variants v JOIN products p ON p.id = v.product_id
+                         WHERE p.merchant_id = $1) AS variants
+                """, merchant_id)
+                staged = await conn.fetchval("SELECT COUNT(DISTINCT name) FROM catalog_import")
+
+                result = {
+                    "status": "dry_run" if dry_run else "imported",
+                    "rows_read": report.rows_read,
+                    "rows_imported": report.rows_valid,
+                    "products_in_file": staged,
+                    "products_created": after["products"] - before["products"],
+                    "variants_created": after["variants"] - before["variants"],
+                    "error_count": report.error_count,
+                    "errors": report.errors
+                }
+                if dry_run:
+                    # Roll back everything but still report what would change
+                    raise _DryRun(result)
+
+        logger.info(
+            f"✅ Imported {report.rows_valid}/{report.rows_read} catalog rows for merchant {merchant_id}"
+        )
+        return result
+
+    except _DryRun as dry:
+        return dry.result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error importing products: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to import products: {str(e)}")
+
+
+class _DryRun(Exception):
+    def __init__(self, result: dict):
+        self.result = result
+
+
+@router.get("/export")
+async def export_products(merchant_id: int = 1, format: Literal["csv", "jsonl"] = "csv"):
+    """Stream the merchant's catalog in the import layout (one row per variant)"""
+    from main import db_pool
+
+    if not db_pool:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    async def stream():
+        async with db_pool.acquire() as conn:
+            async with conn.transaction():
+                yield export_header(format)
+                async for record in conn.cursor(EXPORT_SQL, merchant_id, prefetch=1000):
+                    yield export_line(record, format)
+
+    media_type = "application/x-ndjson" if format == "jsonl" else "text/csv"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products-{merchant_id}.{format}"'}
+    )
+
+
 @router.post("")
 async def create_product(product: Product):
     """Create a new product (simple or advanced with variants)"""
@@ -210,33 +414,9 @@ async def update_product(product_id: int, product: Product):
                 if not row:
                     raise HTTPException(status_code=404, detail="Product not found")
 
-                # Delete existing variants and recreate if advanced
-                await conn.execute("DELETE FROM product_variants WHERE product_id = $1", product_id)
-
-                variants_data = []
-                if product.product_type == "advanced" and product.variants:
-                    for variant in product.variants:
-                        variant_row = await conn.fetchrow("""
-                            INSERT INTO product_variants (
-                                product_id, sku, variant_name, colour, size, price,
-                                stock_quantity, availability, image_url, metadata
-                            )
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                            RETURNING id, sku, variant_name, colour, size, price,
-                                      stock_quantity, availability
-                        """,
-                            product_id,
-                            variant.sku,
-                            variant.variant_name,
-                            variant.colour,
-                            variant.size,
-                            variant.price,
-                            variant.stock_quantity,
-                            variant.availability,
-                            variant.image_url,
-                            json.dumps(variant.metadata or {})
-                        )
-                        variants_data.append(dict(variant_row))
+                # Simple products keep no variants
+                variants = product.variants if product.product_type == "advanced" else []
+                variants_data = await reconcile_variants(conn, product_id, variants or [])
 
                 logger.info(f"✅ Updated product: {product_id}")
                 result = dict(row)
@@ -14,6 +14,7 @@ import json
 from datetime import datetime
 import requests
 import openai
+import redis.asyncio as redis
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +25,8 @@ WHATSAPP_ACCESS_TOKEN = os.getenv('WHATSAPP_ACCESS_TOKEN')
 WHATSAPP_PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_NUMBER_ID')
 WHATSAPP_VERIFY_TOKEN = os.getenv('WHATSAPP_VERIFY_TOKEN', 'yarnmarket_verify_2024')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+CONVERSATION_MEMORY_TTL = int(os.getenv('CONVERSATION_MEMORY_TTL', str(7 * 24 * 3600)))
 
 # Initialize OpenAI if available
 if OPENAI_API_KEY:
@@ -114,22 +117,53 @@ class WhatsAppService:
             logger.error(f"Error sending interactive message: {str(e)}")
             return {"success": False, "error": str(e)}
 
+class ConversationMemory:
+    """
+    Conversation memory on Redis lists, capped with LTRIM and expired by TTL.
+    Uses the same memory:{phone} keys as the conversation engine's WhatsApp handler.
+    """
+    
+    def __init__(self, redis_url: str, max_entries: int = 20, ttl_seconds: int = CONVERSATION_MEMORY_TTL):
+        self.redis = redis.from_url(redis_url, decode_responses=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+    
+    async def get_and_append(self, phone: str, entries: List[str]) -> List[str]:
+        """Read recent context and append new entries in one pipelined round-trip"""
+        key = f"memory:{phone}"
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lrange(key, -self.max_entries, -1)
+            if entries:
+                pipe.rpush(key, *entries)
+                pipe.ltrim(key, -self.max_entries, -1)
+                pipe.expire(key, self.ttl_seconds)
+            results = await pipe.execute()
+            return results[0]
+        except Exception as e:
+            logger.warning(f"Conversation memory unavailable for {phone}: {str(e)}")
+            return []
+    
+    async def append(self, phone: str, *entries: str):
+        """Append entries, cap the list and refresh its TTL"""
+        await self.get_and_append(phone, list(entries))
+
 class YarnMarketAI:
     """YarnMarket AI Conversation Handler"""
     
     def __init__(self):
-        self.conversation_memory = {}
+        self.conversation_memory = ConversationMemory(REDIS_URL)
         self.whatsapp = WhatsAppService()
     
     async def generate_ai_response(self, message: str, customer_name: str, phone: str) -> str:
         """Generate intelligent AI response"""
         try:
-            # Get conversation context
-            context = self.get_conversation_context(phone)
+            # Get conversation context and record this message in one round-trip
+            context = await self.get_conversation_context(phone, message)
             
             # Use OpenAI if available
             if OPENAI_API_KEY:
-                return await self.generate_openai_response(message, customer_name, context)
+                return await self.generate_openai_response(message, customer_name, context, phone)
             
             # Fallback to rule-based
             return self.generate_rule_based_response(message, customer_name)
@@ -138,7 +172,7 @@ class YarnMarketAI:
             logger.error(f"Error generating AI response: {str(e)}")
             return f"Hello {customer_name}! Thanks for your message. I'm here to help with your YarnMarket shopping needs! 🛍️"
     
-    async def generate_openai_response(self, message: str, customer_name: str, context: List[str]) -> str:
+    async def generate_openai_response(self, message: str, customer_name: str, context: List[str], phone: str) -> str:
         """Generate response using OpenAI GPT"""
         try:
             context_text = "\n".join(context[-5:]) if context else ""
@@ -185,7 +219,7 @@ Respond as YarnMarket AI:"""
             )
             
             ai_response = response.choices[0].message.content.strip()
-            self.update_conversation_memory(phone, message, ai_response)
+            await self.update_conversation_memory(phone, ai_response)
             
             return ai_response
             
@@ -242,21 +276,14 @@ Respond as YarnMarket AI:"""
         else:
             return f"Interesting, {customer_name}! 🤔 I see you mentioned: \"{message[:50]}{'...' if len(message) > 50 else ''}\"\n\nAs your YarnMarket AI assistant, I'm ready to help! Whether it's finding products, checking prices, or tracking orders - I've got you covered!\n\nWhat can I help you discover today? 🎯"
     
-    def get_conversation_context(self, phone: str) -> List[str]:
-        """Get conversation context"""
-        return self.conversation_memory.get(phone, [])
+    async def get_conversation_context(self, phone: str, user_message: Optional[str] = None) -> List[str]:
+        """Get conversation context, recording the new customer message"""
+        entries = [f"Customer: {user_message}"] if user_message else []
+        return await self.conversation_memory.get_and_append(phone, entries)
     
-    def update_conversation_memory(self, phone: str, user_message: str, ai_response: str):
-        """Update conversation memory"""
-        if phone not in self.conversation_memory:
-            self.conversation_memory[phone] = []
-        
-        self.conversation_memory[phone].append(f"Customer: {user_message}")
-        self.conversation_memory[phone].append(f"YarnMarket AI: {ai_response}")
-        
-        # Keep last 10 exchanges
-        if len(self.conversation_memory[phone]) > 20:
-            self.conversation_memory[phone] = self.conversation_memory[phone][-20:]
+    async def update_conversation_memory(self, phone: str, ai_response: str):
+        """Record the AI reply in conversation memory"""
+        await self.conversation_memory.append(phone, f"YarnMarket AI: {ai_response}")
     
     async def process_message(self, message_data: Dict) -> bool:
         """Process incoming WhatsApp message"""